@@ -0,0 +1,318 @@
+"""
+Benchmark suites for the image/AI pipeline, run via `manage.py benchmark`.
+Each suite returns a list of result rows (dicts) for the command to print.
+"""
+import os
+import resource
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+
+from .reference import WEATHER_SAMPLES, legacy_color_name, legacy_weather_weight, sample_garments
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def sample_garment_images(limit=16, directory=None):
+    """
+    A fixed, sorted corpus of garment photos from the media folder.
+    """
+    directory = directory or os.path.join(settings.MEDIA_ROOT, "wardrobe_images")
+    names = sorted(
+        name for name in os.listdir(directory) if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+    return [os.path.join(directory, name) for name in names[:limit]]
+
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _max_rss_mb():
+    # ru_maxrss is KiB on Linux.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _clip_backend_worker(backend_name, image_paths, repeat):
+    """Runs in a fresh process so RSS reflects only this backend."""
+    from PIL import Image
+
+    from .clip_backends import load_backend
+
+    start = time.perf_counter()
+    backend = load_backend(backend_name)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    images = [Image.open(path).convert("RGB") for path in image_paths]
+    backend.encode_images(images[:1])  # warm-up
+    per_image = [_timed(lambda image=image: backend.encode_images([image]), repeat) for image in images]
+    batch_ms = _timed(lambda: backend.encode_images(images), repeat)
+    return {
+        "backend": backend_name,
+        "load_ms": round(load_ms, 1),
+        "per_image_ms": round(statistics.median(per_image), 2),
+        "batch_ms_per_image": round(batch_ms / len(images), 2),
+        "max_rss_mb": round(_max_rss_mb(), 1),
+    }
+
+
+def bench_clip_backends(image_paths, repeat=3, backends=None):
+    from .clip_backends import BACKENDS
+
+    rows = []
+    context = get_context("spawn")
+    for name in backends or BACKENDS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            try:
+                rows.append(pool.submit(_clip_backend_worker, name, image_paths, repeat).result())
+            except Exception as exc:
+                rows.append({"backend": name, "error": str(exc)})
+    return rows
+
+
+def _legacy_dominant_color_hex(image_path):
+    """The pre-histogram implementation: full decode plus KMeans(n_clusters=1)."""
+    import cv2
+    from sklearn.cluster import KMeans
+
+    image = cv2.cvtColor(cv2.imread(image_path), cv2.COLOR_BGR2RGB)
+    h, w, _ = image.shape
+    pixels = image[int(h*0.3):int(h*0.7), int(w*0.3):int(w*0.7)].reshape((-1, 3))
+    kmeans = KMeans(n_clusters=1, n_init="auto").fit(pixels)
+    return "#{:02x}{:02x}{:02x}".format(*kmeans.cluster_centers_[0].astype(int))
+
+
+def bench_color(image_paths, repeat=3):
+    from .utils import get_dominant_color_hex
+
+    variants = [
+        ("kmeans (legacy)", _legacy_dominant_color_hex),
+        ("histogram", get_dominant_color_hex),
+    ]
+    rows = []
+    for name, fn in variants:
+        samples = [_timed(lambda path=path: fn(path), repeat) for path in image_paths]
+        rows.append(
+            {
+                "variant": name,
+                "median_ms": round(statistics.median(samples), 2),
+                "total_ms": round(sum(samples), 1),
+            }
+        )
+    return rows
+
+
+def _rembg_worker(model, image_paths, repeat):
+    """Runs in a fresh process so the uncached numbers include a cold start."""
+    from rembg import new_session, remove
+
+    from .utils import REMBG_MODELS, get_rembg_session
+
+    payloads = []
+    for path in image_paths:
+        with open(path, "rb") as handle:
+            payloads.append(handle.read())
+
+    # What a bare rembg.remove(bytes) does: build the session on every call.
+    # Session loads dominate, so a few images are enough.
+    uncached = [
+        _timed(lambda data=data: remove(data, session=new_session(REMBG_MODELS[model])), 1)
+        for data in payloads[:3]
+    ]
+
+    start = time.perf_counter()
+    session = get_rembg_session(model)
+    load_ms = (time.perf_counter() - start) * 1000
+    cached = [_timed(lambda data=data: remove(data, session=session), repeat) for data in payloads]
+
+    uncached_ms = statistics.median(uncached)
+    cached_ms = statistics.median(cached)
+    return {
+        "model": model,
+        "load_ms": round(load_ms, 1),
+        "uncached_ms_per_image": round(uncached_ms, 1),
+        "cached_ms_per_image": round(cached_ms, 1),
+        "speedup": round(uncached_ms / cached_ms, 1),
+        "max_rss_mb": round(_max_rss_mb(), 1),
+    }
+
+
+def bench_rembg(image_paths, repeat=3, models=None):
+    from .utils import REMBG_MODELS
+
+    rows = []
+    context = get_context("spawn")
+    for model in models or REMBG_MODELS:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            try:
+                rows.append(pool.submit(_rembg_worker, model, image_paths, repeat).result())
+            except Exception as exc:
+                rows.append({"model": model, "error": str(exc)})
+    return rows
+
+
+def _legacy_analyze_user_selfie(image_path):
+    """The pre-cache detector: cascade parsed per call, full-resolution scan."""
+    import cv2
+    import numpy as np
+
+    img = cv2.imread(image_path)
+    hsv_img = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    gray_img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + "haarcascade_frontalface_default.xml")
+    faces = face_cascade.detectMultiScale(gray_img, 1.1, 4)
+    if len(faces) == 0:
+        return None
+    x, y, w, h = faces[0]
+    skin = hsv_img[y+int(h*0.3):y+int(h*0.6), x+int(w*0.3):x+int(w*0.7)]
+    return {"skin_val": np.mean(skin[:, :, 2]), "skin_sat": np.mean(skin[:, :, 1])}
+
+
+def _phone_sized_copies(image_paths, directory, side):
+    """Upscaled copies, since the sample selfies are far smaller than phone photos."""
+    from PIL import Image
+
+    copies = []
+    for path in image_paths:
+        with Image.open(path) as image:
+            scale = side / max(image.size)
+            image = image.convert("RGB").resize(
+                (round(image.width * scale), round(image.height * scale)), Image.BICUBIC
+            )
+        copy = os.path.join(directory, os.path.splitext(os.path.basename(path))[0] + ".jpg")
+        image.save(copy, quality=90)
+        copies.append(copy)
+    return copies
+
+
+def bench_selfie(image_paths, repeat=3, phone_side=3024):
+    import tempfile
+
+    from .utils import analyze_user_selfie, get_face_cascade
+
+    get_face_cascade()  # the cached variant pays for the XML parse once, up front
+    variants = [
+        ("per-call cascade, full-res (legacy)", _legacy_analyze_user_selfie),
+        ("cached cascade, downscaled", analyze_user_selfie),
+    ]
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        corpora = [("sample", image_paths), (f"{phone_side}px", _phone_sized_copies(image_paths, tmp, phone_side))]
+        for corpus, paths in corpora:
+            for name, fn in variants:
+                samples = [_timed(lambda path=path: fn(path), repeat) for path in paths]
+                rows.append(
+                    {
+                        "images": corpus,
+                        "variant": name,
+                        "median_ms": round(statistics.median(samples), 2),
+                        "total_ms": round(sum(samples), 1),
+                    }
+                )
+
+            # How far the skin reading moves when the face box comes from the small copy.
+            drift = []
+            for path in paths:
+                legacy = _legacy_analyze_user_selfie(path)
+                if legacy is not None:
+                    drift.append(abs(legacy["skin_val"] - analyze_user_selfie(path)["skin_val"]))
+            rows.append(
+                {
+                    "images": corpus,
+                    "variant": "skin_val drift",
+                    "faces": f"{len(drift)}/{len(paths)}",
+                    "max": round(max(drift), 2) if drift else None,
+                }
+            )
+    return rows
+
+
+def bench_color_names(image_paths, repeat=3, count=10000):
+    """Naming `count` random hex codes; image_paths is unused."""
+    import numpy as np
+
+    from . import colors
+
+    rng = np.random.default_rng(0)
+    codes = ["#{:02x}{:02x}{:02x}".format(*rgb) for rgb in rng.integers(0, 256, (count, 3))]
+
+    start = time.perf_counter()
+    colors._build_lut()
+    build_ms = (time.perf_counter() - start) * 1000
+    colors.get_lut()
+
+    variants = [
+        ("loop (legacy)", lambda: [legacy_color_name(code) for code in codes]),
+        ("lut per call", lambda: [colors.color_name(code) for code in codes]),
+        ("lut batch", lambda: colors.color_names(codes)),
+    ]
+    expected = variants[0][1]()
+    rows = []
+    for name, fn in variants:
+        total_ms = _timed(fn, repeat)
+        rows.append(
+            {
+                "variant": name,
+                "total_ms": round(total_ms, 2),
+                "us_per_color": round(total_ms * 1000 / count, 3),
+                "mismatches": sum(a != b for a, b in zip(fn(), expected)),
+            }
+        )
+    unresolved = int((colors.get_lut() == colors._UNRESOLVED).sum())
+    rows.append({"variant": "lut", "build_ms": round(build_ms, 1), "unresolved_cells": unresolved})
+    return rows
+
+
+def bench_weather_weights(image_paths, repeat=3, count=5000):
+    """Weather weights for `count` synthetic garments per sample weather; image_paths is unused."""
+    import numpy as np
+
+    from .services import OutfitService
+
+    garments = sample_garments(count)
+    flags = np.array([g.weather_flags for g in garments], dtype=np.int64)
+
+    variants = [
+        ("keywords (legacy)", lambda w: [legacy_weather_weight(g, w) for g in garments]),
+        ("flags per garment", lambda w: [OutfitService._weather_weight(g.weather_flags, w) for g in garments]),
+        ("flags vectorized", lambda w: OutfitService._weather_weights(flags, w).tolist()),
+    ]
+    expected = [variants[0][1](w) for w in WEATHER_SAMPLES]
+    rows = []
+    for name, fn in variants:
+        total_ms = _timed(lambda: [fn(w) for w in WEATHER_SAMPLES], repeat)
+        mismatches = sum(
+            not np.allclose(fn(w), want) for w, want in zip(WEATHER_SAMPLES, expected)
+        )
+        rows.append(
+            {
+                "variant": name,
+                "total_ms": round(total_ms, 2),
+                "us_per_garment": round(total_ms * 1000 / (count * len(WEATHER_SAMPLES)), 3),
+                "mismatched_weathers": mismatches,
+            }
+        )
+    return rows
+
+
+SUITES = {
+    "clip-backends": bench_clip_backends,
+    "color": bench_color,
+    "color-names": bench_color_names,
+    "rembg": bench_rembg,
+    "selfie": bench_selfie,
+    "weather-weights": bench_weather_weights,
+}
+
+# Suites that sample a media folder other than wardrobe_images.
+SUITE_MEDIA = {
+    "selfie": "selfies",
+}
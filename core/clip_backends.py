@@ -0,0 +1,206 @@
+"""
+CLIP encoders behind a common interface so garment classification can run
+on full torch/transformers or on ONNX Runtime (fp32 or int8-quantized).
+
+Pick one with CLIP_BACKEND = torch | onnx | onnx-int8. The ONNX files are
+produced once with `manage.py export_clip_onnx` (which does need torch).
+"""
+import os
+
+import numpy as np
+from PIL import Image
+
+CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+CLIP_ONNX_DIR = os.getenv(
+    "CLIP_ONNX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "clip-onnx"),
+)
+BACKENDS = ("torch", "onnx", "onnx-int8")
+
+# CLIPImageProcessor defaults for ViT-B/32.
+_IMAGE_SIZE = 224
+_MEAN = np.array([0.48145466, 0.4578275, 0.40821073], dtype=np.float32)
+_STD = np.array([0.26862954, 0.26130258, 0.27577711], dtype=np.float32)
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def clip_pixels(images):
+    """
+    NumPy port of CLIPImageProcessor: shortest side to 224 (bicubic),
+    center crop, scale to [0, 1], normalize. Returns NCHW float32.
+    """
+    batch = np.empty((len(images), 3, _IMAGE_SIZE, _IMAGE_SIZE), dtype=np.float32)
+    for i, image in enumerate(images):
+        image = image.convert("RGB")
+        w, h = image.size
+        if w <= h:
+            new_w, new_h = _IMAGE_SIZE, int(_IMAGE_SIZE * h / w)
+        else:
+            new_w, new_h = int(_IMAGE_SIZE * w / h), _IMAGE_SIZE
+        image = image.resize((new_w, new_h), Image.BICUBIC)
+        left = (new_w - _IMAGE_SIZE) // 2
+        top = (new_h - _IMAGE_SIZE) // 2
+        image = image.crop((left, top, left + _IMAGE_SIZE, top + _IMAGE_SIZE))
+        pixels = np.asarray(image, dtype=np.float32) / 255.0
+        batch[i] = ((pixels - _MEAN) / _STD).transpose(2, 0, 1)
+    return batch
+
+
+class TorchClip:
+    """The reference path: transformers CLIPModel on torch."""
+
+    name = "torch"
+    cache_dir = None
+
+    def __init__(self, model_name=CLIP_MODEL_NAME):
+        from transformers import CLIPModel, CLIPProcessor
+
+        self.model = CLIPModel.from_pretrained(model_name).eval()
+        self.processor = CLIPProcessor.from_pretrained(model_name)
+
+    def encode_images(self, images):
+        import torch
+
+        inputs = self.processor(images=images, return_tensors="pt")
+        with torch.no_grad():
+            features = self.model.get_image_features(**inputs)
+        return _normalize_rows(features.numpy().astype(np.float32))
+
+    def encode_texts(self, prompts):
+        import torch
+
+        inputs = self.processor(text=prompts, return_tensors="pt", padding=True)
+        with torch.no_grad():
+            features = self.model.get_text_features(**inputs)
+        return _normalize_rows(features.numpy().astype(np.float32))
+
+
+class OnnxClip:
+    """
+    ONNX Runtime encoders. Only the vision graph is loaded up front; the text
+    graph and tokenizer are loaded on the rare label-cache miss.
+    """
+
+    def __init__(self, model_dir=CLIP_ONNX_DIR, quantized=False):
+        import onnxruntime as ort
+
+        self.name = "onnx-int8" if quantized else "onnx"
+        self.model_dir = model_dir
+        # Label embeddings depend on the exported weights, so keep them next to them.
+        self.cache_dir = model_dir
+        self._suffix = ".int8.onnx" if quantized else ".onnx"
+        self._options = ort.SessionOptions()
+        self._options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.vision = self._session("vision")
+        self._text = None
+        self._tokenizer = None
+
+    def _session(self, part):
+        import onnxruntime as ort
+
+        path = os.path.join(self.model_dir, f"{part}{self._suffix}")
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"{path} missing; run `manage.py export_clip_onnx`.")
+        return ort.InferenceSession(path, self._options, providers=["CPUExecutionProvider"])
+
+    def encode_images(self, images):
+        (features,) = self.vision.run(None, {"pixel_values": clip_pixels(images)})
+        return _normalize_rows(features.astype(np.float32))
+
+    def encode_texts(self, prompts):
+        if self._text is None:
+            from transformers import CLIPTokenizerFast
+
+            self._text = self._session("text")
+            self._tokenizer = CLIPTokenizerFast.from_pretrained(self.model_dir)
+        tokens = self._tokenizer(prompts, padding=True, return_tensors="np")
+        (features,) = self._text.run(
+            None,
+            {
+                "input_ids": tokens["input_ids"].astype(np.int64),
+                "attention_mask": tokens["attention_mask"].astype(np.int64),
+            },
+        )
+        return _normalize_rows(features.astype(np.float32))
+
+
+def load_backend(name):
+    if name == "torch":
+        return TorchClip()
+    if name in ("onnx", "onnx-int8"):
+        return OnnxClip(quantized=name == "onnx-int8")
+    raise ValueError(f"Unknown CLIP_BACKEND {name!r}; expected one of {BACKENDS}.")
+
+
+def export_onnx(model_dir=CLIP_ONNX_DIR, model_name=CLIP_MODEL_NAME, quantize=True, opset=14):
+    """
+    Exports the CLIP vision and text towers (projection included) to ONNX,
+    plus int8 dynamically-quantized copies. Returns the written paths.
+    """
+    import torch
+    from transformers import CLIPModel, CLIPTokenizerFast
+
+    os.makedirs(model_dir, exist_ok=True)
+    model = CLIPModel.from_pretrained(model_name).eval()
+    CLIPTokenizerFast.from_pretrained(model_name).save_pretrained(model_dir)
+
+    class _Vision(torch.nn.Module):
+        def __init__(self, clip):
+            super().__init__()
+            self.clip = clip
+
+        def forward(self, pixel_values):
+            return self.clip.get_image_features(pixel_values=pixel_values)
+
+    class _Text(torch.nn.Module):
+        def __init__(self, clip):
+            super().__init__()
+            self.clip = clip
+
+        def forward(self, input_ids, attention_mask):
+            return self.clip.get_text_features(input_ids=input_ids, attention_mask=attention_mask)
+
+    written = []
+    vision_path = os.path.join(model_dir, "vision.onnx")
+    torch.onnx.export(
+        _Vision(model),
+        (torch.zeros(1, 3, _IMAGE_SIZE, _IMAGE_SIZE),),
+        vision_path,
+        input_names=["pixel_values"],
+        output_names=["image_embeds"],
+        dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+        opset_version=opset,
+    )
+    written.append(vision_path)
+
+    text_path = os.path.join(model_dir, "text.onnx")
+    dummy_ids = torch.ones(1, 8, dtype=torch.int64)
+    torch.onnx.export(
+        _Text(model),
+        (dummy_ids, torch.ones_like(dummy_ids)),
+        text_path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["text_embeds"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "text_embeds": {0: "batch"},
+        },
+        opset_version=opset,
+    )
+    written.append(text_path)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        for part in ("vision", "text"):
+            source = os.path.join(model_dir, f"{part}.onnx")
+            target = os.path.join(model_dir, f"{part}.int8.onnx")
+            quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+            written.append(target)
+
+    return written
@@ -0,0 +1,131 @@
+"""
+Nearest named color for hex codes, via a precomputed lookup table.
+
+RGB is quantized to 15 bits (32 levels per channel) and each of the 32k
+cells stores the nearest name. Nearest-name regions are convex, so when
+all 8 corners of a cell agree the whole cell does; the few cells that
+straddle a boundary are marked unresolved and fall back to the exact
+distance search. Results are therefore identical to the plain loop.
+"""
+import re
+import threading
+
+import numpy as np
+
+# Order matters: ties go to the earlier name.
+COLOR_NAMES = {
+    "Black": (0, 0, 0),
+    "White": (255, 255, 255),
+    "Grey": (128, 128, 128),
+    "Red": (255, 0, 0),
+    "Blue": (0, 0, 255),
+    "Green": (0, 128, 0),
+    "Yellow": (255, 255, 0),
+    "Orange": (255, 165, 0),
+    "Purple": (128, 0, 128),
+    "Pink": (255, 192, 203),
+    "Brown": (165, 42, 42),
+    "Beige": (245, 245, 220),
+    "Navy": (0, 0, 128),
+    "Khaki": (195, 176, 145),
+    "Cream": (255, 253, 208),
+}
+NAMES = list(COLOR_NAMES)
+_PALETTE = np.array(list(COLOR_NAMES.values()), dtype=np.int32)
+_PALETTE_TUPLES = list(COLOR_NAMES.values())
+
+_BITS = 5
+_STEP = 256 >> _BITS
+_UNRESOLVED = 255
+
+_lut = None
+_lut_bytes = None  # the same table, for cheap scalar indexing
+_lut_lock = threading.Lock()
+_HEX_RE = re.compile(r"#[0-9a-fA-F]{6}")
+
+
+def _nearest_one(r, g, b):
+    """Exact nearest palette index for one color, in plain Python."""
+    best, best_dist = 0, None
+    for index, (cr, cg, cb) in enumerate(_PALETTE_TUPLES):
+        dist = (r - cr) ** 2 + (g - cg) ** 2 + (b - cb) ** 2
+        if best_dist is None or dist < best_dist:
+            best, best_dist = index, dist
+    return best
+
+
+def _nearest(rgb):
+    """Exact nearest palette index for an (N, 3) int array (ties -> lowest index)."""
+    diff = rgb[:, None, :].astype(np.int32) - _PALETTE[None, :, :]
+    return np.argmin((diff * diff).sum(axis=2), axis=1)
+
+
+def _build_lut():
+    levels = 1 << _BITS
+    # Low and high edge of every cell along one axis: 0, 7, 8, 15, ...
+    edges = np.stack([np.arange(levels) * _STEP, np.arange(levels) * _STEP + _STEP - 1], axis=1).ravel()
+    grid = np.stack(np.meshgrid(edges, edges, edges, indexing="ij"), axis=-1).reshape(-1, 3)
+    corners = _nearest(grid).reshape(levels, 2, levels, 2, levels, 2)
+    corners = corners.transpose(0, 2, 4, 1, 3, 5).reshape(levels, levels, levels, 8)
+    lut = corners[..., 0].astype(np.uint8)
+    lut[corners.min(axis=-1) != corners.max(axis=-1)] = _UNRESOLVED
+    return lut.ravel()
+
+
+def get_lut():
+    """The 15-bit table of palette indices, built on first use."""
+    global _lut, _lut_bytes
+    if _lut is None:
+        with _lut_lock:
+            if _lut is None:
+                lut = _build_lut()
+                _lut_bytes = lut.tobytes()
+                _lut = lut
+    return _lut
+
+
+def nearest_indices(rgb):
+    """Palette index of the nearest named color for an (N, 3) uint8 RGB array."""
+    rgb = np.asarray(rgb, dtype=np.uint8).reshape(-1, 3)
+    q = (rgb >> (8 - _BITS)).astype(np.intp)
+    indices = get_lut()[(q[:, 0] << (2 * _BITS)) | (q[:, 1] << _BITS) | q[:, 2]].astype(np.intp)
+    unresolved = indices == _UNRESOLVED
+    if unresolved.any():
+        indices[unresolved] = _nearest(rgb[unresolved])
+    return indices
+
+
+def color_name(hex_code):
+    """Nearest human-readable name for "#rrggbb", "" if it doesn't parse."""
+    if not hex_code or not hex_code.startswith("#"):
+        return ""
+    h = hex_code.lstrip("#")
+    try:
+        r, g, b = (int(h[i : i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return ""
+    if not (0 <= r <= 255 and 0 <= g <= 255 and 0 <= b <= 255):  # e.g. "#-1..." parses
+        return NAMES[_nearest_one(r, g, b)]
+    get_lut()
+    shift = 8 - _BITS
+    index = _lut_bytes[((r >> shift) << (2 * _BITS)) | ((g >> shift) << _BITS) | (b >> shift)]
+    if index == _UNRESOLVED:
+        index = _nearest_one(r, g, b)
+    return NAMES[index]
+
+
+def color_names(hex_codes):
+    """color_name for many hex codes at once, parsed and looked up in bulk."""
+    hex_codes = list(hex_codes)
+    names = [""] * len(hex_codes)
+    fast = [i for i, code in enumerate(hex_codes) if code and _HEX_RE.fullmatch(code)]
+    if fast:
+        packed = bytes.fromhex("".join(hex_codes[i][1:] for i in fast))
+        rgb = np.frombuffer(packed, dtype=np.uint8).reshape(-1, 3)
+        for i, index in zip(fast, nearest_indices(rgb)):
+            names[i] = NAMES[index]
+    fast_set = set(fast)
+    for i, code in enumerate(hex_codes):
+        if i not in fast_set:
+            names[i] = color_name(code)
+    return names
@@ -0,0 +1,141 @@
+"""
+Content-addressed, size-bounded disk cache for expensive image work.
+
+Entries are keyed by the SHA-256 of the input bytes plus a "kind"
+(e.g. "nobg.png", "analysis-v1.json"). File mtime doubles as the LRU clock:
+hits touch the file, and writes evict the least recently used entries once
+the directory grows past its byte budget. Writes only add to a running
+total; the directory is walked when that total passes the budget (then
+trimmed below it, so a full cache isn't re-walked on every write) or every
+RESYNC_PUTS writes, to pick up what other processes wrote.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_HASH_BLOCK = 1 << 20
+# Eviction trims the directory to this fraction of its budget.
+LOW_WATER = 0.9
+RESYNC_PUTS = 256
+
+# directory -> [estimated bytes, writes since the last walk], per process.
+_usage = {}
+_usage_lock = threading.Lock()
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(file_obj):
+    """SHA-256 of a file-like object (or Django File), read in blocks."""
+    digest = hashlib.sha256()
+    try:
+        file_obj.seek(0)
+    except Exception:
+        pass
+    for block in iter(lambda: file_obj.read(_HASH_BLOCK), b""):
+        digest.update(block)
+    try:
+        file_obj.seek(0)
+    except Exception:
+        pass
+    return digest.hexdigest()
+
+
+class ContentCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, digest, kind):
+        return os.path.join(self.directory, digest[:2], f"{digest}.{kind}")
+
+    def get_bytes(self, digest, kind):
+        path = self._path(digest, kind)
+        try:
+            with open(path, "rb") as handle:
+                data = handle.read()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError:
+            logger.warning("Unreadable cache entry %s", path)
+            return None
+
+    def put_bytes(self, digest, kind, data):
+        path = self._path(digest, kind)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "wb") as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            logger.exception("Could not write cache entry %s", path)
+            return
+        with _usage_lock:
+            usage = _usage.get(self.directory)
+            if usage is not None:
+                usage[0] += len(data)
+                usage[1] += 1
+                if usage[0] <= self.max_bytes and usage[1] < RESYNC_PUTS:
+                    return
+        self.evict()
+
+    def get_json(self, digest, kind):
+        data = self.get_bytes(digest, kind)
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def put_json(self, digest, kind, value):
+        self.put_bytes(digest, kind, json.dumps(value).encode("utf-8"))
+
+    def evict(self):
+        """
+        Walks the directory and, if it is over budget, drops least recently
+        used entries until it is under LOW_WATER of it.
+        """
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total > self.max_bytes:
+            entries.sort()
+            target = self.max_bytes * LOW_WATER
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except OSError:
+                    pass
+        with _usage_lock:
+            _usage[self.directory] = [total, 0]
+
+
+def get_cache():
+    return ContentCache(
+        getattr(settings, "ANALYSIS_CACHE_DIR", os.path.join(settings.BASE_DIR, "cache", "analysis")),
+        getattr(settings, "ANALYSIS_CACHE_MAX_BYTES", 512 * 1024 * 1024),
+    )
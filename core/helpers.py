@@ -1,10 +1,13 @@
 import logging
-import math
+import time
+from datetime import datetime, timezone as dt_timezone
 
 import requests
 from django.conf import settings
 from django.core.cache import cache
 
+from .colors import color_name
+
 logger = logging.getLogger(__name__)
 
 
@@ -94,18 +97,11 @@ def get_weather_context(city=None):
         temp = payload["main"]["temp"]
         desc = payload["weather"][0]["description"]
 
-        if temp < 15:
-            condition = "Cold"
-        elif temp > 30:
-            condition = "Hot"
-        else:
-            condition = "Pleasant"
-
         data = {
             "city": resolved_city,
             "temp_c": int(temp),
             "description": desc,
-            "condition": condition,
+            "condition": _weather_condition(temp),
         }
         cache.set(cache_key, data, 600)
         return data
@@ -121,47 +117,109 @@ def get_weather_context(city=None):
         return data
 
 
+def _weather_condition(temp):
+    if temp < 15:
+        return "Cold"
+    if temp > 30:
+        return "Hot"
+    return "Pleasant"
+
+
+RAIN_WORDS = ("rain", "drizzle", "shower", "storm")
+
+
+def get_weather_forecast(city=None):
+    """
+    Daily forecast for the next ~5 days as {"YYYY-MM-DD": context}, each
+    context shaped like get_weather_context's. Empty without an API key or
+    on failure. Cached for half an hour.
+    """
+    resolved_city = (city or "").strip() or getattr(settings, "DEFAULT_WEATHER_CITY", "Delhi")
+    api_key = getattr(settings, "OPENWEATHER_API_KEY", None)
+    if not api_key:
+        return {}
+    cache_key = f"forecast:{resolved_city}".lower()
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    days = {}
+    try:
+        response = requests.get(
+            "http://api.openweathermap.org/data/2.5/forecast",
+            params={"q": resolved_city, "appid": api_key, "units": "metric"},
+            timeout=2,
+        )
+        if response.status_code != 200:
+            logger.warning("Forecast API status %s for city %s", response.status_code, resolved_city)
+            cache.set(cache_key, days, 300)
+            return days
+        payload = response.json()
+        # Slots are 3-hourly in UTC; bucket them on the city's local date.
+        # A day is its mean temperature, and rainy if any slot is.
+        offset = payload.get("city", {}).get("timezone", 0)
+        for slot in payload.get("list", []):
+            date = datetime.fromtimestamp(slot["dt"] + offset, dt_timezone.utc).date().isoformat()
+            day = days.setdefault(date, {"temps": [], "descriptions": []})
+            day["temps"].append(slot["main"]["temp"])
+            day["descriptions"].append(slot["weather"][0]["description"])
+    except Exception:
+        logger.exception("Weather forecast fetch failed.")
+        cache.set(cache_key, {}, 300)
+        return {}
+
+    forecast = {}
+    for date, day in days.items():
+        temp = sum(day["temps"]) / len(day["temps"])
+        rainy = [d for d in day["descriptions"] if any(word in d.lower() for word in RAIN_WORDS)]
+        descriptions = rainy or day["descriptions"]
+        forecast[date] = {
+            "city": resolved_city,
+            "temp_c": int(temp),
+            "description": max(set(descriptions), key=descriptions.count),
+            "condition": _weather_condition(temp),
+        }
+    cache.set(cache_key, forecast, 1800)
+    return forecast
+
+
 def get_color_name(hex_code):
     """
     Converts a hex color to the nearest human-readable color name.
     """
-    if not hex_code or not hex_code.startswith("#"):
-        return ""
-
-    colors = {
-        "Black": (0, 0, 0),
-        "White": (255, 255, 255),
-        "Grey": (128, 128, 128),
-        "Red": (255, 0, 0),
-        "Blue": (0, 0, 255),
-        "Green": (0, 128, 0),
-        "Yellow": (255, 255, 0),
-        "Orange": (255, 165, 0),
-        "Purple": (128, 0, 128),
-        "Pink": (255, 192, 203),
-        "Brown": (165, 42, 42),
-        "Beige": (245, 245, 220),
-        "Navy": (0, 0, 128),
-        "Khaki": (195, 176, 145),
-        "Cream": (255, 253, 208),
-    }
-
-    h = hex_code.lstrip("#")
+    return color_name(hex_code)
+
+
+def parse_hex(hex_code):
+    """(r, g, b) of a "#rrggbb" string, or None if it doesn't parse."""
+    h = (hex_code or "").lstrip("#")
     try:
-        r, g, b = tuple(int(h[i : i + 2], 16) for i in (0, 2, 4))
-    except Exception:
-        return ""
+        return tuple(int(h[i : i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return None
 
-    min_dist = float("inf")
-    closest_name = ""
 
-    for name, (cr, cg, cb) in colors.items():
-        dist = math.sqrt((r - cr) ** 2 + (g - cg) ** 2 + (b - cb) ** 2)
-        if dist < min_dist:
-            min_dist = dist
-            closest_name = name
+COLOR_GROUPS = ["Neutral", "Warm", "Cool", "Dark"]
+_NEUTRAL_NAMES = {"White", "Black", "Grey", "Navy", "Cream", "Khaki", "Beige"}
+_WARM_NAMES = {"Red", "Orange", "Yellow", "Brown", "Beige", "Khaki", "Cream"}
+_COOL_NAMES = {"Blue", "Green", "Purple", "Pink", "Navy"}
 
-    return closest_name
+
+def get_color_group(hex_code):
+    """Wardrobe filter group (one of COLOR_GROUPS) for a hex color."""
+    if not hex_code:
+        return "Neutral"
+    rgb = parse_hex(hex_code)
+    if rgb is not None and sum(rgb) / 3 < 70:
+        return "Dark"
+    name = get_color_name(hex_code)
+    if name in _NEUTRAL_NAMES:
+        return "Neutral"
+    if name in _WARM_NAMES:
+        return "Warm"
+    if name in _COOL_NAMES:
+        return "Cool"
+    return "Neutral"
 
 
 def reverse_geocode_city(lat, lon):
@@ -208,3 +266,20 @@ def reverse_geocode_city(lat, lon):
     except Exception:
         logger.exception("Reverse geocoding failed.")
         return None
+
+
+def get_wardrobe_version(user_id):
+    """
+    Returns a token that changes whenever the user's wardrobe changes.
+    Derived caches include it in their keys so they never need explicit deletes.
+    """
+    cache_key = f"wardrobe_version:{user_id}"
+    version = cache.get(cache_key)
+    if version is None:
+        version = time.time_ns()
+        cache.set(cache_key, version, None)
+    return version
+
+
+def bump_wardrobe_version(user_id):
+    cache.set(f"wardrobe_version:{user_id}", time.time_ns(), None)
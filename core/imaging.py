@@ -0,0 +1,177 @@
+"""
+Decode-once image handle for garment ingestion.
+
+An upload is decoded a single time (JPEGs straight at a reduced DCT scale
+when the photo is far larger than anything downstream needs) and every
+stage - background removal, CLIP, color extraction - works from bounded,
+downscaled views of that one decode instead of re-reading the file.
+"""
+import io
+import os
+
+from PIL import Image
+
+from .content_cache import content_hash
+
+# Longest side kept from an upload; 12 MP phone photos decode at 1/2 scale.
+DECODE_MAX_SIDE = int(os.getenv("DECODE_MAX_SIDE", "2048"))
+
+
+def _open(fp, max_side):
+    image = Image.open(fp)
+    original_size = image.size
+    if max_side:
+        w, h = image.size
+        # Largest DCT scale that still keeps 3/4 of max_side. Only JPEG
+        # honours draft(); other formats decode at full size.
+        for scale in (8, 4, 2):
+            if max(w, h) / scale >= max_side * 3 / 4:
+                image.draft(None, (w // scale, h // scale))
+                break
+    image.load()
+
+    if image.mode not in ("RGB", "RGBA"):
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    if max_side and max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.BOX, reducing_gap=None)
+    return image, image.size == original_size
+
+
+class DecodedImage:
+    """
+    One decoded image (RGB, or RGBA when it has transparency) plus cached
+    downscaled views. `digest` is the content hash of the bytes it came from,
+    matching content_cache keys for the stored file.
+    """
+
+    def __init__(self, image, data=None, digest=None):
+        self.image = image
+        self._data = data
+        self._digest = digest
+        self._views = {}
+
+    @classmethod
+    def open(cls, source, max_side=DECODE_MAX_SIDE):
+        """Decodes a path or file object without hashing it."""
+        image, _ = _open(source, max_side)
+        return cls(image)
+
+    @classmethod
+    def from_bytes(cls, data, max_side=DECODE_MAX_SIDE):
+        image, full_size = _open(io.BytesIO(data), max_side)
+        return cls(image, data=data if full_size else None, digest=content_hash(data))
+
+    @classmethod
+    def from_file(cls, file_obj, max_side=DECODE_MAX_SIDE):
+        try:
+            file_obj.seek(0)
+        except Exception:
+            pass
+        data = file_obj.read()
+        try:
+            file_obj.seek(0)
+        except Exception:
+            pass
+        return cls.from_bytes(data, max_side=max_side)
+
+    @property
+    def size(self):
+        return self.image.size
+
+    @property
+    def has_alpha(self):
+        return self.image.mode == "RGBA"
+
+    @property
+    def data(self):
+        """Encoded bytes of exactly this image: the source bytes, else PNG."""
+        if self._data is None:
+            buffer = io.BytesIO()
+            self.image.save(buffer, format="PNG")
+            self._data = buffer.getvalue()
+        return self._data
+
+    @property
+    def digest(self):
+        if self._digest is None:
+            self._digest = content_hash(self.data)
+        return self._digest
+
+    def view(self, max_side):
+        """
+        The image box-filtered down so its longest side is at most max_side.
+        Views are cached and smaller ones are derived from larger ones.
+        """
+        w, h = self.image.size
+        if max(w, h) <= max_side:
+            return self.image
+        if max_side not in self._views:
+            larger = [side for side in self._views if side > max_side]
+            base = self._views[min(larger)] if larger else self.image
+            ratio = max_side / max(w, h)
+            size = (max(1, round(w * ratio)), max(1, round(h * ratio)))
+            self._views[max_side] = base.resize(size, Image.BOX, reducing_gap=None)
+        return self._views[max_side]
+
+    def shrink(self, max_side):
+        """A lighter DecodedImage built on view(max_side), keeping the digest."""
+        return DecodedImage(self.view(max_side), digest=self.digest)
+
+    def __getstate__(self):
+        # Views are cheap to rebuild; don't ship them over the inference socket.
+        state = self.__dict__.copy()
+        state["_views"] = {}
+        return state
+
+
+# Grid tiles are ~160-200 CSS px; 320/640 cover 2x/3x screens and the detail view.
+THUMBNAIL_WIDTHS = (160, 320, 640)
+THUMBNAIL_QUALITY = int(os.getenv("THUMBNAIL_QUALITY", "80"))
+
+
+def encode_thumbnails(image, widths=THUMBNAIL_WIDTHS):
+    """
+    WebP thumbnails of a DecodedImage as {actual width: bytes}.
+    Never upscales: widths past the image's own width collapse into one.
+    """
+    w, h = image.size
+    thumbnails = {}
+    for width in sorted(widths):
+        width = min(width, w)
+        view = image.view(max(1, round(max(w, h) * width / w)))
+        if view.size[0] in thumbnails:
+            continue
+        buffer = io.BytesIO()
+        view.save(buffer, format="WEBP", quality=THUMBNAIL_QUALITY, method=4)
+        thumbnails[view.size[0]] = buffer.getvalue()
+    return thumbnails
+
+
+# Alpha at or below this is background haze left by rembg, not garment.
+CUTOUT_ALPHA_THRESHOLD = 8
+CUTOUT_PADDING = 4
+
+
+def compact_cut_out(image):
+    """
+    A cut-out DecodedImage cropped to its visible pixels (plus a small
+    margin), with lossless WebP as its `.data`. Lossless WebP keeps alpha
+    and drops the colour of fully transparent pixels, so it is a fraction
+    of the PNG.
+    """
+    rgba = image.image.convert("RGBA")
+    mask = rgba.getchannel("A").point(lambda a: 255 if a > CUTOUT_ALPHA_THRESHOLD else 0)
+    bbox = mask.getbbox()
+    if bbox:
+        left, top, right, bottom = bbox
+        w, h = rgba.size
+        rgba = rgba.crop((
+            max(0, left - CUTOUT_PADDING),
+            max(0, top - CUTOUT_PADDING),
+            min(w, right + CUTOUT_PADDING),
+            min(h, bottom + CUTOUT_PADDING),
+        ))
+    buffer = io.BytesIO()
+    rgba.save(buffer, format="WEBP", lossless=True, method=4)
+    return DecodedImage(rgba, data=buffer.getvalue())
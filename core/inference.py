@@ -0,0 +1,221 @@
+"""
+Optional per-host inference daemon.
+
+When INFERENCE_SOCKET is set, gunicorn workers stop loading CLIP and rembg
+themselves and send requests to one `manage.py run_inference_server` process
+over a Unix socket. Classify requests that arrive close together are run as
+one batch. Without the env var (or if the daemon is down) everything runs
+in-process exactly as before.
+"""
+import logging
+import os
+import pickle
+import queue
+import socket
+import socketserver
+import struct
+import threading
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("!I")
+_is_server = False
+
+
+class InferenceUnavailable(Exception):
+    """The daemon could not be reached; callers fall back to local models."""
+
+
+def get_socket_path():
+    return os.getenv("INFERENCE_SOCKET", "").strip() or None
+
+
+def client_enabled():
+    return bool(get_socket_path()) and not _is_server
+
+
+def _send(sock, message):
+    data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Inference socket closed mid-message.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return pickle.loads(_recv_exact(sock, size))
+
+
+def request(op, **payload):
+    """
+    Sends one request to the daemon and returns its result.
+    Raises InferenceUnavailable if the daemon cannot be reached.
+    """
+    path = get_socket_path()
+    if not path:
+        raise InferenceUnavailable("INFERENCE_SOCKET is not set.")
+
+    timeout = float(os.getenv("INFERENCE_TIMEOUT", "120"))
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(path)
+            _send(sock, {"op": op, "payload": payload})
+            response = _recv(sock)
+    except (OSError, ConnectionError, EOFError, pickle.UnpicklingError) as exc:
+        raise InferenceUnavailable(str(exc)) from exc
+
+    if not response.get("ok"):
+        raise RuntimeError(f"Inference {op} failed: {response.get('error')}")
+    return response.get("result")
+
+
+# --- SERVER SIDE ---
+
+
+def _run_classify(batch):
+    from .utils import analyze_garments
+
+    images = []
+    for payload, _ in batch:
+        images.extend(payload["images"])
+    results = analyze_garments(images)
+
+    start = 0
+    for payload, future in batch:
+        end = start + len(payload["images"])
+        future.set_result(results[start:end])
+        start = end
+
+
+def _run_single(op, payload):
+    from .utils import cut_out, get_dominant_color_hex, remove_background
+
+    if op == "remove_background":
+        return remove_background(payload["data"], model=payload["model"])
+    if op == "cut_out":
+        return cut_out(payload["image"], model=payload["model"])
+    if op == "dominant_color":
+        return get_dominant_color_hex(payload["path"])
+    raise ValueError(f"Unknown inference op: {op}")
+
+
+class InferenceWorker(threading.Thread):
+    """
+    Owns the models. Runs requests one at a time, merging classify requests
+    that arrive within `batch_window` seconds into a single CLIP batch.
+    """
+
+    def __init__(self, batch_window=0.01, max_batch=32, preload=False):
+        super().__init__(name="inference-worker", daemon=True)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.preload = preload
+        self.requests = queue.Queue()
+
+    def submit(self, op, payload):
+        future = Future()
+        self.requests.put((op, payload, future))
+        return future
+
+    def run(self):
+        if self.preload:
+            # Requests queue up on the socket while CLIP and rembg load.
+            from .utils import REMBG_GARMENT_MODEL, _get_classifier, get_rembg_session
+
+            _get_classifier()
+            try:
+                get_rembg_session(REMBG_GARMENT_MODEL)
+            except Exception:
+                logger.warning("Could not preload the %s rembg session.", REMBG_GARMENT_MODEL)
+
+        pending = None
+        while True:
+            op, payload, future = pending or self.requests.get()
+            pending = None
+            if op != "classify":
+                self._resolve(future, _run_single, op, payload)
+                continue
+
+            batch = [(payload, future)]
+            size = len(payload["images"])
+            while size < self.max_batch:
+                try:
+                    item = self.requests.get(timeout=self.batch_window)
+                except queue.Empty:
+                    break
+                if item[0] != "classify":
+                    pending = item
+                    break
+                batch.append((item[1], item[2]))
+                size += len(item[1]["images"])
+            try:
+                _run_classify(batch)
+            except Exception as exc:
+                logger.exception("Batched classify failed.")
+                for _, batch_future in batch:
+                    if not batch_future.done():
+                        batch_future.set_exception(exc)
+
+    @staticmethod
+    def _resolve(future, fn, *args):
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            logger.exception("Inference request failed.")
+            future.set_exception(exc)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            message = _recv(self.request)
+        except (ConnectionError, EOFError, pickle.UnpicklingError):
+            return
+        future = self.server.worker.submit(message.get("op"), message.get("payload") or {})
+        try:
+            response = {"ok": True, "result": future.result()}
+        except Exception as exc:
+            response = {"ok": False, "error": str(exc)}
+        try:
+            _send(self.request, response)
+        except OSError:
+            logger.warning("Inference client went away before the reply.")
+
+
+class InferenceServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, worker):
+        self.worker = worker
+        super().__init__(path, _Handler)
+
+
+def serve(path, batch_window=0.01, max_batch=32, preload=True):
+    global _is_server
+    _is_server = True
+
+    if os.path.exists(path):
+        os.unlink(path)
+    worker = InferenceWorker(batch_window=batch_window, max_batch=max_batch, preload=preload)
+    worker.start()
+    server = InferenceServer(path, worker)
+    # Requests are unpickled, so only this user may connect.
+    os.chmod(path, 0o600)
+    logger.info("Inference server listening on %s", path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
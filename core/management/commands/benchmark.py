@@ -0,0 +1,34 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.benchmarks import SUITE_MEDIA, SUITES, sample_garment_images
+
+
+class Command(BaseCommand):
+    help = "Run a benchmark suite over sample media and print one row per variant."
+
+    def add_arguments(self, parser):
+        parser.add_argument("suite", choices=sorted(SUITES))
+        parser.add_argument(
+            "--images",
+            type=int,
+            default=16,
+            help="Number of sample images (media/wardrobe_images, or media/selfies for selfie).",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Timed runs per measurement (median is reported).",
+        )
+
+    def handle(self, *args, **options):
+        directory = os.path.join(
+            settings.MEDIA_ROOT, SUITE_MEDIA.get(options["suite"], "wardrobe_images")
+        )
+        image_paths = sample_garment_images(options["images"], directory=directory)
+        rows = SUITES[options["suite"]](image_paths, repeat=options["repeat"])
+        for row in rows:
+            self.stdout.write("  ".join(f"{key}={value}" for key, value in row.items()))
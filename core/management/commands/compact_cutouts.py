@@ -0,0 +1,97 @@
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from core.helpers import bump_wardrobe_version
+from core.imaging import DecodedImage, compact_cut_out
+from core.models import Garment
+from core.services import GarmentService
+
+
+class Command(BaseCommand):
+    help = "Trim stored PNG cut-outs to their visible pixels and re-save them as lossless WebP."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=0,
+            help="Limit number of garments to process.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Garments per bulk_update.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the size savings without writing anything.",
+        )
+
+    def handle(self, *args, **options):
+        limit = options["limit"]
+        batch_size = max(1, options["batch_size"])
+        dry_run = options["dry_run"]
+
+        queryset = (
+            Garment.objects.filter(image__contains="_nobg")
+            .exclude(image__endswith=".webp")
+            .only("id", "owner_id", "image", "thumbnails")
+        )
+
+        processed = 0
+        errors = 0
+        bytes_before = 0
+        bytes_after = 0
+        pending = []
+        for garment in queryset.order_by("id").iterator(chunk_size=batch_size):
+            if limit and processed >= limit:
+                break
+            try:
+                with garment.image.open("rb") as handle:
+                    data = handle.read()
+                cutout = compact_cut_out(DecodedImage.from_bytes(data, max_side=None))
+            except Exception as exc:
+                errors += 1
+                self.stderr.write(f"Failed {garment.id}: {exc}")
+                continue
+
+            processed += 1
+            bytes_before += len(data)
+            bytes_after += len(cutout.data)
+            if dry_run:
+                continue
+
+            stale = [garment.image.name, *garment.thumbnails.values()]
+            base = os.path.splitext(os.path.basename(garment.image.name))[0].split("_nobg")[0] + "_nobg"
+            garment.image.name = default_storage.save(f"wardrobe_images/{base}.webp", ContentFile(cutout.data))
+            garment.thumbnails = GarmentService._save_thumbnails(cutout, base)
+            pending.append((garment, stale))
+            if len(pending) >= batch_size:
+                self._flush(pending)
+                pending = []
+        self._flush(pending)
+
+        saved = bytes_before - bytes_after
+        self.stdout.write(
+            f"Done. processed={processed} errors={errors} dry_run={dry_run} "
+            f"before={bytes_before / 1e6:.1f}MB after={bytes_after / 1e6:.1f}MB saved={saved / 1e6:.1f}MB"
+        )
+
+    def _flush(self, pending):
+        if not pending:
+            return
+        garments = [garment for garment, _ in pending]
+        Garment.objects.bulk_update(garments, ["image", "thumbnails"])
+        for owner_id in {g.owner_id for g in garments}:
+            bump_wardrobe_version(owner_id)
+        # Old files go only once no row points at them any more.
+        for garment, stale in pending:
+            keep = {garment.image.name, *garment.thumbnails.values()}
+            for name in stale:
+                if name not in keep:
+                    default_storage.delete(name)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.clip_backends import CLIP_MODEL_NAME, CLIP_ONNX_DIR, export_onnx
+
+
+class Command(BaseCommand):
+    help = "Export the CLIP garment classifier to ONNX (fp32 and int8) for CLIP_BACKEND=onnx."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output-dir", default=CLIP_ONNX_DIR)
+        parser.add_argument("--model", default=CLIP_MODEL_NAME)
+        parser.add_argument(
+            "--no-quantize",
+            action="store_true",
+            help="Skip writing the int8-quantized copies.",
+        )
+
+    def handle(self, *args, **options):
+        paths = export_onnx(
+            model_dir=options["output_dir"],
+            model_name=options["model"],
+            quantize=not options["no_quantize"],
+        )
+        for path in paths:
+            self.stdout.write(f"Wrote {path}")
@@ -0,0 +1,74 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from core.helpers import bump_wardrobe_version
+from core.imaging import DecodedImage
+from core.models import Garment
+from core.services import GarmentService
+
+
+class Command(BaseCommand):
+    help = "Generate WebP thumbnails for garments that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Regenerate thumbnails for every garment.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=0,
+            help="Limit number of garments to process.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Garments per bulk_update.",
+        )
+
+    def handle(self, *args, **options):
+        limit = options["limit"]
+        batch_size = max(1, options["batch_size"])
+
+        queryset = Garment.objects.exclude(image="").only("id", "owner_id", "image", "thumbnails")
+        if not options["force"]:
+            queryset = queryset.filter(thumbnails={})
+
+        processed = 0
+        errors = 0
+        pending = []
+        for garment in queryset.order_by("id").iterator(chunk_size=batch_size):
+            if limit and processed >= limit:
+                break
+            try:
+                with garment.image.open("rb") as handle:
+                    decoded = DecodedImage.open(handle)
+            except Exception as exc:
+                errors += 1
+                self.stderr.write(f"Failed {garment.id}: {exc}")
+                continue
+
+            base = os.path.splitext(os.path.basename(garment.image.name))[0]
+            garment.thumbnails = GarmentService._save_thumbnails(decoded, base)
+            if not garment.thumbnails:
+                errors += 1
+                continue
+            pending.append(garment)
+            processed += 1
+            if len(pending) >= batch_size:
+                self._flush(pending)
+                pending = []
+        self._flush(pending)
+
+        self.stdout.write(f"Done. processed={processed} errors={errors}")
+
+    def _flush(self, garments):
+        if not garments:
+            return
+        Garment.objects.bulk_update(garments, ["thumbnails"])
+        for owner_id in {g.owner_id for g in garments}:
+            bump_wardrobe_version(owner_id)
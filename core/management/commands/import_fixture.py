@@ -35,4 +35,9 @@ class Command(BaseCommand):
         except Exception as exc:
             self.stdout.write(f"Fixture import failed: {exc}")
             return
+        # loaddata saves raw rows, so the derived fields need filling in.
+        garments = list(Garment.objects.only("id", *Garment.DERIVED_FROM))
+        for garment in garments:
+            garment.refresh_derived_fields()
+        Garment.objects.bulk_update(garments, Garment.DERIVED_FIELDS, batch_size=500)
         self.stdout.write("Fixture import complete.")
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.services import UploadService
+
+
+class Command(BaseCommand):
+    help = "Delete unfinished chunked uploads (and their part files) that went idle."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours",
+            type=int,
+            default=48,
+            help="Remove sessions with no chunk received for this many hours.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options["hours"])
+        count = UploadService.purge_stale(cutoff)
+        self.stdout.write(f"Done. purged={count}")
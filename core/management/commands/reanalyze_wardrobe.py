@@ -0,0 +1,117 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.helpers import bump_wardrobe_version
+from core.models import Garment
+from core.services import GarmentService
+from core.utils import ANALYZER_VERSION
+from core.workers import Checkpoint, analyze_chunk, ordered_results, worker_pool
+
+
+class Command(BaseCommand):
+    help = "Re-run garment analysis for rows produced by an older analyzer version."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Worker processes (each loads its own CLIP).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=64,
+            help="Garments per chunk, per model batch and per bulk_update.",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=0,
+            help="Stop after this many garments.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=os.path.join(settings.BASE_DIR, "cache", "reanalyze_wardrobe.json"),
+            help="File recording the last fully processed garment id.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and start from the first id.",
+        )
+
+    def _chunks(self, last_id, batch_size, limit):
+        """Keyset-paginated chunks of stale garments, never the whole table."""
+        fetched = 0
+        while True:
+            size = batch_size if not limit else min(batch_size, limit - fetched)
+            if size <= 0:
+                return
+            chunk = list(
+                Garment.objects.stale_analysis(ANALYZER_VERSION)
+                .filter(id__gt=last_id)
+                .order_by("id")
+                # _apply_analysis refreshes derived fields, which read DERIVED_FROM.
+                .only("id", "owner_id", "image", *Garment.DERIVED_FROM)[:size]
+            )
+            if not chunk:
+                return
+            fetched += len(chunk)
+            last_id = chunk[-1].id
+            yield chunk
+
+    def _write(self, chunk, results):
+        updated = []
+        failed = 0
+        for garment, ai_data in zip(chunk, results):
+            # No embedding means CLIP was unavailable; keep the existing labels.
+            if ai_data is None or ai_data.get("embedding") is None:
+                failed += 1
+                continue
+            GarmentService._apply_analysis(garment, ai_data)
+            updated.append(garment)
+        if updated:
+            Garment.objects.bulk_update(updated, GarmentService.ANALYSIS_FIELDS)
+            for owner_id in {g.owner_id for g in updated}:
+                bump_wardrobe_version(owner_id)
+        return len(updated), failed
+
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        batch_size = max(1, options["batch_size"])
+        checkpoint = Checkpoint(options["checkpoint"], analyzer_version=ANALYZER_VERSION)
+        last_id = checkpoint.load(options["restart"])
+        if last_id:
+            self.stdout.write(f"Resuming after garment id {last_id}.")
+
+        updated = 0
+        failed = 0
+        resumable = True
+        start = time.perf_counter()
+        chunks = self._chunks(last_id, batch_size, options["limit"])
+
+        with worker_pool(workers) as pool:
+            for chunk, results, error in ordered_results(pool, analyze_chunk, chunks, workers * 2):
+                if error is not None:
+                    # Freeze the checkpoint so a rerun retries this chunk.
+                    self.stderr.write(f"Chunk {chunk[0].id}-{chunk[-1].id} failed: {error}")
+                    failed += len(chunk)
+                    resumable = False
+                    continue
+                chunk_updated, chunk_failed = self._write(chunk, results)
+                updated += chunk_updated
+                failed += chunk_failed
+                if resumable:
+                    checkpoint.save(chunk[-1].id)
+                self.stdout.write(f"Processed up to id {chunk[-1].id} ({chunk_updated} updated).")
+
+        elapsed = time.perf_counter() - start
+        rate = (updated + failed) / elapsed if elapsed else 0
+        self.stdout.write(
+            f"Done. updated={updated} failed={failed} analyzer_version={ANALYZER_VERSION} "
+            f"elapsed={elapsed:.1f}s rate={rate:.1f}/s"
+        )
@@ -1,11 +1,13 @@
 import os
+import time
 
-from django.core.files.base import ContentFile
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
-from rembg import remove
-
+from core.helpers import bump_wardrobe_version
 from core.models import Garment
+from core.utils import REMBG_GARMENT_MODEL, REMBG_MODELS
+from core.workers import Checkpoint, cut_out_chunk, ordered_results, worker_pool
 
 
 class Command(BaseCommand):
@@ -23,52 +25,119 @@ class Command(BaseCommand):
             default=0,
             help="Limit number of garments to process.",
         )
+        parser.add_argument(
+            "--model",
+            choices=sorted(REMBG_MODELS),
+            default=REMBG_GARMENT_MODEL,
+            help="rembg model tier (the session is loaded once per worker).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Worker processes (each loads its own rembg session).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=16,
+            help="Garments per chunk and per bulk_update.",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=os.path.join(settings.BASE_DIR, "cache", "rembg_wardrobe.json"),
+            help="File recording the last fully processed garment id.",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing checkpoint and start from the first id.",
+        )
         parser.add_argument(
             "--dry-run",
             action="store_true",
             help="Show what would be processed without saving.",
         )
 
-    def handle(self, *args, **options):
-        force = options["force"]
-        limit = options["limit"]
-        dry_run = options["dry_run"]
-
-        processed = 0
-        skipped = 0
-        errors = 0
-
+    def _chunks(self, last_id, batch_size, limit, force):
+        """Keyset-paginated chunks of garments still to process."""
         queryset = Garment.objects.exclude(image="")
-        for garment in queryset.iterator():
-            if limit and processed >= limit:
-                break
+        if not force:
+            # Storage may have appended a suffix (x_nobg_AbC12.webp) on name clashes.
+            queryset = queryset.exclude(image__contains="_nobg")
+        fetched = 0
+        while True:
+            size = batch_size if not limit else min(batch_size, limit - fetched)
+            if size <= 0:
+                return
+            chunk = list(
+                queryset.filter(id__gt=last_id).order_by("id").only("id", "owner_id", "image")[:size]
+            )
+            if not chunk:
+                return
+            fetched += len(chunk)
+            last_id = chunk[-1].id
+            yield chunk
 
-            if not garment.image:
-                skipped += 1
+    def _write(self, chunk, results):
+        garments = {garment.id: garment for garment in chunk}
+        updated = []
+        errors = 0
+        for garment_id, new_name, thumbnails, error in results:
+            if error:
+                errors += 1
+                self.stderr.write(f"Failed {garment_id}: {error}")
                 continue
-
-            filename = os.path.basename(garment.image.name)
-            if filename.endswith("_nobg.png") and not force:
-                skipped += 1
+            if new_name is None:  # dry run
                 continue
+            garment = garments[garment_id]
+            garment.image.name = new_name
+            garment.thumbnails = thumbnails
+            updated.append(garment)
+        if updated:
+            Garment.objects.bulk_update(updated, ["image", "thumbnails"])
+            for owner_id in {g.owner_id for g in updated}:
+                bump_wardrobe_version(owner_id)
+        return len(results) - errors, errors
 
-            try:
-                with garment.image.open("rb") as handle:
-                    input_bytes = handle.read()
-                output_bytes = remove(input_bytes)
+    def handle(self, *args, **options):
+        workers = max(1, options["workers"])
+        batch_size = max(1, options["batch_size"])
+        dry_run = options["dry_run"]
+        model = options["model"]
 
-                if dry_run:
-                    processed += 1
-                    continue
+        checkpoint = Checkpoint(options["checkpoint"], model=model, force=options["force"])
+        last_id = 0 if dry_run else checkpoint.load(options["restart"])
+        if last_id:
+            self.stdout.write(f"Resuming after garment id {last_id}.")
 
-                base = os.path.splitext(filename)[0]
-                new_name = f"wardrobe_images/{base}_nobg.png"
-                garment.image.save(new_name, ContentFile(output_bytes), save=True)
-                processed += 1
-            except Exception as exc:
-                errors += 1
-                self.stderr.write(f"Failed {garment.id} {garment.name}: {exc}")
+        processed = 0
+        errors = 0
+        resumable = not dry_run
+        start = time.perf_counter()
+        chunks = self._chunks(last_id, batch_size, options["limit"], options["force"])
+
+        # Workers segment and store files; rows are only written here, in id order.
+        with worker_pool(workers) as pool:
+            for chunk, results, error in ordered_results(
+                pool, cut_out_chunk, chunks, workers * 2, model, dry_run
+            ):
+                if error is not None:
+                    # Freeze the checkpoint so a rerun retries this chunk.
+                    self.stderr.write(f"Chunk {chunk[0].id}-{chunk[-1].id} failed: {error}")
+                    errors += len(chunk)
+                    resumable = False
+                    continue
+                chunk_processed, chunk_errors = self._write(chunk, results)
+                processed += chunk_processed
+                errors += chunk_errors
+                if resumable:
+                    checkpoint.save(chunk[-1].id)
+                self.stdout.write(f"Processed up to id {chunk[-1].id}.")
 
+        elapsed = time.perf_counter() - start
+        rate = processed / elapsed if elapsed else 0
         self.stdout.write(
-            f"Done. processed={processed} skipped={skipped} errors={errors} dry_run={dry_run}"
+            f"Done. processed={processed} errors={errors} dry_run={dry_run} model={model} "
+            f"elapsed={elapsed:.1f}s rate={rate:.2f} images/s"
         )
@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Garment
+from core.services import GarmentService
+
+IN_FLIGHT_STAGES = ["queued", "removing_background", "analyzing"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-run the upload pipeline, in this process, for garments a restart left "
+        "mid-pipeline (and, with --failed, for failed ones)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--minutes",
+            type=int,
+            default=30,
+            help="Only garments uploaded at least this long ago (0 when no job pool is running).",
+        )
+        parser.add_argument(
+            "--failed",
+            action="store_true",
+            help="Also retry garments whose processing failed.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=16,
+            help="Garments per pipeline run (one analysis batch each).",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=0,
+            help="Stop after this many garments.",
+        )
+
+    def handle(self, *args, **options):
+        stages = IN_FLIGHT_STAGES + (["failed"] if options["failed"] else [])
+        cutoff = timezone.now() - timedelta(minutes=options["minutes"])
+        batch_size = max(1, options["batch_size"])
+        ids = list(
+            Garment.objects.filter(stage__in=stages, created_at__lte=cutoff)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+        if options["limit"]:
+            ids = ids[: options["limit"]]
+
+        ready = 0
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start : start + batch_size]
+            Garment.objects.filter(id__in=batch).update(stage="queued")
+            GarmentService._process_uploads(batch)
+            ready += Garment.objects.filter(id__in=batch, stage="ready").count()
+            self.stdout.write(f"Processed up to id {batch[-1]}.")
+
+        self.stdout.write(f"Done. requeued={len(ids)} ready={ready} failed={len(ids) - ready}")
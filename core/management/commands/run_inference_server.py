@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import inference
+
+
+class Command(BaseCommand):
+    help = "Serve CLIP classification and rembg to local workers over a Unix socket."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--socket",
+            default=inference.get_socket_path(),
+            help="Socket path (defaults to INFERENCE_SOCKET).",
+        )
+        parser.add_argument(
+            "--batch-window-ms",
+            type=float,
+            default=10.0,
+            help="How long to wait for more classify requests to join a batch.",
+        )
+        parser.add_argument(
+            "--max-batch",
+            type=int,
+            default=32,
+            help="Maximum images per CLIP batch.",
+        )
+        parser.add_argument(
+            "--no-preload",
+            action="store_true",
+            help="Load models on first request instead of at startup.",
+        )
+
+    def handle(self, *args, **options):
+        path = options["socket"]
+        if not path:
+            raise CommandError("Pass --socket or set INFERENCE_SOCKET.")
+
+        self.stdout.write(f"Inference server starting on {path}")
+        inference.serve(
+            path,
+            batch_window=options["batch_window_ms"] / 1000.0,
+            max_batch=options["max_batch"],
+            preload=not options["no_preload"],
+        )
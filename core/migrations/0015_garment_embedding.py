@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0014_garment_ai_status_tryon_job"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garment",
+            name="embedding",
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0015_garment_embedding"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garment",
+            name="analyzer_version",
+            field=models.PositiveSmallIntegerField(db_index=True, default=0),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0016_garment_analyzer_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garment",
+            name="thumbnails",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0017_garment_thumbnails"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garment",
+            name="stage",
+            field=models.CharField(
+                choices=[
+                    ("queued", "Queued"),
+                    ("removing_background", "Removing background"),
+                    ("analyzing", "Analyzing"),
+                    ("ready", "Ready"),
+                ],
+                default="ready",
+                max_length=24,
+            ),
+        ),
+    ]
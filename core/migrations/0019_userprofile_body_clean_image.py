@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0018_garment_stage"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="body_clean_image",
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to="body_clean/"),
+        ),
+        migrations.AddField(
+            model_name="userprofile",
+            name="body_clean_source_hash",
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
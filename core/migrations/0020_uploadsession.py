@@ -0,0 +1,76 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0019_userprofile_body_clean_image"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadSession",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("fingerprint", models.CharField(max_length=255)),
+                ("filename", models.CharField(max_length=255)),
+                ("size", models.PositiveBigIntegerField()),
+                ("received", models.PositiveBigIntegerField(default=0)),
+                ("purchase_price", models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                (
+                    "fabric_type",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("Cotton", "Cotton"),
+                            ("Linen", "Linen"),
+                            ("Wool", "Wool"),
+                            ("Denim", "Denim"),
+                            ("Silk", "Silk"),
+                            ("Polyester", "Polyester"),
+                            ("Nylon", "Nylon"),
+                            ("Synthetic", "Synthetic/Blend"),
+                            ("Leather", "Leather"),
+                            ("Suede", "Suede"),
+                            ("Other", "Other"),
+                        ],
+                        max_length=30,
+                        null=True,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("uploading", "Uploading"), ("complete", "Complete"), ("failed", "Failed")],
+                        default="uploading",
+                        max_length=20,
+                    ),
+                ),
+                ("error_message", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "garment",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="upload_sessions",
+                        to="core.garment",
+                    ),
+                ),
+                (
+                    "owner",
+                    models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(fields=("owner", "fingerprint"), name="unique_upload_fingerprint")
+                ],
+            },
+        ),
+    ]
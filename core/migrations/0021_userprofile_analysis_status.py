@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0020_uploadsession"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userprofile",
+            name="analysis_status",
+            field=models.CharField(
+                choices=[
+                    ("idle", "Idle"),
+                    ("pending", "Pending"),
+                    ("processing", "Processing"),
+                    ("complete", "Complete"),
+                    ("failed", "Failed"),
+                ],
+                default="idle",
+                max_length=20,
+            ),
+        ),
+    ]
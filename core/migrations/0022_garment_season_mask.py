@@ -0,0 +1,79 @@
+from django.db import migrations, models
+
+# Frozen copies of utils.is_season_match / utils.season_mask as of this
+# migration, so the backfill neither imports the app's image stack nor
+# changes when those functions do.
+SEASONS = ("Winter", "Summer", "Autumn", "Spring")
+SEASON_REASONS = (
+    "Not your best color",
+    "Great High Contrast",
+    "Cool Winter Tone",
+    "Soft Summer Tone",
+    "Perfect Neutral",
+    "Warm Earth Tone",
+    "Bright Spring Color",
+    "Invalid Color",
+)
+
+
+def is_season_match(garment_hex, user_season):
+    h = garment_hex.lstrip("#")
+    try:
+        r, g, b = tuple(int(h[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return False, "Invalid Color"
+
+    match = False
+    reason = "Not your best color"
+    if user_season == "Winter":
+        if (r < 40 and g < 40 and b < 40) or (r > 200 and g > 200 and b > 200):
+            match, reason = True, "Great High Contrast"
+        elif b > r + 30 and b > g + 30:
+            match, reason = True, "Cool Winter Tone"
+    elif user_season == "Summer":
+        if 80 < (r + g + b) / 3 < 200:
+            if b > r:
+                match, reason = True, "Soft Summer Tone"
+            if max(r, g, b) - min(r, g, b) < 30:
+                match, reason = True, "Perfect Neutral"
+    elif user_season == "Autumn":
+        if r > b + 40 or g > b + 20:
+            match, reason = True, "Warm Earth Tone"
+    elif user_season == "Spring":
+        if max(r, g, b) - min(r, g, b) > 50 and r > b:
+            match, reason = True, "Bright Spring Color"
+    return match, reason
+
+
+def season_mask(garment_hex):
+    mask = 0
+    for i, season in enumerate(SEASONS):
+        match, reason = is_season_match(garment_hex or "", season)
+        if match:
+            mask |= 1 << i
+        mask |= SEASON_REASONS.index(reason) << (len(SEASONS) + 3 * i)
+    return mask
+
+
+def fill_season_masks(apps, schema_editor):
+    Garment = apps.get_model("core", "Garment")
+    garments = list(Garment.objects.only("id", "color_hex"))
+    for garment in garments:
+        garment.season_mask = season_mask(garment.color_hex)
+    Garment.objects.bulk_update(garments, ["season_mask"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0021_userprofile_analysis_status"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garment",
+            name="season_mask",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_season_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,128 @@
+import math
+
+from django.db import migrations, models
+
+# Frozen copies of helpers.parse_hex / get_color_name / get_color_group as of
+# this migration, so the backfill neither imports the app nor changes with it.
+COLOR_NAMES = {
+    "Black": (0, 0, 0),
+    "White": (255, 255, 255),
+    "Grey": (128, 128, 128),
+    "Red": (255, 0, 0),
+    "Blue": (0, 0, 255),
+    "Green": (0, 128, 0),
+    "Yellow": (255, 255, 0),
+    "Orange": (255, 165, 0),
+    "Purple": (128, 0, 128),
+    "Pink": (255, 192, 203),
+    "Brown": (165, 42, 42),
+    "Beige": (245, 245, 220),
+    "Navy": (0, 0, 128),
+    "Khaki": (195, 176, 145),
+    "Cream": (255, 253, 208),
+}
+NEUTRAL_NAMES = {"White", "Black", "Grey", "Navy", "Cream", "Khaki", "Beige"}
+WARM_NAMES = {"Red", "Orange", "Yellow", "Brown", "Beige", "Khaki", "Cream"}
+COOL_NAMES = {"Blue", "Green", "Purple", "Pink", "Navy"}
+
+
+def parse_hex(hex_code):
+    h = (hex_code or "").lstrip("#")
+    try:
+        return tuple(int(h[i : i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        return None
+
+
+def get_color_name(hex_code):
+    if not hex_code or not hex_code.startswith("#"):
+        return ""
+    rgb = parse_hex(hex_code)
+    if rgb is None:
+        return ""
+    r, g, b = rgb
+    min_dist = float("inf")
+    closest_name = ""
+    for name, (cr, cg, cb) in COLOR_NAMES.items():
+        dist = math.sqrt((r - cr) ** 2 + (g - cg) ** 2 + (b - cb) ** 2)
+        if dist < min_dist:
+            min_dist = dist
+            closest_name = name
+    return closest_name
+
+
+def get_color_group(hex_code):
+    if not hex_code:
+        return "Neutral"
+    rgb = parse_hex(hex_code)
+    if rgb is not None and sum(rgb) / 3 < 70:
+        return "Dark"
+    name = get_color_name(hex_code)
+    if name in NEUTRAL_NAMES:
+        return "Neutral"
+    if name in WARM_NAMES:
+        return "Warm"
+    if name in COOL_NAMES:
+        return "Cool"
+    return "Neutral"
+
+
+def fill_color_attributes(apps, schema_editor):
+    Garment = apps.get_model("core", "Garment")
+    garments = list(Garment.objects.only("id", "color_hex"))
+    for garment in garments:
+        rgb = parse_hex(garment.color_hex)
+        garment.color_r, garment.color_g, garment.color_b = rgb or (None, None, None)
+        garment.brightness = sum(rgb) // 3 if rgb else None
+        garment.color_name = get_color_name(garment.color_hex)
+        garment.color_group = get_color_group(garment.color_hex)
+    Garment.objects.bulk_update(
+        garments,
+        ["color_r", "color_g", "color_b", "brightness", "color_name", "color_group"],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0022_garment_season_mask"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garment",
+            name="color_r",
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="garment",
+            name="color_g",
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="garment",
+            name="color_b",
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="garment",
+            name="brightness",
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="garment",
+            name="color_name",
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name="garment",
+            name="color_group",
+            field=models.CharField(default="Neutral", editable=False, max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name="garment",
+            index=models.Index(fields=["owner", "color_group"], name="garment_owner_color_group"),
+        ),
+        migrations.RunPython(fill_color_attributes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+from django.db import migrations, models
+
+# Frozen copy of utils.weather_flags and its keyword table as of this
+# migration, so the backfill neither imports the app nor changes with it.
+WEATHER_KEYWORDS = (
+    (1 << 0, "category", ("blazer", "hoodie", "jacket", "coat", "layer", "sweater")),
+    (1 << 1, "category", ("short", "sleeveless", "tank")),
+    (1 << 2, "category", ("layer",)),
+    (1 << 3, "fabric", ("cotton", "linen")),
+    (1 << 4, "fabric", ("wool", "denim")),
+    (1 << 5, "fabric", ("suede", "leather")),
+    (1 << 6, "fabric", ("polyester", "nylon", "synthetic")),
+)
+WEATHER_DARK = 1 << 7
+DARK_BRIGHTNESS = 90
+
+
+def weather_flags(category, name, fabric_type, brightness):
+    text = {
+        "category": f"{category or ''} {name or ''}".lower(),
+        "fabric": (fabric_type or "").lower(),
+    }
+    flags = 0
+    for bit, source, words in WEATHER_KEYWORDS:
+        if any(word in text[source] for word in words):
+            flags |= bit
+    if brightness is not None and brightness < DARK_BRIGHTNESS:
+        flags |= WEATHER_DARK
+    return flags
+
+
+def fill_weather_flags(apps, schema_editor):
+    Garment = apps.get_model("core", "Garment")
+    garments = list(Garment.objects.only("id", "category", "name", "fabric_type", "brightness"))
+    for garment in garments:
+        garment.weather_flags = weather_flags(
+            garment.category, garment.name, garment.fabric_type, garment.brightness
+        )
+    Garment.objects.bulk_update(garments, ["weather_flags"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0023_garment_color_attributes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="garment",
+            name="weather_flags",
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_weather_flags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0024_garment_weather_flags"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="garment",
+            name="stage",
+            field=models.CharField(
+                choices=[
+                    ("queued", "Queued"),
+                    ("removing_background", "Removing background"),
+                    ("analyzing", "Analyzing"),
+                    ("ready", "Ready"),
+                    ("failed", "Failed"),
+                ],
+                default="ready",
+                max_length=24,
+            ),
+        ),
+    ]
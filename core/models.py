@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
 from django.utils import timezone
 
 # --- CHOICE LISTS ---
@@ -51,10 +52,26 @@ class UserProfile(models.Model):
     # --- SCANNER FIELDS ---
     selfie = models.ImageField(upload_to='selfies/', null=True, blank=True) # For undertone analysis
     full_body_image = models.ImageField(upload_to='body_shots/', null=True, blank=True) # Source for VTON
+    # full_body_image with the background removed and composited on white,
+    # plus the SHA-256 of the photo it was made from (stale when they differ).
+    body_clean_image = models.ImageField(upload_to='body_clean/', null=True, blank=True, editable=False)
+    body_clean_source_hash = models.CharField(max_length=64, blank=True, editable=False)
     
     skin_undertone = models.CharField(max_length=10, choices=UNDERTONE_CHOICES, default='Neutral')
     season = models.CharField(max_length=20, choices=SEASON_CHOICES, blank=True, null=True)
     contrast_level = models.CharField(max_length=20, blank=True, null=True)
+    # Season analysis runs as a background job after a selfie/undertone change.
+    analysis_status = models.CharField(
+        max_length=20,
+        choices=[
+            ("idle", "Idle"),
+            ("pending", "Pending"),
+            ("processing", "Processing"),
+            ("complete", "Complete"),
+            ("failed", "Failed"),
+        ],
+        default="idle",
+    )
     green_points = models.IntegerField(default=0)
     city = models.CharField(max_length=120, blank=True, null=True)
     timezone = models.CharField(max_length=64, blank=True, null=True)
@@ -77,6 +94,18 @@ class GarmentQuerySet(models.QuerySet):
     def for_categories(self, categories):
         return self.filter(category__in=categories)
 
+    def stale_analysis(self, version):
+        return self.filter(analyzer_version__lt=version).exclude(image="")
+
+    def matching_season(self, season):
+        """Garments whose color suits `season`, as a SQL bitwise filter on season_mask."""
+        from .utils import season_bit
+
+        bit = season_bit(season)
+        if not bit:
+            return self.none()
+        return self.alias(_season_bit=models.F("season_mask").bitand(bit)).filter(_season_bit__gt=0)
+
 
 class GarmentManager(models.Manager):
     def get_queryset(self):
@@ -91,6 +120,12 @@ class GarmentManager(models.Manager):
     def for_categories(self, categories):
         return self.get_queryset().for_categories(categories)
 
+    def stale_analysis(self, version):
+        return self.get_queryset().stale_analysis(version)
+
+    def matching_season(self, season):
+        return self.get_queryset().matching_season(season)
+
 class Garment(models.Model):
     """The Digital Twin of your cloth"""
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -110,6 +145,37 @@ class Garment(models.Model):
         choices=[("pending", "Pending"), ("processing", "Processing"), ("complete", "Complete"), ("failed", "Failed")],
         default="pending",
     )
+    # Upload pipeline progress; uploads start "queued", everything else is "ready".
+    # "failed" uploads keep their raw photo until requeue_uploads retries them.
+    stage = models.CharField(
+        max_length=24,
+        choices=[
+            ("queued", "Queued"),
+            ("removing_background", "Removing background"),
+            ("analyzing", "Analyzing"),
+            ("ready", "Ready"),
+            ("failed", "Failed"),
+        ],
+        default="ready",
+    )
+    # CLIP image embedding (unit length, float16 bytes) for "similar items".
+    embedding = models.BinaryField(null=True, blank=True, editable=False)
+    # utils.ANALYZER_VERSION that produced the AI fields (0 = never analysed by CLIP).
+    analyzer_version = models.PositiveSmallIntegerField(default=0, db_index=True)
+    # WebP thumbnails: {"160": "thumbnails/..._160w.webp", ...} (width -> storage name).
+    thumbnails = models.JSONField(default=dict, blank=True)
+    # utils.season_mask(color_hex): match bit + reason code for each season.
+    # Derived; kept in step with color_hex by refresh_derived_fields().
+    season_mask = models.PositiveIntegerField(default=0, editable=False)
+    # Also derived from color_hex, so color filters run in SQL (null = bad hex).
+    color_r = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    color_g = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    color_b = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    brightness = models.PositiveSmallIntegerField(null=True, blank=True, editable=False, db_index=True)
+    color_name = models.CharField(max_length=20, blank=True, editable=False, db_index=True)
+    color_group = models.CharField(max_length=10, default="Neutral", editable=False)
+    # utils.weather_flags(...): WEATHER_* bits from category/name, fabric and brightness.
+    weather_flags = models.PositiveSmallIntegerField(default=0, editable=False)
     
     # Financial & Usage Logic
     purchase_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
@@ -125,6 +191,11 @@ class Garment(models.Model):
 
     objects = GarmentManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "color_group"], name="garment_owner_color_group"),
+        ]
+
     @property
     def cost_per_wear(self):
         """Calculates CPW - Central metric for Wardrobe.AI"""
@@ -151,6 +222,50 @@ class Garment(models.Model):
             return 100
         return int((self.wear_count / target_wears) * 100)
 
+    @property
+    def thumbnail_urls(self):
+        """{width: url} of the WebP thumbnails, narrowest first."""
+        widths = sorted(self.thumbnails, key=int)
+        return {width: default_storage.url(self.thumbnails[width]) for width in widths}
+
+    @property
+    def srcset(self):
+        """The thumbnails as an <img srcset> value, "" when there are none."""
+        return ", ".join(f"{url} {width}w" for width, url in self.thumbnail_urls.items())
+
+    # Stored fields computed by refresh_derived_fields() from DERIVED_FROM.
+    DERIVED_FROM = {"color_hex", "category", "name", "fabric_type"}
+    DERIVED_FIELDS = [
+        "season_mask", "color_r", "color_g", "color_b", "brightness", "color_name", "color_group",
+        "weather_flags",
+    ]
+
+    def refresh_derived_fields(self):
+        """Recomputes DERIVED_FIELDS from their sources. Call before bulk_update."""
+        from .helpers import get_color_group, get_color_name, parse_hex
+        from .utils import season_mask, weather_flags
+
+        self.season_mask = season_mask(self.color_hex)
+        rgb = parse_hex(self.color_hex)
+        self.color_r, self.color_g, self.color_b = rgb or (None, None, None)
+        self.brightness = sum(rgb) // 3 if rgb else None
+        self.color_name = get_color_name(self.color_hex)
+        self.color_group = get_color_group(self.color_hex)
+        self.weather_flags = weather_flags(self.category, self.name, self.fabric_type, self.brightness)
+
+    def save(self, *args, **kwargs):
+        self.refresh_derived_fields()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and self.DERIVED_FROM.intersection(update_fields):
+            kwargs["update_fields"] = {*update_fields, *self.DERIVED_FIELDS}
+        super().save(*args, **kwargs)
+
+    def season_match(self, season):
+        """(match, reason) as is_season_match gives for this garment's color."""
+        from .utils import season_match_from_mask
+
+        return season_match_from_mask(self.season_mask, season)
+
     def __str__(self):
         return f"{self.name} - INR {self.cost_per_wear}/wear"
 
@@ -285,3 +400,40 @@ class TryOnJob(models.Model):
 
     def __str__(self):
         return f"TryOnJob {self.id} ({self.status})"
+
+
+class UploadSession(models.Model):
+    """
+    One file of a chunked, resumable upload. Chunks are appended to a part
+    file on disk; `received` is the byte offset the next chunk must start at.
+    """
+    STATUS_CHOICES = [
+        ("uploading", "Uploading"),
+        ("complete", "Complete"),
+        ("failed", "Failed"),
+    ]
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Client-chosen id for the source file, so a restarted import finds the
+    # sessions it already opened (and skips files that already completed).
+    fingerprint = models.CharField(max_length=255)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    purchase_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    fabric_type = models.CharField(max_length=30, choices=FABRIC_CHOICES, blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="uploading")
+    error_message = models.TextField(blank=True)
+    garment = models.ForeignKey(
+        Garment, related_name="upload_sessions", on_delete=models.SET_NULL, null=True, blank=True
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "fingerprint"], name="unique_upload_fingerprint"),
+        ]
+
+    def __str__(self):
+        return f"UploadSession {self.id} ({self.status} {self.received}/{self.size})"
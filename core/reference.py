@@ -0,0 +1,116 @@
+"""
+Frozen copies of replaced implementations, kept as reference oracles: the
+benchmarks time the new code against them and the tests check that the new
+code gives the same answers.
+"""
+import math
+import random
+
+
+def legacy_color_name(hex_code):
+    """The pre-LUT get_color_name: dict rebuilt per call, sqrt distance loop."""
+    if not hex_code or not hex_code.startswith("#"):
+        return ""
+    colors = {
+        "Black": (0, 0, 0),
+        "White": (255, 255, 255),
+        "Grey": (128, 128, 128),
+        "Red": (255, 0, 0),
+        "Blue": (0, 0, 255),
+        "Green": (0, 128, 0),
+        "Yellow": (255, 255, 0),
+        "Orange": (255, 165, 0),
+        "Purple": (128, 0, 128),
+        "Pink": (255, 192, 203),
+        "Brown": (165, 42, 42),
+        "Beige": (245, 245, 220),
+        "Navy": (0, 0, 128),
+        "Khaki": (195, 176, 145),
+        "Cream": (255, 253, 208),
+    }
+    h = hex_code.lstrip("#")
+    try:
+        r, g, b = tuple(int(h[i : i + 2], 16) for i in (0, 2, 4))
+    except Exception:
+        return ""
+    min_dist = float("inf")
+    closest_name = ""
+    for name, (cr, cg, cb) in colors.items():
+        dist = math.sqrt((r - cr) ** 2 + (g - cg) ** 2 + (b - cb) ** 2)
+        if dist < min_dist:
+            min_dist = dist
+            closest_name = name
+    return closest_name
+
+
+def legacy_weather_weight(item, weather_context):
+    """The pre-flags _weather_weight: keyword scans and hex parsing per garment."""
+    if not weather_context:
+        return 1
+
+    temp = weather_context.get("temp_c")
+    desc = (weather_context.get("description") or "").lower()
+    is_rain = any(word in desc for word in ["rain", "drizzle", "shower", "storm"])
+
+    weight = 1
+    category_text = f"{item.category or ''} {item.name or ''}".lower()
+    fabric = (item.fabric_type or "").lower()
+
+    if temp is not None and temp > 30:
+        if any(word in category_text for word in ["blazer", "hoodie", "jacket", "coat", "layer", "sweater"]):
+            return 0
+        if "cotton" in fabric or "linen" in fabric:
+            weight *= 1.5
+
+    if temp is not None and temp < 15:
+        if any(word in category_text for word in ["short", "sleeveless", "tank"]):
+            return 0
+        if "wool" in fabric or "denim" in fabric:
+            weight *= 1.5
+        if "layer" in category_text:
+            weight *= 1.3
+
+    if is_rain:
+        if "suede" in fabric or "leather" in fabric:
+            return 0
+        if "polyester" in fabric or "nylon" in fabric or "synthetic" in fabric:
+            weight *= 1.4
+        if item.color_hex:
+            try:
+                h = item.color_hex.lstrip("#")
+                r, g, b = tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
+                if (r + g + b) / 3 < 90:
+                    weight *= 1.2
+            except Exception:
+                pass
+
+    return weight
+
+
+WEATHER_SAMPLES = (
+    {"temp_c": 34, "description": "clear sky"},
+    {"temp_c": 9, "description": "light rain"},
+    {"temp_c": 22, "description": "thunderstorm"},
+    {"temp_c": 22, "description": "few clouds"},
+)
+
+
+def sample_garments(count, seed=0):
+    """Unsaved garments with random categories, keyword-bearing names, fabrics and colors."""
+    from .models import CATEGORY_CHOICES, FABRIC_CHOICES, Garment
+
+    rng = random.Random(seed)
+    names = [
+        "Shirt", "Denim Jacket", "Tank Top", "Sleeveless Dress", "Wool Sweater", "Shorts", "Hoodie", "Chinos",
+    ]
+    garments = []
+    for _ in range(count):
+        garment = Garment(
+            name=rng.choice(names),
+            category=rng.choice(CATEGORY_CHOICES)[0],
+            fabric_type=rng.choice(FABRIC_CHOICES + [(None, None)])[0],
+            color_hex="#{:06x}".format(rng.randrange(1 << 24)),
+        )
+        garment.refresh_derived_fields()
+        garments.append(garment)
+    return garments
@@ -1,21 +1,53 @@
 import logging
 import os
 import random
-from datetime import datetime
+from datetime import datetime, timedelta
 
+import numpy as np
 import requests
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files import File
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from django.db import transaction
 from django.db.models import F, Q
 from django.utils import timezone
-
-from .helpers import get_color_name, get_weather_context, reverse_geocode_city
-from .models import Garment, Outfit, ScheduledOutfit, TryOnJob, UserProfile
+from PIL import Image
+
+from .helpers import (
+    RAIN_WORDS,
+    bump_wardrobe_version,
+    get_wardrobe_version,
+    get_weather_context,
+    get_weather_forecast,
+    reverse_geocode_city,
+)
+from .models import Garment, Outfit, ScheduledOutfit, TryOnJob, UploadSession, UserProfile
 from .async_jobs import submit_job
-from .utils import analyze_garment, analyze_user_season, get_season_details, is_season_match
-from .vton_service import generate_tryon
+from .content_cache import content_hash, file_hash, get_cache
+from .imaging import DecodedImage, compact_cut_out, encode_thumbnails
+from .utils import (
+    ANALYSIS_IMAGE_SIZE,
+    ANALYZER_VERSION,
+    REMBG_GARMENT_MODEL,
+    SELFIE_ANALYZER_VERSION,
+    WEATHER_BREATHABLE,
+    WEATHER_DARK,
+    WEATHER_LAYER,
+    WEATHER_OUTER_LAYER,
+    WEATHER_RAIN_READY,
+    WEATHER_RAIN_SENSITIVE,
+    WEATHER_SHORT,
+    WEATHER_WARM_FABRIC,
+    analyze_garments,
+    analyze_user_season,
+    analyze_user_selfie,
+    cut_out,
+    get_season_details,
+    season_bit,
+)
+from .vton_service import clean_human_image, generate_tryon
 
 logger = logging.getLogger(__name__)
 
@@ -34,14 +66,60 @@ class ProfileService:
         selfie_changed = "selfie" in form.changed_data and form.cleaned_data.get("selfie")
         undertone_changed = "skin_undertone" in form.changed_data
 
-        profile.save()
         if profile.selfie and (selfie_changed or undertone_changed):
-            analysis = analyze_user_season(profile.selfie.path, profile.skin_undertone)
-            profile.season = analysis.get("season_type")
-            profile.contrast_level = analysis.get("contrast_level")
-            profile.save(update_fields=["season", "contrast_level"])
+            profile.analysis_status = "pending"
+        profile.save()
+        if profile.full_body_image and "full_body_image" in form.changed_data:
+            # Warm the cleaned body photo so the first try-on doesn't pay for it.
+            submit_job(TryOnService.clean_body_image, profile.id)
+        if profile.analysis_status == "pending":
+            submit_job(ProfileService._run_season_analysis, profile.id)
         return profile
 
+    @staticmethod
+    def selfie_measurements(selfie):
+        """
+        Face measurements of a stored selfie, cached by content hash, so an
+        undertone change re-runs only the season rules, not the face scan.
+        """
+        cache = get_cache()
+        kind = f"selfie-v{SELFIE_ANALYZER_VERSION}.json"
+        with selfie.open("rb") as handle:
+            digest = file_hash(handle)
+        measurements = cache.get_json(digest, kind)
+        if measurements is None:
+            measurements = {
+                key: float(value) for key, value in analyze_user_selfie(selfie.path).items()
+            }
+            cache.put_json(digest, kind, measurements)
+        return measurements
+
+    @staticmethod
+    def _run_season_analysis(profile_id):
+        profile = UserProfile.objects.filter(id=profile_id).first()
+        if not profile or not profile.selfie:
+            return
+        # A newer selfie/undertone may land while this runs; only write back
+        # if the profile still holds what was analysed.
+        current = UserProfile.objects.filter(
+            id=profile.id, selfie=profile.selfie.name, skin_undertone=profile.skin_undertone
+        )
+        current.update(analysis_status="processing")
+        try:
+            measurements = ProfileService.selfie_measurements(profile.selfie)
+            analysis = analyze_user_season(
+                profile.selfie.path, profile.skin_undertone, measurements=measurements
+            )
+        except Exception:
+            logger.exception("Season analysis failed for profile %s.", profile.id)
+            current.update(analysis_status="failed")
+            return
+        current.update(
+            season=analysis.get("season_type"),
+            contrast_level=analysis.get("contrast_level"),
+            analysis_status="complete",
+        )
+
     @staticmethod
     def update_location(profile, city=None, timezone_name=None):
         updated = False
@@ -60,23 +138,23 @@ class GarmentService:
     """Garment creation and AI enrichment."""
 
     @staticmethod
-    def _remove_background(image_file):
+    def _remove_background(image):
+        """Trimmed cut-out of a decoded upload (WebP data) as a DecodedImage, or None."""
         if os.getenv("DISABLE_REMBG", "").lower() in {"1", "true", "yes"}:
             logger.info("DISABLE_REMBG set; skipping background removal.")
             return None
         try:
-            image_file.seek(0)
-        except Exception:
-            pass
-        try:
-            from rembg import remove
-        except Exception:
+            cache = get_cache()
+            kind = f"nobg-{REMBG_GARMENT_MODEL}.webp"
+            output_bytes = cache.get_bytes(image.digest, kind)
+            if output_bytes is not None:
+                return DecodedImage.from_bytes(output_bytes, max_side=None)
+            cutout = compact_cut_out(cut_out(image, model=REMBG_GARMENT_MODEL))
+            cache.put_bytes(image.digest, kind, cutout.data)
+            return cutout
+        except ImportError:
             logger.warning("rembg is unavailable; skipping background removal.")
             return None
-        try:
-            input_bytes = image_file.read()
-            output_bytes = remove(input_bytes)
-            return output_bytes
         except Exception:
             logger.exception("Background removal failed.")
             return None
@@ -152,62 +230,428 @@ class GarmentService:
                 qs = qs.filter(filter_query)
         return qs
 
+    ANALYSIS_FIELDS = [
+        "category", "color_hex", *Garment.DERIVED_FIELDS, "detected_material", "name", "embedding",
+        "analyzer_version", "ai_status",
+    ]
+    AI_FIELDS = ANALYSIS_FIELDS + ["fabric_type", "stage"]
+
+    @staticmethod
+    def _cached_analyses(garments, images=None):
+        """
+        analyze_garments for the garments' images, reusing results cached
+        under each image's content hash. Only cache misses reach the models.
+        `images` optionally maps garment id to the DecodedImage of its stored
+        file, which is then analysed without reading the file back.
+        """
+        cache = get_cache()
+        kind = f"analysis-v{ANALYZER_VERSION}.json"
+        images = images or {}
+        results = [None] * len(garments)
+        digests = [None] * len(garments)
+        misses = []
+        for i, garment in enumerate(garments):
+            if garment.id in images:
+                digests[i] = images[garment.id].digest
+            else:
+                try:
+                    with garment.image.open("rb") as handle:
+                        digests[i] = file_hash(handle)
+                except Exception:
+                    logger.warning("Could not read image for garment %s", garment.id)
+                    continue
+            cached = cache.get_json(digests[i], kind)
+            if cached is not None:
+                results[i] = cached
+            else:
+                misses.append(i)
+
+        if misses:
+            try:
+                analyses = analyze_garments(
+                    [images.get(garments[i].id) or garments[i].image.path for i in misses]
+                )
+            except Exception:
+                logger.exception("Garment AI analysis failed.")
+                analyses = [None] * len(misses)
+            for i, ai_data in zip(misses, analyses):
+                results[i] = ai_data
+                # Fallback results (no CLIP) are not worth keeping.
+                if ai_data is not None and ai_data.get("embedding") is not None:
+                    entry = dict(ai_data, embedding=np.asarray(ai_data["embedding"]).tolist())
+                    cache.put_json(digests[i], kind, entry)
+        return results
+
+    @staticmethod
+    def _apply_analysis(garment, ai_data):
+        """Copies one analyze_garments result onto the garment (no save)."""
+        if ai_data is None:
+            garment.ai_status = "failed"
+            return
+        normalized = GarmentService._normalize_category(ai_data.get("category", ""))
+        garment.category = normalized or "Top"
+        garment.color_hex = ai_data.get("color_hex", "#FFFFFF")
+        garment.detected_material = ai_data.get("detected_material", "Unknown")
+        garment.name = ai_data.get("name", "New Item")
+        # After every DERIVED_FROM field is set; weather flags read the name.
+        garment.refresh_derived_fields()
+        embedding = ai_data.get("embedding")
+        if embedding is not None:
+            garment.embedding = np.asarray(embedding, dtype=np.float16).tobytes()
+            # Fallback results (no CLIP) stay stale so reanalysis picks them up.
+            garment.analyzer_version = ANALYZER_VERSION
+        garment.ai_status = "complete"
+
     @staticmethod
     def _apply_ai_fields(garment_id):
-        garment = Garment.objects.filter(id=garment_id).first()
-        if not garment:
+        GarmentService._apply_ai_fields_batch([garment_id])
+
+    @staticmethod
+    def _apply_ai_fields_batch(garment_ids, images=None):
+        garments = list(Garment.objects.filter(id__in=garment_ids))
+        if not garments:
             return
-        try:
-            garment.ai_status = "processing"
-            garment.save(update_fields=["ai_status"])
-            ai_data = analyze_garment(garment.image.path)
-            normalized = GarmentService._normalize_category(ai_data.get("category", ""))
-            garment.category = normalized or "Top"
-            garment.color_hex = ai_data.get("color_hex", "#FFFFFF")
-            garment.detected_material = ai_data.get("detected_material", "Unknown")
-            garment.name = ai_data.get("name", "New Item")
+        Garment.objects.filter(id__in=[g.id for g in garments]).update(ai_status="processing")
+        results = GarmentService._cached_analyses(garments, images)
+
+        for garment, ai_data in zip(garments, results):
+            GarmentService._apply_analysis(garment, ai_data)
             if not garment.fabric_type:
                 garment.fabric_type = None
-            garment.ai_status = "complete"
-            garment.save()
+            garment.stage = "ready"
+        Garment.objects.bulk_update(garments, GarmentService.AI_FIELDS)
+        for owner_id in {g.owner_id for g in garments}:
+            bump_wardrobe_version(owner_id)
+
+    @staticmethod
+    def _save_thumbnails(image, base):
+        """
+        Stores WebP thumbnails of a DecodedImage and returns the value for
+        Garment.thumbnails ({} if encoding fails).
+        """
+        stored = {}
+        try:
+            for width, data in encode_thumbnails(image).items():
+                name = default_storage.save(f"thumbnails/{base}_{width}w.webp", ContentFile(data))
+                stored[str(width)] = name
         except Exception:
-            logger.exception("Garment AI analysis failed.")
-            garment.ai_status = "failed"
-            garment.save(update_fields=["ai_status"])
+            logger.exception("Thumbnail generation failed for %s.", base)
+        return stored
+
+    @staticmethod
+    def _cut_out_stored_image(garment):
+        """
+        Background-removal stage: decodes the stored raw upload once, swaps
+        in the cut-out and renders thumbnails (not saved). Returns the image
+        sized for analysis, or None if the file cannot be decoded. A garment
+        that already holds its cut-out (requeued after that step) only gets
+        its thumbnails rebuilt.
+        """
+        try:
+            with garment.image.open("rb") as handle:
+                decoded = DecodedImage.from_file(handle)
+        except Exception:
+            logger.warning("Could not decode image for garment %s", garment.id)
+            return None
+        base = os.path.splitext(os.path.basename(garment.image.name))[0]
+        if "_nobg" in base:
+            # Storage may have suffixed the name (x_nobg_AbC12); keep one "_nobg".
+            base = base.split("_nobg")[0] + "_nobg"
+            garment.thumbnails = GarmentService._save_thumbnails(decoded, base)
+            return decoded.shrink(ANALYSIS_IMAGE_SIZE)
+        cutout = GarmentService._remove_background(decoded)
+        if cutout is not None:
+            base = f"{base}_nobg"
+            garment.image.save(f"{base}.webp", ContentFile(cutout.data), save=False)
+            decoded = cutout
+        garment.thumbnails = GarmentService._save_thumbnails(decoded, base)
+        # Only the small view is kept for analysis; the full decode is dropped here.
+        return decoded.shrink(ANALYSIS_IMAGE_SIZE)
+
+    @staticmethod
+    def _process_uploads(garment_ids):
+        """
+        Upload pipeline job: background removal, then AI analysis. Each
+        garment's `stage` is saved as it advances, so clients show the raw
+        photo until its cut-out is stored. Anything that has not reached
+        "ready" when the job ends, by error or otherwise, is marked "failed";
+        requeue_uploads retries those and rows left behind by a restart.
+        """
+        garments = list(Garment.objects.filter(id__in=garment_ids).order_by("id"))
+        if not garments:
+            return
+        images = {}
+        analysed = []
+        try:
+            for garment in garments:
+                try:
+                    Garment.objects.filter(id=garment.id).update(stage="removing_background")
+                    raw_name = garment.image.name
+                    decoded = GarmentService._cut_out_stored_image(garment)
+                    if decoded is not None:
+                        images[garment.id] = decoded
+                    garment.stage = "analyzing"
+                    garment.save(update_fields=["image", "thumbnails", "stage"])
+                    if garment.image.name != raw_name:
+                        default_storage.delete(raw_name)
+                except Exception:
+                    logger.exception("Background removal failed for garment %s.", garment.id)
+                    continue
+                analysed.append(garment.id)
+            # One analysis batch per upload so CLIP sees the whole batch at once.
+            if analysed:
+                GarmentService._apply_ai_fields_batch(analysed, images)
+        except Exception:
+            logger.exception("Upload processing failed for garments %s.", garment_ids)
+        finally:
+            failed = Garment.objects.filter(id__in=[g.id for g in garments]).exclude(stage="ready")
+            if failed.update(stage="failed"):
+                for owner_id in {g.owner_id for g in garments}:
+                    bump_wardrobe_version(owner_id)
 
     @staticmethod
     def create_from_form(form, user):
         garment = form.save(commit=False)
         garment.owner = user
-        if garment.image:
-            output_bytes = GarmentService._remove_background(garment.image)
-            if output_bytes:
-                base = os.path.splitext(os.path.basename(garment.image.name))[0]
-                new_name = f"{base}_nobg.png"
-                garment.image.save(new_name, ContentFile(output_bytes), save=False)
+        garment.stage = "queued"
+        # The raw photo is stored as-is; rembg and CLIP run off the request path.
         garment.save()
-        submit_job(GarmentService._apply_ai_fields, garment.id)
+        submit_job(GarmentService._process_uploads, [garment.id])
         return garment
 
     @staticmethod
     def bulk_create_from_images(images, user, price, fabric_type=None):
-        created = 0
+        garment_ids = []
         for image in images:
-            processed = GarmentService._remove_background(image)
-            if processed:
-                base = os.path.splitext(os.path.basename(image.name))[0]
-                image = ContentFile(processed)
-                image.name = f"{base}_nobg.png"
             garment = Garment(
                 owner=user,
                 image=image,
                 purchase_price=price,
                 fabric_type=fabric_type or None,
+                stage="queued",
             )
             garment.save()
-            submit_job(GarmentService._apply_ai_fields, garment.id)
-            created += 1
-        return created
+            garment_ids.append(garment.id)
+        if garment_ids:
+            submit_job(GarmentService._process_uploads, garment_ids)
+        return len(garment_ids)
+
+
+class _PartFile(File):
+    """A finished part file; FileSystemStorage moves it instead of copying."""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+class UploadService:
+    """
+    Chunked, resumable garment uploads. Each chunk is streamed from the
+    request into a part file at its byte offset, so memory stays bounded by
+    the read block and a dropped connection only costs the unacknowledged
+    tail. A finished file becomes a queued Garment like any other upload.
+    """
+
+    READ_BLOCK = 64 * 1024
+
+    @staticmethod
+    def chunk_size():
+        return getattr(settings, "CHUNKED_UPLOAD_CHUNK_BYTES", 2 * 1024 * 1024)
+
+    @staticmethod
+    def max_size():
+        return getattr(settings, "CHUNKED_UPLOAD_MAX_BYTES", 40 * 1024 * 1024)
+
+    @staticmethod
+    def part_path(session):
+        directory = getattr(
+            settings, "CHUNKED_UPLOAD_DIR", os.path.join(settings.BASE_DIR, "cache", "uploads")
+        )
+        return os.path.join(directory, f"{session.id}.part")
+
+    @staticmethod
+    def start(user, fingerprint, filename, size, price, fabric_type=None):
+        """
+        Opens (or resumes) the session for one file. A fingerprint seen
+        before returns the existing session, with its offset or finished
+        garment, so restarted imports don't re-send anything. A finished
+        session whose garment has since been deleted or discarded starts
+        over, so re-importing the file creates a new garment.
+        """
+        session, created = UploadSession.objects.get_or_create(
+            owner=user,
+            fingerprint=fingerprint,
+            defaults={
+                "filename": os.path.basename(filename)[:255] or "upload",
+                "size": size,
+                "purchase_price": price,
+                "fabric_type": fabric_type or None,
+            },
+        )
+        gone = session.status == "complete" and not (
+            session.garment_id
+            and Garment.objects.filter(id=session.garment_id, is_active=True).exists()
+        )
+        if not created and (session.status == "failed" or session.size != size or gone):
+            UploadService._discard_part(session)
+            session.filename = os.path.basename(filename)[:255] or "upload"
+            session.size = size
+            session.received = 0
+            session.status = "uploading"
+            session.error_message = ""
+            session.garment = None
+            session.purchase_price = price
+            session.fabric_type = fabric_type or None
+            session.save(
+                update_fields=[
+                    "filename", "size", "received", "status", "error_message", "garment",
+                    "purchase_price", "fabric_type", "updated_at",
+                ]
+            )
+        return session
+
+    @staticmethod
+    def append(session, offset, stream, length):
+        """
+        Writes up to `length` bytes from `stream` at `offset`, which must equal
+        session.received. Bytes that made it to disk count even if the client
+        dropped mid-chunk. Returns the refreshed session.
+        """
+        path = UploadService.part_path(session)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        length = min(length, session.size - offset)
+        written = 0
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o600)
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                handle.seek(offset)
+                while written < length:
+                    block = stream.read(min(UploadService.READ_BLOCK, length - written))
+                    if not block:
+                        break
+                    handle.write(block)
+                    written += len(block)
+        finally:
+            # Only the writer that still holds the expected offset advances it.
+            if written:
+                UploadSession.objects.filter(
+                    id=session.id, status="uploading", received=offset
+                ).update(received=offset + written, updated_at=timezone.now())
+
+        session.refresh_from_db()
+        if session.status == "uploading" and session.received == session.size:
+            UploadService._complete(session)
+            session.refresh_from_db()
+        return session
+
+    @staticmethod
+    def _complete(session):
+        # Exactly one request gets to turn the part file into a garment.
+        claimed = UploadSession.objects.filter(id=session.id, status="uploading").update(
+            status="complete", updated_at=timezone.now()
+        )
+        if not claimed:
+            return
+        path = UploadService.part_path(session)
+        try:
+            with Image.open(path) as image:
+                image.verify()
+            with open(path, "rb") as handle:
+                garment = Garment(
+                    owner=session.owner,
+                    image=_PartFile(handle, name=session.filename),
+                    purchase_price=session.purchase_price,
+                    fabric_type=session.fabric_type or None,
+                    stage="queued",
+                )
+                garment.save()
+        except Exception as exc:
+            logger.warning("Upload %s could not be ingested: %s", session.id, exc)
+            UploadService._discard_part(session)
+            UploadSession.objects.filter(id=session.id).update(
+                status="failed", error_message=f"Not a readable image: {exc}"
+            )
+            return
+
+        UploadService._discard_part(session)
+        UploadSession.objects.filter(id=session.id).update(garment=garment)
+        submit_job(GarmentService._process_uploads, [garment.id])
+
+    @staticmethod
+    def _discard_part(session):
+        try:
+            os.remove(UploadService.part_path(session))
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    def purge_stale(older_than):
+        """Deletes unfinished sessions (and their part files) idle since `older_than`."""
+        stale = UploadSession.objects.exclude(status="complete").filter(updated_at__lt=older_than)
+        count = 0
+        for session in stale.iterator():
+            UploadService._discard_part(session)
+            session.delete()
+            count += 1
+        return count
+
+
+class SimilarityService:
+    """Nearest-neighbour lookups over stored garment embeddings."""
+
+    CACHE_TTL = 3600
+
+    @staticmethod
+    def _embedding_matrix(user):
+        """
+        Returns (ids, matrix) for the user's active garments that have an
+        embedding. Cached per wardrobe version, so repeat lookups skip the DB.
+        """
+        cache_key = f"embeddings:{user.id}:{get_wardrobe_version(user.id)}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        rows = (
+            Garment.objects.for_user(user)
+            .active()
+            .exclude(embedding=None)
+            .values_list("id", "embedding")
+        )
+        ids = []
+        vectors = []
+        for garment_id, blob in rows.iterator():
+            ids.append(garment_id)
+            vectors.append(np.frombuffer(bytes(blob), dtype=np.float16))
+        if vectors:
+            matrix = np.vstack(vectors).astype(np.float32)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        result = (np.asarray(ids, dtype=np.int64), matrix)
+        cache.set(cache_key, result, SimilarityService.CACHE_TTL)
+        return result
+
+    @staticmethod
+    def similar_items(user, garment, limit=8):
+        """
+        Returns [(garment_id, score)] for the most similar garments by cosine
+        similarity, best first, excluding the garment itself.
+        """
+        ids, matrix = SimilarityService._embedding_matrix(user)
+        if not garment.embedding or not len(ids):
+            return []
+
+        query = np.frombuffer(bytes(garment.embedding), dtype=np.float16).astype(np.float32)
+        # Embeddings are stored unit-length, so the dot product is the cosine.
+        scores = matrix @ query
+        scores[ids == garment.id] = -np.inf
+
+        k = min(limit, len(ids) - int((ids == garment.id).any()))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(ids[i]), float(scores[i])) for i in top]
 
 
 class DashboardService:
@@ -222,7 +666,7 @@ class DashboardService:
         total_value = 0
         for item in clothes:
             total_value += item.purchase_price or 0
-            is_match, reason = is_season_match(item.color_hex, profile.season)
+            is_match, reason = item.season_match(profile.season)
             item.is_match = is_match
             item.match_reason = reason
         season_details = get_season_details(profile.season)
@@ -265,6 +709,69 @@ class LocationService:
         return reverse_geocode_city(lat, lon)
 
 
+class WardrobeSnapshot:
+    """
+    Columnar view of a user's active garments holding only what the outfit
+    recommender reads. Cached per wardrobe version (bumped on every garment
+    save/delete), so repeat shuffles sample in memory without queries.
+    Positions index every column; garment(position) rebuilds an unsaved
+    Garment with the fields the outfit payloads use.
+    """
+
+    CACHE_TTL = 3600
+    FIELDS = [
+        "id", "name", "category", "image", "thumbnails", "color_hex", "season_mask",
+        "weather_flags", "fabric_type", "purchase_price", "wear_count", "last_worn",
+    ]
+    # Bump when the cached layout changes so old pickles are not reused.
+    LAYOUT = 2
+
+    def __init__(self, owner_id, rows):
+        self.owner_id = owner_id
+        self._rows = rows
+        self.ids = np.array([row["id"] for row in rows], dtype=np.int64)
+        self.names = [row["name"] for row in rows]
+        self.categories = np.array([row["category"] or "" for row in rows], dtype=object)
+        self.season_masks = np.array([row["season_mask"] for row in rows], dtype=np.int64)
+        self.weather_flags = np.array([row["weather_flags"] for row in rows], dtype=np.int64)
+        self.prices = np.array([float(row["purchase_price"] or 0) for row in rows], dtype=np.float64)
+        self.wear_counts = np.array([row["wear_count"] or 0 for row in rows], dtype=np.int64)
+        self.last_worn = np.array(
+            [row["last_worn"].toordinal() if row["last_worn"] else -1 for row in rows], dtype=np.int64
+        )
+        self._positions = {garment_id: i for i, garment_id in enumerate(self.ids.tolist())}
+
+    @classmethod
+    def for_user(cls, user):
+        cache_key = f"outfit_snapshot:{cls.LAYOUT}:{user.id}:{get_wardrobe_version(user.id)}"
+        snapshot = cache.get(cache_key)
+        if snapshot is None:
+            rows = list(
+                Garment.objects.for_user(user).active().order_by("id").values(*cls.FIELDS)
+            )
+            snapshot = cls(user.id, rows)
+            cache.set(cache_key, snapshot, cls.CACHE_TTL)
+        return snapshot
+
+    def __len__(self):
+        return len(self._rows)
+
+    def in_categories(self, categories):
+        """Positions of the garments whose category is in `categories`."""
+        return np.flatnonzero(np.isin(self.categories, list(categories)))
+
+    def position(self, garment_id):
+        try:
+            return self._positions.get(int(garment_id))
+        except (TypeError, ValueError):
+            return None
+
+    def garment(self, position):
+        if position is None:
+            return None
+        return Garment(owner_id=self.owner_id, **self._rows[position])
+
+
 class OutfitService:
     """Outfit selection logic for moods."""
 
@@ -274,163 +781,220 @@ class OutfitService:
         "Party": (["Top", "Layer", "Dress"], ["Bottom"]),
         "Casual": (["Top", "Layer", "Dress"], ["Bottom"]),
     }
+    # Upper bound for ?count= on the outfit API.
+    MAX_BATCH = 20
+    BATCH_DRAW_ROUNDS = 8
+
+    # (condition, WEATHER_* flag, multiplier), applied in order; 0 rules a garment out.
+    WEATHER_RULES = (
+        ("hot", WEATHER_OUTER_LAYER, 0),
+        ("hot", WEATHER_BREATHABLE, 1.5),
+        ("cold", WEATHER_SHORT, 0),
+        ("cold", WEATHER_WARM_FABRIC, 1.5),
+        ("cold", WEATHER_LAYER, 1.3),
+        ("rain", WEATHER_RAIN_SENSITIVE, 0),
+        ("rain", WEATHER_RAIN_READY, 1.4),
+        ("rain", WEATHER_DARK, 1.2),
+    )
 
     @staticmethod
-    def _weather_weight(item, weather_context):
+    def _weather_rules(weather_context):
+        """(flag, multiplier) pairs that apply in this weather."""
         if not weather_context:
-            return 1
-
+            return []
         temp = weather_context.get("temp_c")
         desc = (weather_context.get("description") or "").lower()
-        is_rain = any(word in desc for word in ["rain", "drizzle", "shower", "storm"])
+        active = {
+            "hot": temp is not None and temp > 30,
+            "cold": temp is not None and temp < 15,
+            "rain": any(word in desc for word in RAIN_WORDS),
+        }
+        return [
+            (flag, multiplier)
+            for condition, flag, multiplier in OutfitService.WEATHER_RULES
+            if active[condition]
+        ]
 
+    @staticmethod
+    def _weather_weight(flags, weather_context):
+        """Weather multiplier for one garment's weather_flags."""
         weight = 1
-        category_text = f"{item.category or ''} {item.name or ''}".lower()
-        fabric = (item.fabric_type or "").lower()
-
-        if temp is not None and temp > 30:
-            if any(word in category_text for word in ["blazer", "hoodie", "jacket", "coat", "layer", "sweater"]):
-                return 0
-            if "cotton" in fabric or "linen" in fabric:
-                weight *= 1.5
-
-        if temp is not None and temp < 15:
-            if any(word in category_text for word in ["short", "sleeveless", "tank"]):
-                return 0
-            if "wool" in fabric or "denim" in fabric:
-                weight *= 1.5
-            if "layer" in category_text:
-                weight *= 1.3
-
-        if is_rain:
-            if "suede" in fabric or "leather" in fabric:
-                return 0
-            if "polyester" in fabric or "nylon" in fabric or "synthetic" in fabric:
-                weight *= 1.4
-            if item.color_hex:
-                try:
-                    h = item.color_hex.lstrip("#")
-                    r, g, b = tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
-                    if (r + g + b) / 3 < 90:
-                        weight *= 1.2
-                except Exception:
-                    pass
-
+        for flag, multiplier in OutfitService._weather_rules(weather_context):
+            if flags & flag:
+                weight *= multiplier
         return weight
 
     @staticmethod
-    def _cpw_threshold(items):
-        values = []
-        for item in items:
-            if item.purchase_price and item.purchase_price > 0:
-                cpw = float(item.purchase_price) / max(1, item.wear_count or 0)
-                values.append(cpw)
-        if not values:
-            return None
-        values.sort()
-        idx = int(len(values) * 0.75)
-        idx = min(idx, len(values) - 1)
-        return values[idx]
+    def _weather_weights(flags, weather_context):
+        """_weather_weight over an array of weather_flags."""
+        weights = np.ones(len(flags))
+        for flag, multiplier in OutfitService._weather_rules(weather_context):
+            weights[(flags & flag) > 0] *= multiplier
+        return weights
 
     @staticmethod
-    def _weighted_choice(items, season, advanced=False, weather_context=None):
-        if not items:
-            return None
+    def _cpw(snapshot, positions):
+        return snapshot.prices[positions] / np.maximum(1, snapshot.wear_counts[positions])
 
-        today = timezone.localdate()
-        cpw_threshold = OutfitService._cpw_threshold(items) if advanced else None
-
-        eligible = []
-        weights = []
-        for item in items:
-            if advanced and item.last_worn:
-                days = (today - item.last_worn).days
-                if days <= 3:
-                    continue
-
-            weight = 1
-            if season and is_season_match(item.color_hex, season)[0]:
-                weight *= 3
-
-            if advanced:
-                weight *= OutfitService._weather_weight(item, weather_context)
-                if weight == 0:
-                    continue
+    @staticmethod
+    def _cpw_threshold(snapshot, positions):
+        """75th-percentile cost-per-wear of the priced garments among positions."""
+        priced = positions[snapshot.prices[positions] > 0]
+        if not len(priced):
+            return None
+        values = np.sort(OutfitService._cpw(snapshot, priced))
+        return values[min(int(len(values) * 0.75), len(values) - 1)]
 
-                if cpw_threshold:
-                    cpw = float(item.purchase_price or 0) / max(1, item.wear_count or 0)
-                    if cpw >= cpw_threshold:
-                        weight *= 5
+    @staticmethod
+    def _base_weights(snapshot, positions, season, advanced=False, weather_context=None):
+        """The date-independent part of _weights (season, weather, cost-per-wear)."""
+        match = (snapshot.season_masks[positions] & season_bit(season)) > 0
+        weights = np.where(match, 3.0, 1.0)
+        if advanced:
+            weights *= OutfitService._weather_weights(snapshot.weather_flags[positions], weather_context)
+            cpw_threshold = OutfitService._cpw_threshold(snapshot, positions)
+            if cpw_threshold:
+                weights[OutfitService._cpw(snapshot, positions) >= cpw_threshold] *= 5
+        return weights
 
-                if item.last_worn:
-                    days = (today - item.last_worn).days
-                    if days >= 180 and is_season_match(item.color_hex, season)[0]:
-                        weight *= 2
+    @staticmethod
+    def _recency_weights(snapshot, positions, season, day):
+        """Multiplier per position for wearing it on ``day``: resting (0) or long unworn (2)."""
+        match = (snapshot.season_masks[positions] & season_bit(season)) > 0
+        last_worn = snapshot.last_worn[positions]
+        days = day.toordinal() - last_worn
+        worn = last_worn >= 0
+        weights = np.ones(len(positions))
+        weights[worn & (days <= 3)] = 0
+        weights[worn & (days >= 180) & match] = 2
+        return weights
 
-            eligible.append(item)
-            weights.append(weight)
+    @staticmethod
+    def _weights(snapshot, positions, season, advanced=False, weather_context=None, day=None):
+        """Sampling weight per snapshot position (0 = not eligible on ``day``, default today)."""
+        weights = OutfitService._base_weights(snapshot, positions, season, advanced, weather_context)
+        if advanced:
+            weights *= OutfitService._recency_weights(snapshot, positions, season, day or timezone.localdate())
+        return weights
 
-        if not eligible:
-            eligible = items
-            weights = [1] * len(items)
+    @staticmethod
+    def _candidates(snapshot, positions, locked, season, advanced=False, weather_context=None):
+        """
+        (positions, probabilities) one side of an outfit is drawn from. A
+        locked garment is the only candidate; an empty side yields position
+        -1 (no garment). If nothing is eligible every garment is equally likely.
+        """
+        if locked is not None:
+            return np.array([locked]), np.ones(1)
+        if not len(positions):
+            return np.array([-1]), np.ones(1)
+        weights = OutfitService._weights(snapshot, positions, season, advanced, weather_context)
+        if not weights.any():
+            weights = np.ones(len(positions))
+        return positions, weights / weights.sum()
 
-        return random.choices(eligible, weights=weights, k=1)[0]
+    @staticmethod
+    def _sample_pairs(tops, bottoms, count):
+        """
+        Up to `count` distinct (top, bottom) position pairs. Keeping the first
+        occurrence of each pair from independent weighted draws is weighted
+        sampling without replacement, so weights are computed only once.
+        Heavily skewed weights may return fewer pairs than asked for.
+        """
+        top_positions, top_p = tops
+        bottom_positions, bottom_p = bottoms
+        target = min(count, np.count_nonzero(top_p) * np.count_nonzero(bottom_p))
+        rng = np.random.default_rng()
+        pairs = {}
+        for _ in range(OutfitService.BATCH_DRAW_ROUNDS):
+            need = target - len(pairs)
+            if need <= 0:
+                break
+            size = max(2 * need, 16)
+            drawn = zip(
+                rng.choice(top_positions, size=size, p=top_p).tolist(),
+                rng.choice(bottom_positions, size=size, p=bottom_p).tolist(),
+            )
+            for pair in drawn:
+                pairs.setdefault(pair, None)
+                if len(pairs) == target:
+                    break
+        return list(pairs)
 
     @staticmethod
     def generate_for_mood(
-        user, mood, locked_top_id=None, locked_bottom_id=None, advanced=False, weather_context=None
+        user,
+        mood,
+        locked_top_id=None,
+        locked_bottom_id=None,
+        advanced=False,
+        weather_context=None,
+        profile=None,
+        count=1,
     ):
-        profile = ProfileService.get_or_create(user)
+        """
+        `count` distinct outfits for the mood, listed under "outfits"; the
+        first one is also returned as top/bottom/guilt_messages.
+        """
+        profile = profile or ProfileService.get_or_create(user)
         top_cats, bot_cats = OutfitService.MOOD_RULES.get(
             mood, OutfitService.MOOD_RULES["Casual"]
         )
-        all_tops = list(Garment.objects.for_user(user).active().for_categories(top_cats))
-        all_bottoms = list(Garment.objects.for_user(user).active().for_categories(bot_cats))
-
-        locked_top = None
-        locked_bottom = None
-        if locked_top_id:
-            locked_top = (
-                Garment.objects.for_user(user).active().filter(id=locked_top_id).first()
-            )
-        if locked_bottom_id:
-            locked_bottom = (
-                Garment.objects.for_user(user).active().filter(id=locked_bottom_id).first()
-            )
-
-        selected_top = locked_top or OutfitService._weighted_choice(
-            all_tops, profile.season, advanced=advanced, weather_context=weather_context
+        # Sampling runs on the cached snapshot; no garment queries on a warm cache.
+        snapshot = WardrobeSnapshot.for_user(user)
+        all_tops = snapshot.in_categories(top_cats)
+        all_bottoms = snapshot.in_categories(bot_cats)
+
+        locked_top = snapshot.position(locked_top_id) if locked_top_id else None
+        locked_bottom = snapshot.position(locked_bottom_id) if locked_bottom_id else None
+
+        pairs = OutfitService._sample_pairs(
+            OutfitService._candidates(
+                snapshot, all_tops, locked_top, profile.season, advanced, weather_context
+            ),
+            OutfitService._candidates(
+                snapshot, all_bottoms, locked_bottom, profile.season, advanced, weather_context
+            ),
+            max(1, min(count, OutfitService.MAX_BATCH)),
         )
-        selected_bottom = locked_bottom or OutfitService._weighted_choice(
-            all_bottoms, profile.season, advanced=advanced, weather_context=weather_context
-        )
-        guilt_messages = {}
+
+        cpw_threshold = None
         if advanced:
-            cpw_threshold = OutfitService._cpw_threshold(all_tops + all_bottoms)
-
-            def _guilt(item):
-                if not item or not cpw_threshold:
-                    return None
-                cpw = float(item.purchase_price or 0) / max(1, item.wear_count or 0)
-                if cpw >= cpw_threshold:
-                    next_cpw = float(item.purchase_price or 0) / max(1, (item.wear_count or 0) + 1)
-                    return (
-                        f"This {item.name} costs you INR {cpw:.0f} per wear now. "
-                        f"Wear it today to bring it down to INR {next_cpw:.0f}."
-                    )
+            cpw_threshold = OutfitService._cpw_threshold(
+                snapshot, np.concatenate([all_tops, all_bottoms])
+            )
+
+        def _guilt(position):
+            if position is None or not cpw_threshold:
                 return None
+            price = snapshot.prices[position]
+            wears = int(snapshot.wear_counts[position])
+            cpw = price / max(1, wears)
+            if cpw >= cpw_threshold:
+                next_cpw = price / max(1, wears + 1)
+                return (
+                    f"This {snapshot.names[position]} costs you INR {cpw:.0f} per wear now. "
+                    f"Wear it today to bring it down to INR {next_cpw:.0f}."
+                )
+            return None
 
-            guilt_messages["top"] = _guilt(selected_top)
-            guilt_messages["bottom"] = _guilt(selected_bottom)
+        outfits = []
+        for top, bottom in pairs:
+            top = top if top >= 0 else None
+            bottom = bottom if bottom >= 0 else None
+            outfits.append({
+                "top": snapshot.garment(top),
+                "bottom": snapshot.garment(bottom),
+                "guilt_messages": {"top": _guilt(top), "bottom": _guilt(bottom)} if advanced else {},
+            })
 
         return {
             "mood": mood,
             "profile": profile,
-            "top": selected_top,
-            "bottom": selected_bottom,
-            "locked_top": locked_top,
-            "locked_bottom": locked_bottom,
-            "guilt_messages": guilt_messages,
+            **outfits[0],
+            "outfits": outfits,
+            "locked_top": snapshot.garment(locked_top),
+            "locked_bottom": snapshot.garment(locked_bottom),
         }
 
     @staticmethod
@@ -461,14 +1025,57 @@ class TryOnService:
     """Virtual try-on orchestration with file handling."""
 
     @staticmethod
-    def _apply_item(current_image_source, garment, category):
-        color_name = get_color_name(garment.color_hex)
+    def clean_body_image(profile):
+        """
+        Path of the profile's body photo with the background removed, built
+        once per source photo. The derived file is keyed by the photo's hash,
+        so replacing full_body_image invalidates it. Returns None when the
+        photo can't be cleaned (DISABLE_REMBG, rembg missing or failing).
+        """
+        if isinstance(profile, int):
+            profile = UserProfile.objects.filter(id=profile).first()
+        if not profile or not profile.full_body_image:
+            return None
+        if os.getenv("DISABLE_REMBG", "").lower() in {"1", "true", "yes"}:
+            return None
+        try:
+            with profile.full_body_image.open("rb") as handle:
+                source_bytes = handle.read()
+            digest = content_hash(source_bytes)
+            if (
+                digest == profile.body_clean_source_hash
+                and profile.body_clean_image
+                and default_storage.exists(profile.body_clean_image.name)
+            ):
+                return profile.body_clean_image.path
+
+            cleaned = clean_human_image(source_bytes)
+            stale_name = profile.body_clean_image.name if profile.body_clean_image else None
+            profile.body_clean_image.save(
+                f"body_{profile.user_id}_{digest[:12]}.jpg", ContentFile(cleaned), save=False
+            )
+            profile.body_clean_source_hash = digest
+            profile.save(update_fields=["body_clean_image", "body_clean_source_hash"])
+            if stale_name and stale_name != profile.body_clean_image.name:
+                default_storage.delete(stale_name)
+            return profile.body_clean_image.path
+        except ImportError:
+            logger.warning("rembg is unavailable; using the raw body photo.")
+            return None
+        except Exception:
+            logger.exception("Could not clean the body photo.")
+            return None
+
+    @staticmethod
+    def _apply_item(current_image_source, garment, category, clean_background=True):
+        color_name = garment.color_name
         detailed_desc = f"{color_name} {garment.name}".strip()
         return generate_tryon(
             current_image_source,
             garment.image.path,
             category=category,
             description=detailed_desc,
+            clean_background=clean_background,
         )
 
     @staticmethod
@@ -477,13 +1084,17 @@ class TryOnService:
         if not profile.full_body_image:
             return {"status": "error", "message": "Please upload a full body photo first!"}
 
-        current_image_source = profile.full_body_image.path
+        clean_path = TryOnService.clean_body_image(profile)
+        current_image_source = clean_path or profile.full_body_image.path
+        # Only the raw local photo still needs rembg; results come back as URLs.
+        clean_background = clean_path is None
 
         if top_id:
             top = Garment.objects.for_user(user).active().filter(id=top_id).first()
             if top:
                 result_url = TryOnService._apply_item(
-                    current_image_source, top, category="upper_body"
+                    current_image_source, top, category="upper_body",
+                    clean_background=clean_background,
                 )
                 if result_url:
                     current_image_source = result_url
@@ -492,7 +1103,8 @@ class TryOnService:
             bottom = Garment.objects.for_user(user).active().filter(id=bottom_id).first()
             if bottom:
                 result_url = TryOnService._apply_item(
-                    current_image_source, bottom, category="lower_body"
+                    current_image_source, bottom, category="lower_body",
+                    clean_background=clean_background,
                 )
                 if result_url:
                     current_image_source = result_url
@@ -631,6 +1243,138 @@ class ScheduleService:
             logger.exception("Schedule outfit failed.")
             return {"status": "error", "message": str(exc)}
 
+    # Longest range plan_range fills in one call.
+    MAX_PLAN_DAYS = 31
+    # Each earlier use of a garment in the plan scales its weight by this.
+    PLAN_REUSE_DECAY = 0.25
+    PLAN_DRAW_TRIES = 16
+
+    @staticmethod
+    def plan_range(user, start_date, end_date, mood="Casual", notify_on_day=True):
+        """
+        Fills every unscheduled day from start_date to end_date (inclusive)
+        with a generated outfit, in one pass over the wardrobe snapshot.
+        Each day is weighted for its forecast weather (days past the
+        forecast plan without weather). Garments already used in the plan
+        are down-weighted and a top/bottom pair is not repeated while
+        unused pairs turn up. All rows are written with one bulk_create.
+        Unlike /api/outfit/, weather applies whether or not the advanced
+        stylist is on; the other advanced rules (recent wear, cost per
+        wear) still follow it.
+        """
+        if not start_date or not end_date:
+            return {"status": "error", "message": "Please select a date range."}
+        if start_date < timezone.localdate():
+            return {"status": "error", "message": "Start date must be today or later."}
+        if end_date < start_date:
+            return {"status": "error", "message": "End date must be on or after the start date."}
+        days = (end_date - start_date).days + 1
+        if days > ScheduleService.MAX_PLAN_DAYS:
+            return {
+                "status": "error",
+                "message": f"Plan at most {ScheduleService.MAX_PLAN_DAYS} days at a time.",
+            }
+
+        profile = ProfileService.get_or_create(user)
+        top_cats, bot_cats = OutfitService.MOOD_RULES.get(
+            mood, OutfitService.MOOD_RULES["Casual"]
+        )
+        snapshot = WardrobeSnapshot.for_user(user)
+        tops = snapshot.in_categories(top_cats)
+        bottoms = snapshot.in_categories(bot_cats)
+        if not len(tops) and not len(bottoms):
+            return {"status": "error", "message": "Add some tops or bottoms to plan outfits."}
+
+        taken = set(
+            ScheduledOutfit.objects.for_user(user)
+            .filter(scheduled_date__range=(start_date, end_date))
+            .values_list("scheduled_date", flat=True)
+        )
+        forecast = get_weather_forecast(profile.city)
+        advanced = getattr(settings, "ADVANCED_STYLIST_ENABLED", False) and profile.advanced_stylist_enabled
+        # Recency is measured from each scheduled date, so it is applied per day below.
+        base_top = OutfitService._base_weights(snapshot, tops, profile.season, advanced)
+        base_bottom = OutfitService._base_weights(snapshot, bottoms, profile.season, advanced)
+
+        by_weather = {}
+
+        def _day_weights(weather):
+            key = (weather or {}).get("temp_c"), (weather or {}).get("description")
+            if key not in by_weather:
+                by_weather[key] = (
+                    base_top * OutfitService._weather_weights(snapshot.weather_flags[tops], weather),
+                    base_bottom * OutfitService._weather_weights(snapshot.weather_flags[bottoms], weather),
+                )
+            return by_weather[key]
+
+        rng = np.random.default_rng()
+
+        def _draw(weights):
+            if not len(weights):
+                return -1
+            if not weights.any():
+                weights = np.ones(len(weights))
+            return int(rng.choice(len(weights), p=weights / weights.sum()))
+
+        top_uses = np.zeros(len(tops))
+        bottom_uses = np.zeros(len(bottoms))
+        used_pairs = set()
+        schedules = []
+        for offset in range(days):
+            scheduled_date = start_date + timedelta(days=offset)
+            if scheduled_date in taken:
+                continue
+            top_w, bottom_w = _day_weights(forecast.get(scheduled_date.isoformat()))
+            if advanced:
+                top_w = top_w * OutfitService._recency_weights(snapshot, tops, profile.season, scheduled_date)
+                bottom_w = bottom_w * OutfitService._recency_weights(snapshot, bottoms, profile.season, scheduled_date)
+            top_w = top_w * ScheduleService.PLAN_REUSE_DECAY ** top_uses
+            bottom_w = bottom_w * ScheduleService.PLAN_REUSE_DECAY ** bottom_uses
+            # Keeps the last draw if every try repeats a pair (tiny wardrobes).
+            for _ in range(ScheduleService.PLAN_DRAW_TRIES):
+                top, bottom = pair = _draw(top_w), _draw(bottom_w)
+                if pair not in used_pairs:
+                    break
+            used_pairs.add(pair)
+            if top >= 0:
+                top_uses[top] += 1
+            if bottom >= 0:
+                bottom_uses[bottom] += 1
+            schedules.append(
+                ScheduledOutfit(
+                    owner=user,
+                    top=snapshot.garment(tops[top]) if top >= 0 else None,
+                    bottom=snapshot.garment(bottoms[bottom]) if bottom >= 0 else None,
+                    scheduled_date=scheduled_date,
+                    source="ai",
+                    notify_on_day=notify_on_day,
+                )
+            )
+
+        with transaction.atomic():
+            # The snapshot may predate a delete/discard elsewhere; drop any
+            # garment that is gone (locked until commit) rather than fail the FK.
+            chosen = {schedule.top_id for schedule in schedules} | {schedule.bottom_id for schedule in schedules}
+            live = set(
+                Garment.objects.for_user(user).active()
+                .filter(id__in=chosen - {None})
+                .select_for_update()
+                .values_list("id", flat=True)
+            )
+            for schedule in schedules:
+                if schedule.top_id not in live:
+                    schedule.top = None
+                if schedule.bottom_id not in live:
+                    schedule.bottom = None
+            schedules = [schedule for schedule in schedules if schedule.top_id or schedule.bottom_id]
+            ScheduledOutfit.objects.bulk_create(schedules)
+        return {
+            "status": "success",
+            "message": f"Planned {len(schedules)} day(s).",
+            "schedules": schedules,
+            "skipped": sorted(taken),
+        }
+
     @staticmethod
     def todays_schedule(user):
         today = timezone.localdate()
@@ -756,6 +1500,9 @@ class SustainabilityEngine:
                 wear_count=F("wear_count") + 1,
                 last_worn=timezone.localdate(),
             )
+            # After commit, or a reader could cache the old rows under the new version.
+            owner_id = garment.owner_id
+            transaction.on_commit(lambda: bump_wardrobe_version(owner_id))
             garment.refresh_from_db(fields=["wear_count", "last_worn", "purchase_price"])
 
             points_earned = SustainabilityEngine.POINTS_PER_WEAR
@@ -791,6 +1538,8 @@ class SustainabilityEngine:
                 is_active=False,
                 disposal_method=normalized,
             )
+            owner_id = garment.owner_id
+            transaction.on_commit(lambda: bump_wardrobe_version(owner_id))
 
             if normalized == "Donated":
                 points = SustainabilityEngine.POINTS_DONATION
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .helpers import bump_wardrobe_version
+from .models import Garment
+
+
+@receiver(post_save, sender=Garment)
+@receiver(post_delete, sender=Garment)
+def garment_changed(sender, instance, **kwargs):
+    bump_wardrobe_version(instance.owner_id)
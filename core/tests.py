@@ -1,9 +1,59 @@
+import importlib.util
+import io
 import json
+import os
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from unittest import mock, skipUnless
 
+import numpy as np
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
 
-from .models import UserProfile
+from . import colors, inference, utils
+from .benchmarks import sample_garment_images
+from .clip_backends import CLIP_ONNX_DIR, load_backend
+from .content_cache import ContentCache, content_hash
+from .helpers import get_weather_forecast
+from .imaging import DecodedImage
+from .management.commands.reanalyze_wardrobe import Command as ReanalyzeCommand
+from .models import Garment, ScheduledOutfit, UserProfile
+from .reference import WEATHER_SAMPLES, legacy_color_name, legacy_weather_weight, sample_garments
+from .services import (
+    GarmentService,
+    OutfitService,
+    ProfileService,
+    ScheduleService,
+    SustainabilityEngine,
+    TryOnService,
+    WardrobeSnapshot,
+)
+from .utils import (
+    ANALYZER_VERSION,
+    CANDIDATE_CATEGORIES,
+    CANDIDATE_PATTERNS,
+    CLIP_PROMPT_TEMPLATE,
+    _classify,
+    analyze_garments,
+    extract_colors,
+    get_dominant_color_hex,
+    remove_background,
+)
+from .workers import Checkpoint
+
+
+def _garment_queries(captured):
+    """Queries on the garment table, leaving out the (database) cache."""
+    return [query for query in captured.captured_queries if "core_garment" in query["sql"]]
 
 
 class ProfileApiTests(TestCase):
@@ -21,3 +71,837 @@ class ProfileApiTests(TestCase):
         self.assertEqual(response.status_code, 200)
         profile = UserProfile.objects.get(user=self.user)
         self.assertEqual(profile.skin_undertone, "Warm")
+
+    def test_season_analysis_runs_in_background_and_reuses_measurements(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        buffer = io.BytesIO()
+        Image.new("RGB", (60, 60), (180, 140, 120)).save(buffer, format="JPEG")
+        buffer.name = "selfie.jpg"
+        buffer.seek(0)
+        measurements = {"skin_val": 120.0, "skin_sat": 120.0, "hair_val": 40.0, "contrast": 80.0}
+        with self.settings(MEDIA_ROOT=tmp.name, ANALYSIS_CACHE_DIR=os.path.join(tmp.name, "cache")), mock.patch(
+            "core.services.submit_job"
+        ) as submit, mock.patch("core.services.analyze_user_selfie", return_value=measurements) as scan:
+            response = self.client.post("/api/profile/", {"selfie": buffer, "skin_undertone": "Cool"})
+            self.assertEqual(response.json()["profile"]["analysis_status"], "pending")
+            scan.assert_not_called()
+            profile = UserProfile.objects.get(user=self.user)
+            submit.assert_called_once_with(ProfileService._run_season_analysis, profile.id)
+
+            ProfileService._run_season_analysis(profile.id)
+            profile.refresh_from_db()
+            self.assertEqual((profile.season, profile.analysis_status), ("Winter", "complete"))
+
+            self.client.post("/api/profile/", {"skin_undertone": "Warm"})
+            ProfileService._run_season_analysis(profile.id)
+
+        profile.refresh_from_db()
+        self.assertEqual((profile.season, profile.analysis_status), ("Spring", "complete"))
+        self.assertEqual(scan.call_count, 1)
+
+
+class GarmentAnalysisTests(TestCase):
+    def test_classify_picks_best_of_each_label_set(self):
+        n_labels = len(CANDIDATE_CATEGORIES) + len(CANDIDATE_PATTERNS)
+        label_embeddings = np.eye(n_labels, dtype=np.float32)
+        image = np.zeros((1, n_labels), dtype=np.float32)
+        image[0, CANDIDATE_CATEGORIES.index("Skirt")] = 0.3
+        image[0, CANDIDATE_CATEGORIES.index("Shirt")] = 0.1
+        image[0, len(CANDIDATE_CATEGORIES) + CANDIDATE_PATTERNS.index("Floral Pattern")] = 0.4
+        self.assertEqual(
+            _classify(image, label_embeddings), [("Skirt", "Floral Pattern")]
+        )
+
+    def test_batch_analysis_keeps_order_and_flags_unreadable_images(self):
+        path = os.path.join(settings.MEDIA_ROOT, "wardrobe_images", "t.jpg")
+        results = analyze_garments([path, "/nonexistent/garment.jpg", path])
+        self.assertIsNone(results[1])
+        self.assertEqual(results[0], results[2])
+        self.assertTrue(results[0]["color_hex"].startswith("#"))
+
+
+class SimilarGarmentsApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass1234")
+        self.client.force_login(self.user)
+
+    def _garment(self, vector, owner=None):
+        vector = np.asarray(vector, dtype=np.float32)
+        vector /= np.linalg.norm(vector)
+        return Garment.objects.create(
+            owner=owner or self.user,
+            image="wardrobe_images/t.jpg",
+            embedding=vector.astype(np.float16).tobytes(),
+        )
+
+    def test_similar_returns_nearest_owned_garments(self):
+        query = self._garment([1, 0, 0])
+        near = self._garment([0.9, 0.1, 0])
+        far = self._garment([0, 0, 1])
+        other = User.objects.create_user(username="other", password="pass1234")
+        self._garment([1, 0, 0], owner=other)
+
+        response = self.client.get(f"/api/garments/{query.id}/similar/?limit=5")
+        self.assertEqual(response.status_code, 200)
+        ids = [item["id"] for item in response.json()["garments"]]
+        self.assertEqual(ids, [near.id, far.id])
+
+
+class InferenceServerTests(SimpleTestCase):
+    def test_requests_round_trip_over_the_socket(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "inference.sock")
+            worker = inference.InferenceWorker(batch_window=0.001)
+            worker.start()
+            server = inference.InferenceServer(path, worker)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                image_path = os.path.join(settings.MEDIA_ROOT, "wardrobe_images", "t.jpg")
+                with mock.patch.dict(os.environ, {"INFERENCE_SOCKET": path}):
+                    color = inference.request("dominant_color", path=image_path)
+                    with self.assertRaises(RuntimeError):
+                        inference.request("unknown_op")
+                self.assertEqual(color, get_dominant_color_hex(image_path))
+            finally:
+                server.shutdown()
+                server.server_close()
+
+    def test_missing_socket_is_reported_as_unavailable(self):
+        with mock.patch.dict(os.environ, {"INFERENCE_SOCKET": "/nonexistent/inference.sock"}):
+            with self.assertRaises(inference.InferenceUnavailable):
+                inference.request("dominant_color", path="unused.jpg")
+
+
+def _onnx_parity_available():
+    return (
+        importlib.util.find_spec("torch") is not None
+        and importlib.util.find_spec("onnxruntime") is not None
+        and os.path.exists(os.path.join(CLIP_ONNX_DIR, "vision.int8.onnx"))
+    )
+
+
+@skipUnless(_onnx_parity_available(), "needs torch, onnxruntime and `manage.py export_clip_onnx`")
+class ClipBackendParityTests(SimpleTestCase):
+    """Category/pattern labels from the ONNX backends against the torch path."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.images = [Image.open(path).convert("RGB") for path in sample_garment_images(16)]
+        cls.prompts = [
+            CLIP_PROMPT_TEMPLATE.format(label)
+            for label in CANDIDATE_CATEGORIES + CANDIDATE_PATTERNS
+        ]
+        cls.reference = cls._labels(load_backend("torch"))
+
+    @classmethod
+    def _labels(cls, backend):
+        return _classify(backend.encode_images(cls.images), backend.encode_texts(cls.prompts))
+
+    def test_onnx_labels_match_torch(self):
+        self.assertEqual(self._labels(load_backend("onnx")), self.reference)
+
+    def test_int8_labels_match_torch(self):
+        # Quantization may flip a near-tie; require agreement on 90% of the corpus.
+        labels = self._labels(load_backend("onnx-int8"))
+        agreement = sum(a == b for a, b in zip(labels, self.reference)) / len(labels)
+        self.assertGreaterEqual(agreement, 0.9)
+
+
+class ColorExtractionTests(SimpleTestCase):
+    def test_transparent_background_is_ignored(self):
+        image = Image.new("RGBA", (400, 400), (0, 0, 0, 0))
+        image.paste((200, 30, 40, 255), (150, 150, 250, 250))
+        image.paste((20, 20, 160, 255), (150, 250, 250, 280))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "cutout_nobg.png")
+            image.save(path)
+            colors = extract_colors(path, palette_size=3)
+
+        self.assertEqual(colors["dominant"], "#c81e28")
+        self.assertEqual([hex_code for hex_code, _ in colors["palette"]], ["#c81e28", "#1414a0"])
+
+
+class ContentCacheTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def test_lru_eviction_keeps_recently_used_entries(self):
+        cache = ContentCache(self.tmp.name, max_bytes=250)
+        cache.put_bytes("a" * 64, "bin", b"x" * 100)
+        cache.put_bytes("b" * 64, "bin", b"x" * 100)
+        old = os.path.getmtime(cache._path("b" * 64, "bin")) - 60
+        os.utime(cache._path("a" * 64, "bin"), (old, old))
+        self.assertIsNotNone(cache.get_bytes("a" * 64, "bin"))  # touch "a"
+        cache.put_bytes("c" * 64, "bin", b"x" * 100)
+
+        self.assertIsNotNone(cache.get_bytes("a" * 64, "bin"))
+        self.assertIsNone(cache.get_bytes("b" * 64, "bin"))
+        self.assertIsNotNone(cache.get_bytes("c" * 64, "bin"))
+
+    def test_writes_walk_the_directory_only_past_the_budget(self):
+        cache = ContentCache(self.tmp.name, max_bytes=1000)
+        with mock.patch("core.content_cache.os.walk", wraps=os.walk) as walk:
+            for i in range(9):
+                cache.put_bytes(f"{i:064x}", "bin", b"x" * 100)
+            self.assertEqual(walk.call_count, 1)  # first write in this process
+            cache.put_bytes("f" * 64, "bin", b"x" * 200)
+            self.assertEqual(walk.call_count, 2)
+            # Trimmed to 90% of the budget, so the next small write doesn't walk.
+            cache.put_bytes("e" * 64, "bin", b"x" * 10)
+            self.assertEqual(walk.call_count, 2)
+        sizes = [
+            os.path.getsize(os.path.join(root, name))
+            for root, _, names in os.walk(self.tmp.name)
+            for name in names
+        ]
+        self.assertLessEqual(sum(sizes), 1000)
+
+    def test_repeat_analysis_of_same_image_skips_models(self):
+        user = User.objects.create_user(username="tester", password="pass1234")
+        first = Garment.objects.create(owner=user, image="wardrobe_images/t.jpg")
+        second = Garment.objects.create(owner=user, image="wardrobe_images/t.jpg")
+        analysis = {
+            "category": "Shirt",
+            "color_hex": "#112233",
+            "detected_material": "Plain Solid Color Fabric",
+            "name": "Solid Shirt",
+            "embedding": np.ones(4, dtype=np.float32) / 2,
+        }
+        with self.settings(ANALYSIS_CACHE_DIR=self.tmp.name), mock.patch(
+            "core.services.analyze_garments", return_value=[analysis]
+        ) as analyze:
+            GarmentService._apply_ai_fields(first.id)
+            GarmentService._apply_ai_fields(second.id)
+
+        self.assertEqual(analyze.call_count, 1)
+        second.refresh_from_db()
+        self.assertEqual((second.category, second.color_hex), ("Top", "#112233"))
+        self.assertEqual(second.ai_status, "complete")
+
+
+class ReanalyzeWardrobeTests(TestCase):
+    def test_only_clip_results_clear_stale_rows(self):
+        user = User.objects.create_user(username="tester", password="pass1234")
+        stale = [
+            Garment.objects.create(owner=user, image="wardrobe_images/t.jpg", category="Shirt")
+            for _ in range(2)
+        ]
+        fallback = {"category": "Top", "color_hex": "#000000", "name": "Top", "embedding": None}
+        clip = dict(fallback, category="Jeans", embedding=np.ones(4, dtype=np.float32) / 2)
+
+        command = ReanalyzeCommand()
+        (chunk,) = command._chunks(0, 10, 0)
+        with CaptureQueriesContext(connection) as queries:
+            updated, failed = command._write(chunk, [fallback, clip])
+        # Just the bulk_update; no deferred-field loads.
+        self.assertEqual(len(_garment_queries(queries)), 1)
+
+        self.assertEqual((updated, failed), (1, 1))
+        remaining = Garment.objects.stale_analysis(ANALYZER_VERSION)
+        self.assertEqual(list(remaining.values_list("id", "category")), [(stale[0].id, "Shirt")])
+
+
+class DecodedImageTests(SimpleTestCase):
+    def test_large_jpeg_is_decoded_once_at_bounded_size(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (4000, 3000), (90, 120, 30)).save(buffer, format="JPEG")
+        data = buffer.getvalue()
+
+        decoded = DecodedImage.from_bytes(data, max_side=2048)
+
+        self.assertLessEqual(max(decoded.size), 2048)
+        self.assertEqual(decoded.digest, content_hash(data))
+        self.assertEqual(max(decoded.view(512).size), 512)
+        self.assertIs(decoded.view(4096), decoded.image)
+
+    def test_analysis_accepts_decoded_images(self):
+        path = os.path.join(settings.MEDIA_ROOT, "wardrobe_images", "t.jpg")
+        with mock.patch.dict(os.environ, {"DISABLE_HF": "1"}):
+            from_path, from_decoded = analyze_garments([path, DecodedImage.open(path)])
+
+        self.assertEqual(from_path["color_hex"], from_decoded["color_hex"])
+
+
+class ThumbnailTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass1234")
+        self.client.force_login(self.user)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = tmp.name
+        os.makedirs(os.path.join(self.media, "wardrobe_images"))
+        Image.new("RGBA", (800, 1000), (200, 30, 40, 255)).save(
+            os.path.join(self.media, "wardrobe_images", "coat_nobg.png")
+        )
+
+    def test_backfill_exposes_srcset_in_wardrobe_api(self):
+        garment = Garment.objects.create(owner=self.user, image="wardrobe_images/coat_nobg.png")
+        with self.settings(MEDIA_ROOT=self.media):
+            call_command("generate_thumbnails", stdout=io.StringIO())
+            response = self.client.get("/api/wardrobe/")
+
+        garment.refresh_from_db()
+        self.assertEqual(sorted(garment.thumbnails, key=int), ["160", "320", "640"])
+        with Image.open(os.path.join(self.media, garment.thumbnails["320"])) as thumb:
+            self.assertEqual((thumb.format, thumb.size), ("WEBP", (320, 400)))
+        item = response.json()["garments"][0]
+        self.assertEqual(list(item["thumbnails"]), ["160", "320", "640"])
+        self.assertIn(" 640w", item["srcset"])
+
+
+class CompactCutoutTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass1234")
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = tmp.name
+        os.makedirs(os.path.join(self.media, "wardrobe_images"))
+        canvas = Image.new("RGBA", (800, 1000), (0, 0, 0, 0))
+        canvas.paste((200, 30, 40, 255), (300, 350, 500, 650))
+        canvas.save(os.path.join(self.media, "wardrobe_images", "coat_nobg.png"))
+
+    def test_png_cut_outs_are_trimmed_to_lossless_webp(self):
+        garment = Garment.objects.create(owner=self.user, image="wardrobe_images/coat_nobg.png")
+        with self.settings(MEDIA_ROOT=self.media):
+            call_command("compact_cutouts", stdout=io.StringIO())
+
+        garment.refresh_from_db()
+        self.assertEqual(garment.image.name, "wardrobe_images/coat_nobg.webp")
+        self.assertFalse(os.path.exists(os.path.join(self.media, "wardrobe_images", "coat_nobg.png")))
+        with Image.open(os.path.join(self.media, garment.image.name)) as image:
+            self.assertEqual((image.format, image.mode, image.size), ("WEBP", "RGBA", (208, 308)))
+            self.assertEqual(image.getpixel((104, 154)), (200, 30, 40, 255))
+        self.assertEqual(sorted(garment.thumbnails, key=int), ["160", "208"])
+
+
+class RembgSessionTests(SimpleTestCase):
+    def test_sessions_are_built_once_per_model(self):
+        fake_rembg = mock.Mock()
+        fake_rembg.new_session.side_effect = lambda name: f"session:{name}"
+        fake_rembg.remove.side_effect = lambda data, session: session.encode()
+        with mock.patch.dict(sys.modules, {"rembg": fake_rembg}), mock.patch.dict(
+            utils._rembg_sessions, clear=True
+        ):
+            self.assertEqual(remove_background(b"a", model="u2netp"), b"session:u2netp")
+            remove_background(b"b", model="u2netp")
+            self.assertEqual(remove_background(b"c", model="isnet"), b"session:isnet-general-use")
+            with self.assertRaises(ValueError):
+                remove_background(b"d", model="unknown")
+
+        self.assertEqual(fake_rembg.new_session.call_count, 2)
+
+
+class BackfillCheckpointTests(SimpleTestCase):
+    def test_checkpoint_only_resumes_under_same_settings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "nested", "rembg.json")
+            Checkpoint(path, model="u2netp").save(42)
+
+            self.assertEqual(Checkpoint(path, model="u2netp").load(), 42)
+            self.assertEqual(Checkpoint(path, model="u2netp").load(restart=True), 0)
+            self.assertEqual(Checkpoint(path, model="isnet").load(), 0)
+
+
+class UploadPipelineTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass1234")
+        self.client.force_login(self.user)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = tmp.name
+
+    def _upload(self):
+        buffer = io.BytesIO()
+        Image.new("RGB", (300, 400), (20, 90, 160)).save(buffer, format="JPEG")
+        buffer.name = "shirt.jpg"
+        buffer.seek(0)
+        return self.client.post(
+            "/api/add-item/", {"image": buffer, "purchase_price": "20", "fabric_type": "Cotton"}
+        )
+
+    def test_upload_returns_before_background_removal(self):
+        with self.settings(MEDIA_ROOT=self.media), mock.patch(
+            "core.services.submit_job"
+        ) as submit, mock.patch("core.services.cut_out") as cut:
+            response = self._upload()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["stage"], "queued")
+        cut.assert_not_called()
+        submit.assert_called_once_with(GarmentService._process_uploads, [response.json()["garment_id"]])
+
+    def test_pipeline_swaps_in_cut_out_then_analyses(self):
+        cutout = DecodedImage(Image.new("RGBA", (300, 400), (20, 90, 160, 255)))
+        analysis = {"category": "Shirt", "color_hex": "#145aa0", "name": "Solid Shirt", "embedding": None}
+        with self.settings(MEDIA_ROOT=self.media, ANALYSIS_CACHE_DIR=os.path.join(self.media, "cache")):
+            with mock.patch("core.services.submit_job"):
+                garment = Garment.objects.get(id=self._upload().json()["garment_id"])
+            raw_path = garment.image.path
+            with mock.patch("core.services.cut_out", return_value=cutout), mock.patch(
+                "core.services.analyze_garments", return_value=[analysis]
+            ) as analyze:
+                GarmentService._process_uploads([garment.id])
+
+        garment.refresh_from_db()
+        self.assertEqual((garment.stage, garment.ai_status), ("ready", "complete"))
+        self.assertTrue(garment.image.name.endswith("_nobg.webp"))
+        self.assertEqual(sorted(garment.thumbnails, key=int), ["160", "300"])
+        self.assertFalse(os.path.exists(raw_path))
+        # Analysis gets the in-memory cut-out rather than re-reading the file.
+        self.assertIsInstance(analyze.call_args.args[0][0], DecodedImage)
+
+    def test_failures_end_in_failed_stage_and_requeue_retries_them(self):
+        analysis = {"category": "Shirt", "color_hex": "#145aa0", "name": "Solid Shirt", "embedding": None}
+        with self.settings(MEDIA_ROOT=self.media, ANALYSIS_CACHE_DIR=os.path.join(self.media, "cache")):
+            with mock.patch("core.services.submit_job"):
+                broken, stuck = [self._upload().json()["garment_id"] for _ in range(2)]
+            with mock.patch.object(GarmentService, "_cut_out_stored_image", side_effect=OSError("disk full")):
+                GarmentService._process_uploads([broken])
+            self.assertEqual(Garment.objects.get(id=broken).stage, "failed")
+
+            # A restart mid-pipeline leaves a row that no job will pick up.
+            Garment.objects.filter(id=stuck).update(stage="removing_background")
+            out = io.StringIO()
+            cutout = DecodedImage(Image.new("RGBA", (300, 400), (20, 90, 160, 255)))
+            with mock.patch("core.services.cut_out", return_value=cutout), mock.patch(
+                "core.services.analyze_garments", return_value=[analysis]
+            ):
+                call_command("requeue_uploads", "--minutes", "0", stdout=out)
+            self.assertIn("requeued=1 ready=1", out.getvalue())
+            self.assertEqual(Garment.objects.get(id=stuck).stage, "ready")
+            self.assertEqual(Garment.objects.get(id=broken).stage, "failed")
+
+    def test_requeued_cut_out_is_not_segmented_again(self):
+        cutout = DecodedImage(Image.new("RGBA", (300, 400), (20, 90, 160, 255)))
+        analysis = {"category": "Shirt", "color_hex": "#145aa0", "name": "Solid Shirt", "embedding": None}
+        with self.settings(MEDIA_ROOT=self.media, ANALYSIS_CACHE_DIR=os.path.join(self.media, "cache")):
+            with mock.patch("core.services.submit_job"):
+                garment_id = self._upload().json()["garment_id"]
+            with mock.patch("core.services.cut_out", return_value=cutout), mock.patch(
+                "core.services.analyze_garments", return_value=[analysis]
+            ):
+                GarmentService._process_uploads([garment_id])
+            cut_name = Garment.objects.get(id=garment_id).image.name
+
+            # A restart during analysis leaves the cut-out stored.
+            Garment.objects.filter(id=garment_id).update(stage="analyzing")
+            with mock.patch("core.services.cut_out") as cut, mock.patch(
+                "core.services.analyze_garments", return_value=[analysis]
+            ):
+                call_command("requeue_uploads", "--minutes", "0", stdout=io.StringIO())
+
+        garment = Garment.objects.get(id=garment_id)
+        cut.assert_not_called()
+        self.assertEqual((garment.image.name, garment.stage), (cut_name, "ready"))
+        self.assertTrue(all("_nobg_nobg" not in name for name in garment.thumbnails.values()))
+
+
+class CleanBodyImageTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass1234")
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = tmp.name
+
+    def _set_body_photo(self, profile, color):
+        buffer = io.BytesIO()
+        Image.new("RGB", (60, 120), color).save(buffer, format="JPEG")
+        profile.full_body_image.save("body.jpg", ContentFile(buffer.getvalue()))
+
+    def test_cleaned_photo_is_reused_until_the_source_changes(self):
+        with self.settings(MEDIA_ROOT=self.media), mock.patch.dict(
+            os.environ, {"DISABLE_REMBG": ""}
+        ), mock.patch("core.services.clean_human_image", return_value=b"cleaned") as clean:
+            profile = UserProfile.objects.create(user=self.user)
+            self._set_body_photo(profile, (200, 50, 50))
+
+            first = TryOnService.clean_body_image(profile)
+            second = TryOnService.clean_body_image(UserProfile.objects.get(id=profile.id))
+            self.assertEqual(first, second)
+            self.assertEqual(clean.call_count, 1)
+
+            self._set_body_photo(profile, (50, 50, 200))
+            third = TryOnService.clean_body_image(profile)
+
+        self.assertEqual(clean.call_count, 2)
+        self.assertNotEqual(third, first)
+        self.assertFalse(os.path.exists(first))
+        with open(third, "rb") as handle:
+            self.assertEqual(handle.read(), b"cleaned")
+
+
+class ChunkedUploadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass1234")
+        self.client.force_login(self.user)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.media = tmp.name
+        buffer = io.BytesIO()
+        Image.new("RGB", (300, 400), (20, 90, 160)).save(buffer, format="JPEG")
+        self.photo = buffer.getvalue()
+
+    def _start(self, data):
+        return self.client.post(
+            "/api/uploads/",
+            {"fingerprint": "shirt.jpg:1", "filename": "shirt.jpg", "size": len(data), "bulk_price": "20"},
+        ).json()
+
+    def _put(self, upload_id, offset, chunk):
+        return self.client.put(
+            f"/api/uploads/{upload_id}/",
+            chunk,
+            content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_upload_resumes_from_server_offset(self):
+        uploads = os.path.join(self.media, "uploads")
+        with self.settings(MEDIA_ROOT=self.media, CHUNKED_UPLOAD_DIR=uploads), mock.patch(
+            "core.services.submit_job"
+        ) as submit:
+            state = self._start(self.photo)
+            upload_id = state["upload_id"]
+            self.assertEqual(state["offset"], 0)
+
+            half = len(self.photo) // 2
+            self.assertEqual(self._put(upload_id, 0, self.photo[:half]).json()["offset"], half)
+            # A retried chunk at a stale offset is refused with the real one.
+            stale = self._put(upload_id, 0, self.photo[:half])
+            self.assertEqual((stale.status_code, stale.json()["offset"]), (409, half))
+            # Restarting the import finds the same session instead of a new one.
+            self.assertEqual(self._start(self.photo)["offset"], half)
+
+            state = self._put(upload_id, half, self.photo[half:]).json()
+
+            self.assertEqual(state["upload_status"], "complete")
+            garment = Garment.objects.get(id=state["garment_id"])
+            with garment.image.open("rb") as handle:
+                self.assertEqual(handle.read(), self.photo)
+        self.assertEqual((garment.owner, garment.stage), (self.user, "queued"))
+        self.assertEqual(os.listdir(uploads), [])
+        submit.assert_called_once_with(GarmentService._process_uploads, [garment.id])
+
+    def test_reimport_after_discard_uploads_again(self):
+        with self.settings(MEDIA_ROOT=self.media, CHUNKED_UPLOAD_DIR=os.path.join(self.media, "uploads")):
+            with mock.patch("core.services.submit_job"):
+                state = self._start(self.photo)
+                first = self._put(state["upload_id"], 0, self.photo).json()["garment_id"]
+                self.assertEqual(self._start(self.photo)["upload_status"], "complete")
+
+                Garment.objects.filter(id=first).update(is_active=False)
+                state = self._start(self.photo)
+                self.assertEqual(
+                    (state["upload_status"], state["offset"], state["garment_id"]), ("uploading", 0, None)
+                )
+                second = self._put(state["upload_id"], 0, self.photo).json()["garment_id"]
+
+        self.assertNotEqual(second, first)
+        self.assertTrue(Garment.objects.get(id=second).is_active)
+
+    def test_non_image_upload_fails_without_garment(self):
+        with self.settings(MEDIA_ROOT=self.media, CHUNKED_UPLOAD_DIR=os.path.join(self.media, "uploads")):
+            state = self._start(b"not an image")
+            state = self._put(state["upload_id"], 0, b"not an image").json()
+
+        self.assertEqual(state["upload_status"], "failed")
+        self.assertIsNone(state["garment_id"])
+        self.assertFalse(Garment.objects.exists())
+
+
+class FaceDetectionTests(SimpleTestCase):
+    def test_detects_on_downscaled_copy_and_maps_box_back(self):
+        cascade = mock.Mock()
+        cascade.detectMultiScale.return_value = np.array([[10, 20, 50, 60]])
+        img = np.zeros((1920, 960, 3), dtype=np.uint8)
+        with mock.patch.object(utils, "_face_cascade", cascade), mock.patch.object(
+            utils, "FACE_DETECT_SIZE", 480
+        ):
+            self.assertIs(utils.get_face_cascade(), cascade)
+            box = utils.detect_face(img)
+
+        self.assertEqual(cascade.detectMultiScale.call_args.args[0].shape, (480, 240))
+        self.assertEqual(box, (40, 80, 200, 240))
+
+
+class SeasonMaskTests(TestCase):
+    def test_mask_decodes_to_is_season_match(self):
+        rng = np.random.default_rng(0)
+        colors = ["#{:02x}{:02x}{:02x}".format(*rgb) for rgb in rng.integers(0, 256, (500, 3))]
+        colors += ["#000000", "#ffffff", "#8a8a8a", "nothex", ""]
+        for color in colors:
+            mask = utils.season_mask(color)
+            for season in (*utils.SEASONS, "Unknown", None):
+                self.assertEqual(
+                    utils.season_match_from_mask(mask, season),
+                    utils.is_season_match(color, season),
+                    (color, season),
+                )
+
+    def test_mask_follows_color_and_filters_in_sql(self):
+        user = User.objects.create_user(username="tester", password="pass1234")
+        black = Garment.objects.create(owner=user, image="wardrobe_images/t.jpg", color_hex="#000000")
+        rust = Garment.objects.create(owner=user, image="wardrobe_images/t.jpg", color_hex="#c96a4a")
+        self.assertEqual(list(Garment.objects.matching_season("Winter")), [black])
+
+        black.color_hex = "#b7410e"
+        black.save(update_fields=["color_hex"])
+        black.refresh_from_db()
+        self.assertEqual(black.season_match("Autumn"), (True, "Warm Earth Tone"))
+        self.assertEqual(set(Garment.objects.matching_season("Autumn")), {black, rust})
+        self.assertFalse(Garment.objects.matching_season("Unknown").exists())
+
+
+class WardrobeColorFilterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass1234")
+        self.client.force_login(self.user)
+
+    def test_color_filter_and_paging_run_on_stored_groups(self):
+        colors = ["#c0392b", "#101010", "#2e86c1", "#e67e22", "#f5f5dc", "#d35400"]
+        for color in colors:
+            Garment.objects.create(owner=self.user, image="wardrobe_images/t.jpg", color_hex=color)
+        warm = Garment.objects.get(color_hex="#e67e22")
+        self.assertEqual(
+            (warm.color_r, warm.color_g, warm.color_b, warm.brightness, warm.color_name, warm.color_group),
+            (230, 126, 34, 130, "Orange", "Warm"),
+        )
+        self.assertEqual(Garment.objects.get(color_hex="#101010").color_group, "Dark")
+
+        with self.assertNumQueries(4):  # session + user, then COUNT and one LIMIT/OFFSET page
+            payload = self.client.get("/api/wardrobe/?color=Warm&limit=2&offset=1").json()
+        self.assertEqual(payload["total_count"], 3)
+        self.assertEqual([g["color_hex"] for g in payload["garments"]], ["#e67e22", "#d35400"])
+
+
+
+class OutfitSnapshotTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass1234")
+        self.profile = ProfileService.get_or_create(self.user)
+        self.shirt = Garment.objects.create(
+            owner=self.user, name="Shirt", category="Top", image="wardrobe_images/s.jpg",
+            color_hex="#2e86c1", purchase_price=900, wear_count=1, fabric_type="Cotton",
+        )
+        self.coat = Garment.objects.create(
+            owner=self.user, name="Coat", category="Layer", image="wardrobe_images/c.jpg",
+            color_hex="#101010", fabric_type="Wool",
+        )
+        self.jeans = Garment.objects.create(
+            owner=self.user, name="Jeans", category="Bottom", image="wardrobe_images/j.jpg",
+            color_hex="#1f3a5f", purchase_price=2000, wear_count=10,
+        )
+
+    def _generate(self, **kwargs):
+        return OutfitService.generate_for_mood(
+            self.user, "Casual", advanced=True, weather_context={"temp_c": 34, "description": "clear"},
+            profile=self.profile, **kwargs
+        )
+
+    def test_shuffles_sample_from_cached_snapshot(self):
+        self._generate()
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(5):
+                context = self._generate(locked_bottom_id=str(self.jeans.id))
+                # Too hot for the coat, so only the shirt is eligible.
+                self.assertEqual(context["top"].id, self.shirt.id)
+                self.assertEqual(context["bottom"].id, self.jeans.id)
+        self.assertEqual(_garment_queries(queries), [])
+        self.assertEqual(context["top"].thumbnail_urls, {})
+        self.assertIn("INR 900 per wear", context["guilt_messages"]["top"])
+
+    def test_garment_save_invalidates_snapshot(self):
+        self._generate()
+        self.shirt.category = "Bottom"
+        self.shirt.save()
+        with CaptureQueriesContext(connection) as queries:
+            context = self._generate()
+        self.assertEqual(len(_garment_queries(queries)), 1)
+        self.assertEqual(context["top"].id, self.coat.id)
+        self.assertIn(context["bottom"].id, {self.shirt.id, self.jeans.id})
+
+    def test_batch_returns_distinct_outfits_in_one_request(self):
+        Garment.objects.create(
+            owner=self.user, name="Chinos", category="Bottom", image="wardrobe_images/k.jpg",
+            color_hex="#c3b091",
+        )
+        self.client.force_login(self.user)
+        with mock.patch("core.views.WeatherService.get_context", return_value={}):
+            payload = self.client.get("/api/outfit/?count=50").json()
+        pairs = [(o["top"]["id"], o["bottom"]["id"]) for o in payload["outfits"]]
+        # 2 tops x 2 bottoms: asking for more than exist returns each once.
+        self.assertEqual(len(pairs), 4)
+        self.assertEqual(len(set(pairs)), 4)
+        self.assertEqual((payload["top"]["id"], payload["bottom"]["id"]), pairs[0])
+
+        context = self._generate(locked_bottom_id=str(self.jeans.id), count=3)
+        self.assertEqual(
+            [(o["top"].id, o["bottom"].id) for o in context["outfits"]],
+            [(self.shirt.id, self.jeans.id)],
+        )
+
+
+class PlanRangeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="tester", password="pass1234")
+        self.client.force_login(self.user)
+        for name, category in [
+            ("Shirt", "Top"), ("Tee", "Top"), ("Polo", "Top"), ("Coat", "Layer"),
+            ("Jeans", "Bottom"), ("Chinos", "Bottom"), ("Shorts", "Bottom"), ("Skirt", "Bottom"),
+        ]:
+            Garment.objects.create(
+                owner=self.user, name=name, category=category, image="wardrobe_images/g.jpg",
+                color_hex="#2e86c1",
+            )
+
+    def test_plans_distinct_outfits_for_forecast_in_one_insert(self):
+        start = timezone.localdate() + timedelta(days=1)
+        ScheduledOutfit.objects.create(owner=self.user, scheduled_date=start + timedelta(days=2))
+        hot = {"temp_c": 35, "description": "clear sky"}
+        forecast = {(start + timedelta(days=i)).isoformat(): hot for i in range(6)}
+        with mock.patch("core.services.get_weather_forecast", return_value=forecast):
+            payload = self.client.post(
+                "/api/schedules/plan/",
+                {"start": start.isoformat(), "end": (start + timedelta(days=5)).isoformat()},
+            ).json()
+
+        self.assertEqual(payload["status"], "success")
+        self.assertEqual(payload["skipped"], [(start + timedelta(days=2)).isoformat()])
+        items = payload["items"]
+        self.assertEqual(len(items), 5)
+        self.assertTrue(all(item["id"] for item in items))
+        self.assertEqual(len({(item["top_id"], item["bottom_id"]) for item in items}), 5)
+        # Too hot for the coat on every forecast day.
+        self.assertNotIn("Coat", {item["top"] for item in items})
+        self.assertEqual(ScheduledOutfit.objects.filter(owner=self.user).count(), 6)
+
+    def test_garments_gone_since_the_snapshot_are_left_out(self):
+        WardrobeSnapshot.for_user(self.user)
+        # A discard in another process; the cached snapshot still lists them.
+        Garment.objects.filter(category="Bottom").update(is_active=False)
+        start = timezone.localdate()
+        result = ScheduleService.plan_range(self.user, start, start + timedelta(days=3))
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(len(result["schedules"]), 4)
+        self.assertFalse(ScheduledOutfit.objects.filter(bottom__isnull=False).exists())
+        self.assertEqual(ScheduledOutfit.objects.filter(top__isnull=False).count(), 4)
+
+    @override_settings(ADVANCED_STYLIST_ENABLED=True)
+    def test_recency_is_measured_from_each_planned_day(self):
+        UserProfile.objects.update_or_create(user=self.user, defaults={"advanced_stylist_enabled": True})
+        today = timezone.localdate()
+        shirt = Garment.objects.get(name="Shirt")
+        Garment.objects.filter(id=shirt.id).update(last_worn=today)
+        snapshot = WardrobeSnapshot.for_user(self.user)
+        positions = np.array([snapshot.position(shirt.id)])
+        self.assertEqual(OutfitService._weights(snapshot, positions, "Summer", True)[0], 0)
+        later = today + timedelta(days=4)
+        self.assertGreater(OutfitService._weights(snapshot, positions, "Summer", True, day=later)[0], 0)
+
+        with mock.patch.object(
+            OutfitService, "_recency_weights", wraps=OutfitService._recency_weights
+        ) as recency:
+            ScheduleService.plan_range(self.user, today, later)
+        self.assertEqual(
+            {call.args[3] for call in recency.call_args_list},
+            {today + timedelta(days=i) for i in range(5)},
+        )
+
+    def test_rejects_ranges_in_the_past_or_too_long(self):
+        today = timezone.localdate()
+        for start, end in [
+            (today - timedelta(days=1), today),
+            (today, today + timedelta(days=ScheduleService.MAX_PLAN_DAYS)),
+        ]:
+            response = self.client.post(
+                "/api/schedules/plan/", {"start": start.isoformat(), "end": end.isoformat()}
+            )
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(ScheduledOutfit.objects.exists())
+
+    @override_settings(OPENWEATHER_API_KEY="test-key")
+    def test_forecast_rolls_slots_up_into_days(self):
+        def slot(utc, temp, desc):
+            dt = int(datetime.fromisoformat(utc + "+00:00").timestamp())
+            return {"dt": dt, "dt_txt": utc, "main": {"temp": temp}, "weather": [{"description": desc}]}
+
+        response = mock.Mock(status_code=200)
+        response.json.return_value = {"city": {"timezone": 19800}, "list": [
+            slot("2026-04-30 21:00:00", 28, "clear sky"),  # 02:30 on May 1st in IST
+            slot("2026-05-01 09:00:00", 34, "light rain"),
+            slot("2026-05-01 21:00:00", 12, "few clouds"),  # 02:30 on May 2nd
+        ]}
+        with mock.patch("core.helpers.requests.get", return_value=response):
+            forecast = get_weather_forecast("Pune")
+        self.assertEqual(forecast["2026-05-01"]["temp_c"], 31)
+        self.assertEqual(forecast["2026-05-01"]["description"], "light rain")
+        self.assertEqual(forecast["2026-05-02"]["condition"], "Cold")
+
+
+class WeatherFlagsTests(TestCase):
+    def test_flags_follow_saves_and_match_keyword_weights(self):
+        user = User.objects.create_user(username="tester", password="pass1234")
+        garment = Garment.objects.create(
+            owner=user, name="Denim Jacket", category="Layer", image="wardrobe_images/j.jpg",
+            color_hex="#101010", fabric_type="Cotton",
+        )
+        self.assertEqual(
+            garment.weather_flags,
+            utils.WEATHER_OUTER_LAYER | utils.WEATHER_LAYER | utils.WEATHER_BREATHABLE | utils.WEATHER_DARK,
+        )
+        garment.fabric_type = "Suede"
+        garment.save(update_fields=["fabric_type"])
+        garment.refresh_from_db()
+        self.assertTrue(garment.weather_flags & utils.WEATHER_RAIN_SENSITIVE)
+        self.assertFalse(garment.weather_flags & utils.WEATHER_BREATHABLE)
+
+        garments = sample_garments(400)
+        flags = np.array([g.weather_flags for g in garments])
+        for weather in WEATHER_SAMPLES + (None,):
+            expected = [legacy_weather_weight(g, weather) for g in garments]
+            np.testing.assert_allclose(OutfitService._weather_weights(flags, weather), expected)
+            self.assertEqual(
+                [OutfitService._weather_weight(g.weather_flags, weather) for g in garments[:50]],
+                expected[:50],
+            )
+
+    def test_analysis_flags_use_the_analysed_name(self):
+        user = User.objects.create_user(username="tester", password="pass1234")
+        garment = Garment.objects.create(owner=user, image="wardrobe_images/s.jpg")
+        ai_data = {"category": "Shorts", "name": "Plain Solid Color Fabric Shorts", "color_hex": "#f5f5dc"}
+        with mock.patch.object(GarmentService, "_cached_analyses", return_value=[ai_data]):
+            GarmentService._apply_ai_fields_batch([garment.id])
+        garment.refresh_from_db()
+        self.assertEqual(garment.category, "Bottom")
+        self.assertEqual(garment.weather_flags, utils.WEATHER_SHORT)
+
+
+class WardrobeVersionTests(TestCase):
+    def test_wear_and_discard_bump_the_version_after_commit(self):
+        user = User.objects.create_user(username="tester", password="pass1234")
+        garment = Garment.objects.create(owner=user, image="wardrobe_images/t.jpg")
+        for action in (
+            lambda: SustainabilityEngine.register_wear(garment, user),
+            lambda: SustainabilityEngine.discard_item(garment, user, "Donate"),
+        ):
+            with mock.patch("core.services.bump_wardrobe_version") as bump:
+                with self.captureOnCommitCallbacks(execute=True):
+                    action()
+                    bump.assert_not_called()
+                bump.assert_called_once_with(user.id)
+
+
+class ColorNameTests(SimpleTestCase):
+    def test_lookup_table_matches_exact_search(self):
+        rng = np.random.default_rng(1)
+        codes = ["#{:02x}{:02x}{:02x}".format(*rgb) for rgb in rng.integers(0, 256, (20000, 3))]
+        # Palette colors, their neighbours and malformed input.
+        codes += ["#{:02x}{:02x}{:02x}".format(*(min(255, max(0, v + d)) for v in rgb))
+                  for rgb in colors.COLOR_NAMES.values() for d in (-1, 0, 1)]
+        codes += ["", "FF0000", "#fff", "#zzzzzz", "##00ff00", "#-1-1-1", None]
+        expected = [legacy_color_name(code) for code in codes]
+        self.assertEqual([colors.color_name(code) for code in codes], expected)
+        self.assertEqual(colors.color_names(codes), expected)
@@ -1,16 +1,32 @@
+import hashlib
+import logging
 import os
+import threading
 
 import cv2
 import numpy as np
-from PIL import Image
-from sklearn.cluster import KMeans
+
+from . import inference
+from .clip_backends import CLIP_MODEL_NAME, load_backend
+from .imaging import DecodedImage
+
+logger = logging.getLogger(__name__)
 
 # --- 1. SETUP THE AI MODELS ---
 # Heavy models are loaded lazily to avoid OOM at server boot (Render free tier).
+# CLIP_BACKEND picks the runtime: torch (default), onnx or onnx-int8.
+CLIP_BACKEND = os.getenv("CLIP_BACKEND", "torch").strip().lower()
+# Same prompt the transformers zero-shot pipeline wraps every label in.
+CLIP_PROMPT_TEMPLATE = "This is a photo of {}."
+
 _classifier = None
+_label_embeddings = {}
 
 
 def _get_classifier():
+    """
+    Returns the CLIP encoder for CLIP_BACKEND, or None when unavailable.
+    """
     global _classifier
     if _classifier is not None:
         return _classifier
@@ -20,76 +36,154 @@ def _get_classifier():
         return None
 
     try:
-        from transformers import pipeline
-        _classifier = pipeline("zero-shot-image-classification", model="openai/clip-vit-base-patch32")
+        _classifier = load_backend(CLIP_BACKEND)
     except Exception:
+        logger.exception("Could not load the %s CLIP backend.", CLIP_BACKEND)
         _classifier = None
 
     return _classifier
 
-def get_dominant_color_hex(image_path):
+
+def _encode_images(classifier, images):
     """
-    Standard K-Means to find the main color hex code.
+    Unit-length CLIP image embeddings, one row per PIL image.
     """
-    image = cv2.imread(image_path)
-    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    
-    # Crop center to avoid background
-    h, w, _ = image.shape
-    center_img = image[int(h*0.3):int(h*0.7), int(w*0.3):int(w*0.7)]
-    pixels = center_img.reshape((-1, 3))
-    
-    kmeans = KMeans(n_clusters=1, n_init='auto')
-    kmeans.fit(pixels)
-    color = kmeans.cluster_centers_[0].astype(int)
-    return "#{:02x}{:02x}{:02x}".format(*color)
+    return classifier.encode_images(images)
 
-def analyze_garment(image_path):
+
+def _encode_labels(classifier, labels):
     """
-    Uses OpenAI CLIP to detect Category and Pattern with high accuracy.
+    Unit-length CLIP text embeddings for the label prompts.
+    Cached per process and, when CLIP_CACHE_DIR is set (or the backend has
+    its own cache dir), on disk.
     """
-    # 1. Load Image for AI
-    image = Image.open(image_path)
-    
-# ... inside analyze_garment function ...
+    key = (CLIP_MODEL_NAME, classifier.name, CLIP_PROMPT_TEMPLATE, tuple(labels))
+    if key in _label_embeddings:
+        return _label_embeddings[key]
+
+    cache_path = None
+    cache_dir = os.getenv("CLIP_CACHE_DIR") or classifier.cache_dir
+    if cache_dir:
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        cache_path = os.path.join(cache_dir, f"labels_{digest}.npy")
+        if os.path.exists(cache_path):
+            _label_embeddings[key] = np.load(cache_path)
+            return _label_embeddings[key]
+
+    prompts = [CLIP_PROMPT_TEMPLATE.format(label) for label in labels]
+    embeddings = classifier.encode_texts(prompts)
 
-    # 2. DEFINE LABELS (Updated for better accuracy)
-    candidate_categories = [
-        "T-Shirt", "Shirt", "Jeans", "Trousers", 
-        "Blazer", "Jacket", "Shorts", "Pajama", "Skirt"
+    if cache_path:
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(cache_path, embeddings)
+    _label_embeddings[key] = embeddings
+    return embeddings
+
+
+# Colors are read from a thumbnail; PIL decodes JPEGs straight at reduced scale.
+COLOR_SAMPLE_SIZE = 256
+PALETTE_SIZE = 5
+# Pixels at or above this alpha count as garment, the rest as cut-out background.
+OPAQUE_ALPHA = 128
+
+
+def _rgb_to_hex(rgb):
+    return "#{:02x}{:02x}{:02x}".format(*(int(round(c)) for c in rgb))
+
+
+def extract_colors(image, palette_size=PALETTE_SIZE):
+    """
+    Dominant color and a small palette from a 4-bit-per-channel histogram.
+    Takes a path or a DecodedImage. Uses only opaque pixels of cut-outs;
+    opaque photos fall back to the center crop.
+    Returns {'dominant': hex, 'palette': [(hex, share), ...]}.
+    """
+    if not isinstance(image, DecodedImage):
+        # JPEGs decode at 1/2..1/8 scale; box filtering keeps averages faithful.
+        image = DecodedImage.open(image, max_side=COLOR_SAMPLE_SIZE)
+    view = image.view(COLOR_SAMPLE_SIZE)
+    has_alpha = image.has_alpha
+    rgba = np.asarray(view.convert("RGBA"))
+
+    if has_alpha:
+        pixels = rgba[rgba[:, :, 3] >= OPAQUE_ALPHA][:, :3]
+    else:
+        # Crop center to avoid background
+        h, w, _ = rgba.shape
+        pixels = rgba[int(h*0.3):int(h*0.7), int(w*0.3):int(w*0.7), :3].reshape((-1, 3))
+    if len(pixels) == 0:
+        pixels = rgba[:, :, :3].reshape((-1, 3))
+
+    # Bin every pixel into 16x16x16 buckets and average the pixels per bucket.
+    pixels = pixels.astype(np.int32)
+    q = pixels >> 4
+    bins = (q[:, 0] << 8) | (q[:, 1] << 4) | q[:, 2]
+    counts = np.bincount(bins, minlength=4096)
+    sums = np.stack(
+        [np.bincount(bins, weights=pixels[:, c], minlength=4096) for c in range(3)], axis=1
+    )
+
+    top = np.argsort(counts)[::-1][:palette_size]
+    top = top[counts[top] > 0]
+    total = counts.sum()
+    palette = [
+        (_rgb_to_hex(sums[b] / counts[b]), round(float(counts[b] / total), 4)) for b in top
     ]
-    
-    # NEW: We added "Pattern" and "Print" to force it to ignore folds/wrinkles
-    candidate_patterns = [
-        "Plain Solid Color Fabric", 
-        "Vertical Striped Pattern", 
-        "Horizontal Striped Pattern", 
-        "Plaid Checkered Pattern", 
-        "Graphic Print Logo", 
-        "Floral Pattern"
+    return {'dominant': palette[0][0], 'palette': palette}
+
+
+def get_dominant_color_hex(image):
+    """
+    Main color hex code of a garment image (see extract_colors).
+    """
+    return extract_colors(image)['dominant']
+
+
+# Labels for the zero-shot scans. Both lists are scored with one matmul
+# against the cached label embeddings.
+CANDIDATE_CATEGORIES = [
+    "T-Shirt", "Shirt", "Jeans", "Trousers",
+    "Blazer", "Jacket", "Shorts", "Pajama", "Skirt"
+]
+
+# NEW: We added "Pattern" and "Print" to force it to ignore folds/wrinkles
+CANDIDATE_PATTERNS = [
+    "Plain Solid Color Fabric",
+    "Vertical Striped Pattern",
+    "Horizontal Striped Pattern",
+    "Plaid Checkered Pattern",
+    "Graphic Print Logo",
+    "Floral Pattern"
+]
+
+# Bump whenever labels, prompts or color rules change so cached analyses and
+# stored garments are treated as stale.
+ANALYZER_VERSION = 1
+
+# Images per forward pass when analysing a bulk upload.
+ANALYSIS_BATCH_SIZE = int(os.getenv("ANALYSIS_BATCH_SIZE", "16"))
+
+# Longest side analysis needs: CLIP crops the short side to 224 and colors
+# are read at COLOR_SAMPLE_SIZE, so nothing larger is ever decoded for it.
+ANALYSIS_IMAGE_SIZE = 512
+
+
+def _classify(image_embeddings, label_embeddings):
+    """
+    Scores every image against every label in one similarity matmul and
+    returns the best (category, pattern) for each image.
+    """
+    scores = image_embeddings @ label_embeddings.T
+    n_categories = len(CANDIDATE_CATEGORIES)
+    category_idx = scores[:, :n_categories].argmax(axis=1)
+    pattern_idx = scores[:, n_categories:].argmax(axis=1)
+    return [
+        (CANDIDATE_CATEGORIES[c], CANDIDATE_PATTERNS[p])
+        for c, p in zip(category_idx, pattern_idx)
     ]
-    
-    # ... (rest of the code stays the same) ...
-    
-    classifier = _get_classifier()
-    if classifier:
-        # 3. RUN AI SCANS
-        # Scan for Category
-        cat_results = classifier(image, candidate_labels=candidate_categories)
-        top_category = cat_results[0]['label']  # The #1 match
-
-        # Scan for Pattern
-        pat_results = classifier(image, candidate_labels=candidate_patterns)
-        top_pattern = pat_results[0]['label']
-    else:
-        # Fallback (low-memory mode): best-effort defaults
-        top_category = "Top"
-        top_pattern = "Plain Solid Color Fabric"
-    
-    # 4. Get Color
-    hex_code = get_dominant_color_hex(image_path)
-    
-    # 5. Clean up the Output
+
+
+def _build_analysis(top_category, top_pattern, hex_code):
     # If the pattern is "Solid Color", we just say "Solid T-Shirt"
     # If it's "Vertical Stripes", we say "Vertical Striped Shirt"
     if "Solid" in top_pattern:
@@ -98,7 +192,7 @@ def analyze_garment(image_path):
         display_pattern = "Graphic/Logo"
     else:
         display_pattern = top_pattern
-        
+
     final_name = f"{display_pattern} {top_category}"
 
     return {
@@ -109,7 +203,204 @@ def analyze_garment(image_path):
     }
 
 
+def _analysis_image(image):
+    if isinstance(image, DecodedImage):
+        return image
+    return DecodedImage.open(image, max_side=ANALYSIS_IMAGE_SIZE)
+
+
+def analyze_garments(images, batch_size=None):
+    """
+    Batched version of analyze_garment for bulk uploads.
+    Takes paths or already decoded DecodedImages; each image is decoded once
+    and CLIP and color extraction both read views of that decode.
+    Images are encoded in batches and scored against the cached category and
+    pattern embeddings together.
+    Returns one result per image, None where the image could not be read.
+    Results also carry the image 'embedding' so callers can keep it.
+    """
+    if inference.client_enabled():
+        payload = [
+            image.shrink(ANALYSIS_IMAGE_SIZE) if isinstance(image, DecodedImage) else image
+            for image in images
+        ]
+        try:
+            return inference.request("classify", images=payload)
+        except inference.InferenceUnavailable:
+            logger.warning("Inference server unavailable; classifying in-process.")
+
+    batch_size = batch_size or ANALYSIS_BATCH_SIZE
+
+    # 1. Load Images for AI
+    decoded = []
+    for image in images:
+        try:
+            decoded.append(_analysis_image(image))
+        except Exception:
+            decoded.append(None)
+    images = decoded
+
+    readable = [i for i, image in enumerate(images) if image is not None]
+    labels = {}
+    embeddings = {}
+
+    classifier = _get_classifier()
+    if classifier and readable:
+        # 2. RUN AI SCAN (text side is cached, so only images hit the model)
+        label_embeddings = _encode_labels(
+            classifier, CANDIDATE_CATEGORIES + CANDIDATE_PATTERNS
+        )
+        for start in range(0, len(readable), batch_size):
+            chunk = readable[start:start + batch_size]
+            image_embeddings = _encode_images(
+                classifier, [images[i].view(ANALYSIS_IMAGE_SIZE).convert("RGB") for i in chunk]
+            )
+            for i, top in zip(chunk, _classify(image_embeddings, label_embeddings)):
+                labels[i] = top
+            for i, embedding in zip(chunk, image_embeddings):
+                embeddings[i] = embedding
+
+    analyses = []
+    for i, image in enumerate(images):
+        if image is None:
+            analyses.append(None)
+            continue
+        # Fallback (low-memory mode): best-effort defaults
+        top_category, top_pattern = labels.get(i, ("Top", "Plain Solid Color Fabric"))
+
+        # 3. Get Color
+        try:
+            colors = extract_colors(image)
+        except Exception:
+            analyses.append(None)
+            continue
+        analysis = _build_analysis(top_category, top_pattern, colors['dominant'])
+        analysis['palette'] = [hex_code for hex_code, _ in colors['palette']]
+        analysis['embedding'] = embeddings.get(i)  # None in low-memory mode
+        analyses.append(analysis)
+
+    return analyses
+
+
+def analyze_garment(image_path):
+    """
+    Uses OpenAI CLIP to detect Category and Pattern with high accuracy.
+    """
+    analysis = analyze_garments([image_path])[0]
+    if analysis is None:
+        raise ValueError(f"Unreadable garment image: {image_path}")
+    return analysis
+
+
+
+
 
+# rembg model tiers: u2netp is ~25x smaller and much faster, u2net and
+# isnet give cleaner edges. Ingestion and try-on pick their own tier.
+REMBG_MODELS = {
+    "u2net": "u2net",
+    "u2netp": "u2netp",
+    "isnet": "isnet-general-use",
+}
+REMBG_GARMENT_MODEL = os.getenv("REMBG_GARMENT_MODEL", "u2netp").strip().lower()
+REMBG_TRYON_MODEL = os.getenv("REMBG_TRYON_MODEL", "u2net").strip().lower()
+
+_rembg_sessions = {}
+_rembg_lock = threading.Lock()
+
+
+def get_rembg_session(model="u2net"):
+    """
+    The rembg session for `model`, built once per process. A bare
+    rembg.remove() would load the ONNX graph again on every call.
+    """
+    if model not in REMBG_MODELS:
+        raise ValueError(f"Unknown rembg model {model!r}; expected one of {sorted(REMBG_MODELS)}.")
+    session = _rembg_sessions.get(model)
+    if session is None:
+        with _rembg_lock:
+            session = _rembg_sessions.get(model)
+            if session is None:
+                from rembg import new_session
+
+                session = _rembg_sessions[model] = new_session(REMBG_MODELS[model])
+    return session
+
+
+def remove_background(input_bytes, model="u2net"):
+    """
+    Cuts the subject out of an encoded image with rembg and returns PNG bytes.
+    Served by the inference daemon when one is configured.
+    """
+    if inference.client_enabled():
+        try:
+            return inference.request("remove_background", data=input_bytes, model=model)
+        except inference.InferenceUnavailable:
+            logger.warning("Inference server unavailable; running rembg in-process.")
+
+    from rembg import remove
+    return remove(input_bytes, session=get_rembg_session(model))
+
+
+def cut_out(image, model=REMBG_GARMENT_MODEL):
+    """
+    Background removal on an already decoded image. Returns the cut-out as an
+    RGBA DecodedImage (its PNG in `.data`), so later stages never re-read it.
+    """
+    if inference.client_enabled():
+        try:
+            return inference.request("cut_out", image=image, model=model)
+        except inference.InferenceUnavailable:
+            logger.warning("Inference server unavailable; running rembg in-process.")
+
+    from rembg import remove
+    return DecodedImage(remove(image.image, session=get_rembg_session(model)).convert("RGBA"))
+
+
+# Longest side of the grayscale copy the face detector scans; faces in a
+# selfie are large, so a 12 MP photo needn't be searched at full resolution.
+FACE_DETECT_SIZE = int(os.getenv("FACE_DETECT_SIZE", "480"))
+
+_face_cascade = None
+_face_cascade_lock = threading.Lock()
+_face_detect_lock = threading.Lock()
+
+
+def get_face_cascade():
+    """The Haar face cascade, parsed from XML once per process."""
+    global _face_cascade
+    if _face_cascade is None:
+        with _face_cascade_lock:
+            if _face_cascade is None:
+                _face_cascade = cv2.CascadeClassifier(
+                    cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+                )
+    return _face_cascade
+
+
+def detect_face(img):
+    """
+    First face box (x, y, w, h) in full-resolution coordinates of a BGR
+    image, or None. Detection runs on a copy downscaled to FACE_DETECT_SIZE.
+    """
+    height, width = img.shape[:2]
+    scale = min(1.0, FACE_DETECT_SIZE / max(height, width))
+    if scale < 1.0:
+        small = cv2.resize(
+            img, (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+    else:
+        small = img
+    gray_small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    cascade = get_face_cascade()
+    # Cascade objects aren't documented as thread-safe; selfie scans are rare.
+    with _face_detect_lock:
+        faces = cascade.detectMultiScale(gray_small, 1.1, 4)
+    if len(faces) == 0:
+        return None
+    x, y, w, h = (int(round(v / scale)) for v in faces[0])
+    return min(x, width - 1), min(y, height - 1), w, h
 
 
 def analyze_user_selfie(image_path):
@@ -117,41 +408,38 @@ def analyze_user_selfie(image_path):
     Advanced Scan: Measures Skin Value (Lightness) & Saturation.
     """
     img = cv2.imread(image_path)
-    
-    # 1. Convert to HSV (Hue, Saturation, Value)
-    # This lets us separate 'Color' (S) from 'Brightness' (V)
-    hsv_img = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
-    gray_img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    
-    # 2. Detect Face
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-    faces = face_cascade.detectMultiScale(gray_img, 1.1, 4)
-    
-    if len(faces) == 0:
+
+    # 1. Detect Face (on a downscaled copy; sampling below stays full-res)
+    face = detect_face(img)
+
+    if face is None:
         # Fallback values
         return {'skin_val': 150, 'skin_sat': 50, 'hair_val': 50, 'contrast': 100}
 
-    x, y, w, h = faces[0]
+    x, y, w, h = face
 
-    # 3. SAMPLE SKIN (Center of Face)
-    # We use HSV here to get Value (Brightness) and Saturation
-    skin_region_hsv = hsv_img[y+int(h*0.3):y+int(h*0.6), x+int(w*0.3):x+int(w*0.7)]
+    # 2. SAMPLE SKIN (Center of Face)
+    # We use HSV here to get Value (Brightness) and Saturation; only the
+    # sampled regions are converted, not the whole photo.
+    skin_region_hsv = cv2.cvtColor(
+        img[y+int(h*0.3):y+int(h*0.6), x+int(w*0.3):x+int(w*0.7)], cv2.COLOR_BGR2HSV
+    )
     
     # Average Saturation (0 = Grey, 255 = Vivid Color)
     skin_sat = np.mean(skin_region_hsv[:, :, 1]) 
     # Average Value (0 = Black, 255 = White)
     skin_val = np.mean(skin_region_hsv[:, :, 2])
 
-    # 4. SAMPLE HAIR (Above Forehead) - Used for Contrast
+    # 3. SAMPLE HAIR (Above Forehead) - Used for Contrast
     hair_start_y = max(0, y - int(h * 0.4))
-    hair_region_gray = gray_img[hair_start_y:y, x:x+w]
-    
-    if hair_region_gray.size == 0:
+    hair_region = img[hair_start_y:y, x:x+w]
+
+    if hair_region.size == 0:
         hair_val = skin_val
     else:
-        hair_val = np.mean(hair_region_gray)
+        hair_val = np.mean(cv2.cvtColor(hair_region, cv2.COLOR_BGR2GRAY))
 
-    # 5. CALCULATE CONTRAST
+    # 4. CALCULATE CONTRAST
     contrast = abs(skin_val - hair_val)
 
     return {
@@ -161,12 +449,18 @@ def analyze_user_selfie(image_path):
         'contrast': contrast
     }
 
-def analyze_user_season(image_path, undertone):
+# Bump when analyze_user_selfie changes what it measures; cached
+# measurements are keyed by selfie content hash plus this version.
+SELFIE_ANALYZER_VERSION = 1
+
+
+def analyze_user_season(image_path, undertone, measurements=None):
     """
     THE "SKIN-FIRST" ALGORITHM
     Prioritizes Skin Depth & Saturation over simple contrast.
+    Pass `measurements` (analyze_user_selfie output) to skip the face scan.
     """
-    data = analyze_user_selfie(image_path)
+    data = measurements if measurements is not None else analyze_user_selfie(image_path)
     
     skin_v = data['skin_val']  # Brightness (0-255)
     skin_s = data['skin_sat']  # Saturation (0-255)
@@ -292,6 +586,88 @@ def is_season_match(garment_hex, user_season):
     return match, reason
 
 
+# --- Precomputed season matches (Garment.season_mask) ---
+# Bit i is is_season_match(...)[0] for SEASONS[i]; the reason for SEASONS[i]
+# is a 3-bit index into SEASON_REASONS at bit 4 + 3*i.
+SEASONS = ("Winter", "Summer", "Autumn", "Spring")
+SEASON_REASONS = (
+    "Not your best color",
+    "Great High Contrast",
+    "Cool Winter Tone",
+    "Soft Summer Tone",
+    "Perfect Neutral",
+    "Warm Earth Tone",
+    "Bright Spring Color",
+    "Invalid Color",
+)
+_REASON_SHIFT = len(SEASONS)
+_REASON_BITS = 3
+
+
+def season_bit(season):
+    """The match bit of a season in season_mask, 0 for no/unknown season."""
+    return 1 << SEASONS.index(season) if season in SEASONS else 0
+
+
+def season_mask(garment_hex):
+    """is_season_match for every season, packed into one small int."""
+    mask = 0
+    for i, season in enumerate(SEASONS):
+        match, reason = is_season_match(garment_hex or "", season)
+        if match:
+            mask |= 1 << i
+        mask |= SEASON_REASONS.index(reason) << (_REASON_SHIFT + _REASON_BITS * i)
+    return mask
+
+
+def season_match_from_mask(mask, user_season):
+    """Same (match, reason) as is_season_match, read from a season_mask."""
+    if user_season not in SEASONS:
+        # Every season records "Invalid Color" for an unparsable hex.
+        code = (mask >> _REASON_SHIFT) & 0b111
+        return False, "Invalid Color" if SEASON_REASONS[code] == "Invalid Color" else "Not your best color"
+    i = SEASONS.index(user_season)
+    code = (mask >> (_REASON_SHIFT + _REASON_BITS * i)) & 0b111
+    return bool(mask & (1 << i)), SEASON_REASONS[code]
+
+
+# --- Precomputed weather features (Garment.weather_flags) ---
+# Keyword matches on "category name" and on fabric_type, plus a dark-color
+# bit, so outfit weather weighting is bit tests instead of string scans.
+WEATHER_OUTER_LAYER = 1 << 0  # skipped above 30 C
+WEATHER_SHORT = 1 << 1  # short/sleeveless: skipped below 15 C
+WEATHER_LAYER = 1 << 2  # favoured below 15 C
+WEATHER_BREATHABLE = 1 << 3  # cotton/linen: favoured above 30 C
+WEATHER_WARM_FABRIC = 1 << 4  # wool/denim: favoured below 15 C
+WEATHER_RAIN_SENSITIVE = 1 << 5  # suede/leather: skipped in rain
+WEATHER_RAIN_READY = 1 << 6  # synthetics: favoured in rain
+WEATHER_DARK = 1 << 7  # average RGB below 90: favoured in rain
+
+_WEATHER_KEYWORDS = (
+    (WEATHER_OUTER_LAYER, "category", ("blazer", "hoodie", "jacket", "coat", "layer", "sweater")),
+    (WEATHER_SHORT, "category", ("short", "sleeveless", "tank")),
+    (WEATHER_LAYER, "category", ("layer",)),
+    (WEATHER_BREATHABLE, "fabric", ("cotton", "linen")),
+    (WEATHER_WARM_FABRIC, "fabric", ("wool", "denim")),
+    (WEATHER_RAIN_SENSITIVE, "fabric", ("suede", "leather")),
+    (WEATHER_RAIN_READY, "fabric", ("polyester", "nylon", "synthetic")),
+)
+DARK_BRIGHTNESS = 90
+
+
+def weather_flags(category, name, fabric_type, brightness):
+    """WEATHER_* bits for a garment; brightness is the average RGB or None."""
+    text = {
+        "category": f"{category or ''} {name or ''}".lower(),
+        "fabric": (fabric_type or "").lower(),
+    }
+    flags = 0
+    for bit, source, words in _WEATHER_KEYWORDS:
+        if any(word in text[source] for word in words):
+            flags |= bit
+    if brightness is not None and brightness < DARK_BRIGHTNESS:
+        flags |= WEATHER_DARK
+    return flags
 
 
     # ... (keep existing imports and functions) ...
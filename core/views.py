@@ -14,7 +14,7 @@ from django.contrib.auth.models import User
 from django.contrib.auth import authenticate, login, logout
 
 from .forms import BulkGarmentForm, GarmentScanForm, UserSetupForm
-from .models import Garment, ScheduledOutfit, TryOnJob, UserProfile
+from .models import Garment, ScheduledOutfit, TryOnJob, UploadSession, UserProfile
 from .services import (
     GarmentService,
     LocationService,
@@ -22,8 +22,10 @@ from .services import (
     OutfitService,
     ProfileService,
     ScheduleService,
+    SimilarityService,
     SustainabilityEngine,
     TryOnService,
+    UploadService,
     WeatherService,
     ImpactService,
 )
@@ -312,6 +314,7 @@ def api_profile(request):
             "status": "success",
             "profile": {
                 "season": profile.season,
+                "analysis_status": profile.analysis_status,
                 "skin_undertone": profile.skin_undertone,
                 "contrast_level": profile.contrast_level,
                 "green_points": profile.green_points,
@@ -356,39 +359,96 @@ def api_add_item(request):
     scan_form = GarmentScanForm(request.POST, request.FILES)
     if scan_form.is_valid():
         garment = GarmentService.create_from_form(scan_form, request.user)
-        return JsonResponse({"status": "success", "garment_id": garment.id})
+        return JsonResponse(
+            {
+                "status": "success",
+                "garment_id": garment.id,
+                "image_url": garment.image.url,
+                "stage": garment.stage,
+            }
+        )
     return JsonResponse(
         {"status": "error", "message": "Invalid item data.", "errors": scan_form.errors},
         status=400,
     )
 
 
-def _map_color_group(color_hex):
-    if not color_hex:
-        return "Neutral"
+def _upload_payload(session):
+    return {
+        "status": "success",
+        "upload_id": session.id,
+        "upload_status": session.status,
+        "offset": session.received,
+        "size": session.size,
+        "chunk_size": UploadService.chunk_size(),
+        "garment_id": session.garment_id,
+        "error": session.error_message or None,
+    }
+
+
+@require_http_methods(["POST"])
+def api_upload_start(request):
+    """Opens a resumable upload for one file; see api_upload_chunk."""
+    if not request.user.is_authenticated:
+        return JsonResponse({"status": "error", "message": "Unauthorized"}, status=401)
+
+    fingerprint = (request.POST.get("fingerprint") or "").strip()
+    filename = request.POST.get("filename") or "upload"
     try:
-        h = color_hex.lstrip("#")
-        r, g, b = tuple(int(h[i : i + 2], 16) for i in (0, 2, 4))
-        brightness = (r + g + b) / 3
-    except Exception:
-        brightness = 255
-
-    from .helpers import get_color_name
-
-    name = get_color_name(color_hex)
-    neutral = {"White", "Black", "Grey", "Navy", "Cream", "Khaki", "Beige"}
-    warm = {"Red", "Orange", "Yellow", "Brown", "Beige", "Khaki", "Cream"}
-    cool = {"Blue", "Green", "Purple", "Pink", "Navy"}
-
-    if brightness < 70:
-        return "Dark"
-    if name in neutral:
-        return "Neutral"
-    if name in warm:
-        return "Warm"
-    if name in cool:
-        return "Cool"
-    return "Neutral"
+        size = int(request.POST.get("size", ""))
+    except ValueError:
+        size = 0
+    if not fingerprint or size <= 0:
+        return JsonResponse(
+            {"status": "error", "message": "fingerprint and size are required."}, status=400
+        )
+    if size > UploadService.max_size():
+        return JsonResponse({"status": "error", "message": "File is too large."}, status=413)
+
+    bulk_form = BulkGarmentForm(request.POST)
+    if not bulk_form.is_valid():
+        return JsonResponse(
+            {"status": "error", "message": "Invalid bulk data.", "errors": bulk_form.errors},
+            status=400,
+        )
+    session = UploadService.start(
+        request.user,
+        fingerprint[:255],
+        filename,
+        size,
+        bulk_form.cleaned_data["bulk_price"],
+        fabric_type=bulk_form.cleaned_data.get("fabric_type"),
+    )
+    return JsonResponse(_upload_payload(session))
+
+
+@require_http_methods(["GET", "PUT"])
+def api_upload_chunk(request, upload_id):
+    """
+    GET reports the offset to resume from. PUT appends the raw request body
+    (not multipart) at the offset given in the Upload-Offset header; a stale
+    offset gets 409 with the current one.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"status": "error", "message": "Unauthorized"}, status=401)
+
+    session = get_object_or_404(UploadSession, id=upload_id, owner=request.user)
+    if request.method == "GET" or session.status != "uploading":
+        return JsonResponse(_upload_payload(session))
+
+    try:
+        offset = int(request.headers.get("Upload-Offset", ""))
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "Bad Upload-Offset."}, status=400)
+    if offset != session.received:
+        return JsonResponse(_upload_payload(session), status=409)
+    if length > UploadService.chunk_size() or offset + length > session.size:
+        return JsonResponse({"status": "error", "message": "Chunk too large."}, status=413)
+
+    # The body is read straight from the socket; request.body is never touched.
+    session = UploadService.append(session, offset, request, length)
+    return JsonResponse(_upload_payload(session))
 
 
 def api_wardrobe(request):
@@ -408,11 +468,10 @@ def api_wardrobe(request):
             Q(name__icontains=search) | Q(category__icontains=search)
         )
     if color and color.lower() != "all":
-        garments = [g for g in garments if _map_color_group(g.color_hex) == color]
-    else:
-        garments = list(garments)
+        garments = garments.filter(color_group=color)
+    garments = garments.defer("embedding").order_by("id")
 
-    total_count = len(garments)
+    total_count = garments.count()
     try:
         limit = int(request.GET.get("limit", 200))
     except (TypeError, ValueError):
@@ -433,6 +492,9 @@ def api_wardrobe(request):
                 "name": garment.name,
                 "category": garment.category,
                 "image_url": garment.image.url if garment.image else "",
+                "thumbnails": garment.thumbnail_urls,
+                "srcset": garment.srcset,
+                "stage": garment.stage,
                 "wear_count": garment.wear_count,
                 "cost_per_wear": float(garment.cost_per_wear),
                 "color_hex": garment.color_hex,
@@ -477,6 +539,8 @@ def api_garment_detail(request, garment_id):
                 "name": garment.name,
                 "category": garment.category,
                 "image_url": garment.image.url if garment.image else "",
+                "stage": garment.stage,
+                "ai_status": garment.ai_status,
                 "purchase_price": float(garment.purchase_price or 0),
                 "wear_count": garment.wear_count,
                 "cost_per_wear": float(garment.cost_per_wear),
@@ -494,7 +558,46 @@ def api_garment_detail(request, garment_id):
     )
 
 
+def api_garment_similar(request, garment_id):
+    if not request.user.is_authenticated:
+        return JsonResponse({"status": "error", "message": "Unauthorized"}, status=401)
+
+    garment = get_object_or_404(Garment, id=garment_id, owner=request.user)
+    try:
+        limit = int(request.GET.get("limit", 8))
+    except (TypeError, ValueError):
+        limit = 8
+    limit = min(max(limit, 1), 50)
+
+    matches = SimilarityService.similar_items(request.user, garment, limit=limit)
+    garments = Garment.objects.in_bulk([garment_id for garment_id, _ in matches])
+
+    payload = []
+    for match_id, score in matches:
+        item = garments.get(match_id)
+        if not item:
+            continue
+        payload.append(
+            {
+                "id": item.id,
+                "name": item.name,
+                "category": item.category,
+                "image_url": item.image.url if item.image else "",
+                "thumbnails": item.thumbnail_urls,
+                "srcset": item.srcset,
+                "color_hex": item.color_hex,
+                "score": round(score, 4),
+            }
+        )
+
+    return JsonResponse({"status": "success", "garments": payload})
+
+
 def api_outfit(request):
+    """
+    One outfit for the mood, or with ?count=N up to N distinct ones under
+    "outfits" (the first is also returned as top/bottom).
+    """
     if not request.user.is_authenticated:
         return JsonResponse({"status": "error", "message": "Unauthorized"}, status=401)
 
@@ -503,6 +606,11 @@ def api_outfit(request):
     freeze_bottom = request.GET.get("freeze_bottom") == "1"
     locked_top_id = request.GET.get("top_id") if freeze_top else None
     locked_bottom_id = request.GET.get("bottom_id") if freeze_bottom else None
+    try:
+        count = int(request.GET.get("count", 1))
+    except (TypeError, ValueError):
+        count = 1
+    count = min(max(count, 1), OutfitService.MAX_BATCH)
 
     profile = ProfileService.get_or_create(request.user)
     advanced_available = getattr(settings, "ADVANCED_STYLIST_ENABLED", False)
@@ -516,6 +624,8 @@ def api_outfit(request):
         locked_bottom_id=locked_bottom_id,
         advanced=advanced_enabled,
         weather_context=weather_context,
+        profile=profile,
+        count=count,
     )
 
     def _garment_payload(item):
@@ -526,6 +636,8 @@ def api_outfit(request):
             "name": item.name,
             "category": item.category,
             "image_url": item.image.url if item.image else "",
+            "thumbnails": item.thumbnail_urls,
+            "srcset": item.srcset,
             "wear_count": item.wear_count,
             "cost_per_wear": float(item.cost_per_wear),
             "fabric_type": item.fabric_type,
@@ -538,6 +650,14 @@ def api_outfit(request):
             "top": _garment_payload(context.get("top")),
             "bottom": _garment_payload(context.get("bottom")),
             "guilt_messages": context.get("guilt_messages", {}),
+            "outfits": [
+                {
+                    "top": _garment_payload(outfit["top"]),
+                    "bottom": _garment_payload(outfit["bottom"]),
+                    "guilt_messages": outfit["guilt_messages"],
+                }
+                for outfit in context["outfits"]
+            ],
         }
     )
 
@@ -556,6 +676,24 @@ def api_tryon_status(request, job_id):
     return JsonResponse(payload)
 
 
+def _schedule_payload(entry):
+    return {
+        "id": entry.id,
+        "scheduled_date": entry.scheduled_date.isoformat(),
+        "source": entry.source,
+        "notify_on_day": entry.notify_on_day,
+        "top_id": entry.top.id if entry.top else None,
+        "bottom_id": entry.bottom.id if entry.bottom else None,
+        "top": entry.top.name if entry.top else None,
+        "bottom": entry.bottom.name if entry.bottom else None,
+        "top_image_url": entry.top.image.url if entry.top and entry.top.image else None,
+        "bottom_image_url": entry.bottom.image.url if entry.bottom and entry.bottom.image else None,
+        "top_thumbnails": entry.top.thumbnail_urls if entry.top else {},
+        "bottom_thumbnails": entry.bottom.thumbnail_urls if entry.bottom else {},
+        "image_url": entry.vton_result_image.url if entry.vton_result_image else None,
+    }
+
+
 def api_calendar(request):
     if not request.user.is_authenticated:
         return JsonResponse({"status": "error", "message": "Unauthorized"}, status=401)
@@ -582,29 +720,11 @@ def api_calendar(request):
         .order_by("scheduled_date")
     )
 
-    items = []
-    for entry in schedules:
-        items.append(
-            {
-                "id": entry.id,
-                "scheduled_date": entry.scheduled_date.isoformat(),
-                "source": entry.source,
-                "notify_on_day": entry.notify_on_day,
-                "top_id": entry.top.id if entry.top else None,
-                "bottom_id": entry.bottom.id if entry.bottom else None,
-                "top": entry.top.name if entry.top else None,
-                "bottom": entry.bottom.name if entry.bottom else None,
-                "top_image_url": entry.top.image.url if entry.top and entry.top.image else None,
-                "bottom_image_url": entry.bottom.image.url if entry.bottom and entry.bottom.image else None,
-                "image_url": entry.vton_result_image.url if entry.vton_result_image else None,
-            }
-        )
-
     return JsonResponse(
         {
             "status": "success",
             "month": start.strftime("%Y-%m"),
-            "items": items,
+            "items": [_schedule_payload(entry) for entry in schedules],
         }
     )
 
@@ -653,6 +773,8 @@ def api_sustainability(request):
                 "id": garment.id,
                 "name": garment.name,
                 "image_url": garment.image.url if garment.image else "",
+                "thumbnails": garment.thumbnail_urls,
+                "srcset": garment.srcset,
                 "fabric_type": garment.fabric_type,
                 "wear_count": garment.wear_count,
             }
@@ -755,6 +877,40 @@ def api_schedule_delete(request, schedule_id):
     return JsonResponse({"status": "success"})
 
 
+@require_http_methods(["POST"])
+def api_schedule_plan(request):
+    """
+    Fills start..end (ISO dates, inclusive) with generated outfits, skipping
+    days that already have one.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"status": "error", "message": "Unauthorized"}, status=401)
+
+    try:
+        start = datetime.fromisoformat(request.POST.get("start", "")).date()
+        end = datetime.fromisoformat(request.POST.get("end", "")).date()
+    except ValueError:
+        return JsonResponse({"status": "error", "message": "Invalid date format."}, status=400)
+
+    result = ScheduleService.plan_range(
+        request.user,
+        start,
+        end,
+        mood=request.POST.get("mood", "Casual"),
+        notify_on_day=request.POST.get("notify_on_day", "true") == "true",
+    )
+    if result["status"] != "success":
+        return JsonResponse(result, status=400)
+    return JsonResponse(
+        {
+            "status": "success",
+            "message": result["message"],
+            "items": [_schedule_payload(entry) for entry in result["schedules"]],
+            "skipped": [day.isoformat() for day in result["skipped"]],
+        }
+    )
+
+
 @require_http_methods(["POST"])
 def api_schedule_notify(request, schedule_id):
     if not request.user.is_authenticated:
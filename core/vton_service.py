@@ -6,6 +6,8 @@ import replicate
 from django.conf import settings
 from PIL import Image
 
+from .utils import REMBG_TRYON_MODEL, remove_background
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,11 +21,33 @@ def _get_replicate_client():
     return replicate.Client(api_token=token)
 
 
+def clean_human_image(input_bytes):
+    """
+    Removes the background from a body photo and composites the person onto
+    white. Returns JPEG bytes; depends only on the photo, so callers cache it.
+    """
+    subject_only = remove_background(input_bytes, model=REMBG_TRYON_MODEL)
+
+    img = Image.open(io.BytesIO(subject_only)).convert("RGBA")
+    white_bg = Image.new("RGBA", img.size, "WHITE")
+    white_bg.paste(img, (0, 0), img)
+    final_image = white_bg.convert("RGB")
+
+    buf = io.BytesIO()
+    final_image.save(buf, format="JPEG", quality=95)
+    return buf.getvalue()
+
+
 def generate_tryon(
-    human_image_input, garment_image_path, category="upper_body", description="clothing item"
+    human_image_input,
+    garment_image_path,
+    category="upper_body",
+    description="clothing item",
+    clean_background=True,
 ):
     """
-    1. Removes background from the user's photo.
+    1. Removes background from the user's photo (skipped with
+       clean_background=False for an already cleaned photo).
     2. Composites the user onto a clean WHITE background.
     3. Sends the clean image to Replicate.
     """
@@ -45,21 +69,11 @@ def generate_tryon(
         else:
             with open(human_image_input, "rb") as f:
                 input_bytes = f.read()
-            if os.getenv("DISABLE_REMBG", "").lower() in {"1", "true", "yes"}:
+            if not clean_background or os.getenv("DISABLE_REMBG", "").lower() in {"1", "true", "yes"}:
                 human_input = io.BytesIO(input_bytes)
             else:
                 try:
-                    from rembg import remove
-                    subject_only = remove(input_bytes)
-
-                    img = Image.open(io.BytesIO(subject_only)).convert("RGBA")
-                    white_bg = Image.new("RGBA", img.size, "WHITE")
-                    white_bg.paste(img, (0, 0), img)
-                    final_image = white_bg.convert("RGB")
-
-                    buf = io.BytesIO()
-                    final_image.save(buf, format="JPEG", quality=95)
-                    human_input = buf
+                    human_input = io.BytesIO(clean_human_image(input_bytes))
                 except Exception:
                     logger.warning("rembg unavailable; using original image for VTON.")
                     human_input = io.BytesIO(input_bytes)
@@ -0,0 +1,138 @@
+"""
+Shared plumbing for the chunked, resumable backfill commands
+(`reanalyze_wardrobe`, `rembg_wardrobe`).
+
+Pool workers are spawned rather than forked so they never inherit the
+parent's DB connection. Keep this module free of model imports at module
+level: workers unpickle these functions before Django is configured, so
+setup happens in init_worker and everything else is imported afterwards.
+"""
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+
+import django
+
+
+def init_worker():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "smart_wardrobe.settings")
+    django.setup()
+
+
+def worker_pool(workers):
+    return ProcessPoolExecutor(
+        max_workers=workers, mp_context=get_context("spawn"), initializer=init_worker
+    )
+
+
+def ordered_results(pool, fn, chunks, lookahead, *args):
+    """
+    Submits fn(chunk, *args) for every chunk with at most `lookahead` chunks
+    in flight and yields (chunk, result, error) in submission order, so the
+    caller can checkpoint only chunks that are fully written back.
+    """
+    in_flight = deque()
+
+    def pop():
+        chunk, future = in_flight.popleft()
+        try:
+            return chunk, future.result(), None
+        except Exception as exc:
+            return chunk, None, exc
+
+    for chunk in chunks:
+        in_flight.append((chunk, pool.submit(fn, chunk, *args)))
+        while len(in_flight) > lookahead:
+            yield pop()
+    while in_flight:
+        yield pop()
+
+
+class Checkpoint:
+    """
+    The last fully processed garment id, stored as JSON next to the settings
+    that produced it; a checkpoint written under other settings is ignored.
+    """
+
+    def __init__(self, path, **identity):
+        self.path = path
+        self.identity = identity
+
+    def load(self, restart=False):
+        if restart or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except (OSError, ValueError):
+            return 0
+        if any(data.get(key) != value for key, value in self.identity.items()):
+            return 0
+        return int(data.get("last_id", 0))
+
+    def save(self, last_id):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(dict(self.identity, last_id=last_id), handle)
+        os.replace(tmp_path, self.path)
+
+
+def analyze_chunk(garments):
+    # Reads image files and the content cache only, never the database.
+    from .services import GarmentService
+
+    return GarmentService._cached_analyses(garments)
+
+
+def _store_cut_out(name, output_bytes):
+    from django.core.files.base import ContentFile
+    from django.core.files.storage import default_storage
+
+    from .imaging import DecodedImage, compact_cut_out
+    from .services import GarmentService
+
+    cutout = compact_cut_out(DecodedImage.from_bytes(output_bytes, max_side=None))
+    base = os.path.splitext(os.path.basename(name))[0].split("_nobg")[0] + "_nobg"
+    new_name = default_storage.save(f"wardrobe_images/{base}.webp", ContentFile(cutout.data))
+    thumbnails = GarmentService._save_thumbnails(cutout, base)
+    return new_name, thumbnails
+
+
+def cut_out_chunk(garments, model, dry_run=False):
+    """
+    Removes backgrounds for the garments' images and stores the trimmed
+    WebP cut-outs and their thumbnails; the database is left to the caller.
+    Returns [(garment_id, new name, thumbnails, error)].
+    Files are written on a saver thread so the next image is already being
+    decoded and segmented while the previous one is encoded and saved.
+    """
+    from django.core.files.storage import default_storage
+
+    from .utils import remove_background
+
+    results = []
+    with ThreadPoolExecutor(max_workers=1) as saver:
+        pending = []
+        for garment in garments:
+            garment_id, name = garment.id, garment.image.name
+            try:
+                with default_storage.open(name, "rb") as handle:
+                    output_bytes = remove_background(handle.read(), model=model)
+            except Exception as exc:
+                results.append((garment_id, None, None, str(exc)))
+                continue
+            if dry_run:
+                results.append((garment_id, None, None, None))
+                continue
+            pending.append((garment_id, saver.submit(_store_cut_out, name, output_bytes)))
+
+        for garment_id, future in pending:
+            try:
+                new_name, thumbnails = future.result()
+                results.append((garment_id, new_name, thumbnails, None))
+            except Exception as exc:
+                results.append((garment_id, None, None, str(exc)))
+    return results
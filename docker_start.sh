@@ -2,6 +2,13 @@
 set -e
 
 python manage.py migrate
+python manage.py createcachetable
 python manage.py ensure_superuser
 python manage.py import_fixture
+if [ -n "$INFERENCE_SOCKET" ]; then
+    # One copy of the models per host; gunicorn workers talk to it over the socket.
+    python manage.py run_inference_server &
+fi
+# Uploads a restart cut off mid-pipeline; no job pool is running yet.
+python manage.py requeue_uploads --minutes 0 &
 gunicorn smart_wardrobe.wsgi:application --bind 0.0.0.0:${PORT:-8000}
@@ -9,6 +9,7 @@ interface AIAnalysisResultProps {
 
 type ProfileData = {
   season?: string;
+  analysis_status?: 'idle' | 'pending' | 'processing' | 'complete' | 'failed';
   skin_undertone?: string;
   palette?: string[];
   selfie_url?: string | null;
@@ -20,19 +21,42 @@ export function AIAnalysisResult({ onNavigate }: AIAnalysisResultProps) {
   const [profile, setProfile] = useState<ProfileData | null>(null);
 
   useEffect(() => {
-    fetch('/api/profile/', { credentials: 'same-origin' })
-      .then((res) => (res.ok ? res.json() : null))
-      .then((payload) => {
-        if (payload && payload.status === 'success') {
-          setProfile(payload.profile || null);
-        }
-      })
-      .catch(() => null);
+    let cancelled = false;
+    let timer: ReturnType<typeof setTimeout>;
+    const started = Date.now();
 
-    setTimeout(() => {
-      setAnalyzing(false);
-      setTimeout(() => setRevealed(true), 300);
-    }, 1500);
+    const reveal = () => {
+      // Keep the scan animation on screen for at least 1.5s.
+      timer = setTimeout(() => {
+        if (cancelled) return;
+        setAnalyzing(false);
+        setTimeout(() => setRevealed(true), 300);
+      }, Math.max(0, 1500 - (Date.now() - started)));
+    };
+
+    // Season analysis runs in the background; poll until it settles.
+    const poll = (attempt: number) => {
+      fetch('/api/profile/', { credentials: 'same-origin' })
+        .then((res) => (res.ok ? res.json() : null))
+        .then((payload) => {
+          if (cancelled) return;
+          const data: ProfileData | null = payload && payload.status === 'success' ? payload.profile : null;
+          setProfile(data);
+          const running = data?.analysis_status === 'pending' || data?.analysis_status === 'processing';
+          if (running && attempt < 30) {
+            timer = setTimeout(() => poll(attempt + 1), 1000);
+          } else {
+            reveal();
+          }
+        })
+        .catch(() => !cancelled && reveal());
+    };
+    poll(0);
+
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
   }, []);
 
   const season = profile?.season || 'Warm Autumn';
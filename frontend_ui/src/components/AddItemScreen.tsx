@@ -3,6 +3,7 @@ import { ArrowLeft, Camera, Upload, Image as ImageIcon } from 'lucide-react';
 import { Screen } from '../App';
 import { useRef, useState } from 'react';
 import { apiPost } from '../lib/api';
+import { uploadResumable } from '../lib/uploads';
 
 interface AddItemScreenProps {
   onNavigate: (screen: Screen) => void;
@@ -35,39 +36,64 @@ export function AddItemScreen({ onNavigate }: AddItemScreenProps) {
   const singleRef = useRef<HTMLInputElement>(null);
   const bulkRef = useRef<HTMLInputElement>(null);
 
+  const handleBulkUpload = async () => {
+    if (bulkFiles.length === 0) {
+      setStatus('Please select photos for bulk upload.');
+      return;
+    }
+    const fields = { bulk_price: bulkPrice || '0', fabric_type: bulkFabricType };
+    setSaving(true);
+    let added = 0;
+    let failed = 0;
+    try {
+      for (let index = 0; index < bulkFiles.length; index += 1) {
+        setStatus(`Uploading ${index + 1} of ${bulkFiles.length}...`);
+        try {
+          const result = await uploadResumable(bulkFiles[index], fields);
+          if (result.upload_status === 'complete') added += 1;
+          else failed += 1;
+        } catch {
+          failed += 1;
+        }
+      }
+      setStatus(
+        failed
+          ? `Added ${added} items. ${failed} failed - upload again to resume them.`
+          : `Added ${added} items!`,
+      );
+      if (!failed) {
+        setBulkFiles([]);
+        setBulkPrice('');
+      }
+    } finally {
+      setSaving(false);
+    }
+  };
+
   const handleSubmit = async () => {
     setStatus('');
+    if (mode === 'bulk') {
+      await handleBulkUpload();
+      return;
+    }
+    if (!singleFile) {
+      setStatus('Please select a photo.');
+      return;
+    }
     const form = new FormData();
     form.append('mode', mode);
-
-    if (mode === 'single') {
-      if (!singleFile) {
-        setStatus('Please select a photo.');
-        return;
-      }
-      form.append('image', singleFile);
-      form.append('purchase_price', price || '0');
-      form.append('fabric_type', fabricType);
-    } else {
-      if (bulkFiles.length === 0) {
-        setStatus('Please select photos for bulk upload.');
-        return;
-      }
-      bulkFiles.forEach((file) => form.append('images', file));
-      form.append('bulk_price', bulkPrice || '0');
-      form.append('fabric_type', bulkFabricType);
-    }
+    form.append('image', singleFile);
+    form.append('purchase_price', price || '0');
+    form.append('fabric_type', fabricType);
 
     setSaving(true);
     try {
       const response = await apiPost('/api/add-item/', form);
       const payload = await response.json();
       if (response.ok && payload.status === 'success') {
-        setStatus(mode === 'single' ? 'Item added!' : `Added ${payload.count || 0} items!`);
+        setStatus('Item added!');
         setSingleFile(null);
-        setBulkFiles([]);
         setPrice('');
-        setBulkPrice('');
       } else {
         setStatus(payload.message || 'Unable to save. Check your inputs.');
       }
@@ -32,6 +32,8 @@ type Garment = {
   name: string;
   category?: string;
   image_url?: string;
+  srcset?: string;
+  stage?: string;
   wear_count?: number;
 };
 
@@ -207,12 +209,20 @@ export function DigitalWardrobe({ onNavigate, onSelectGarment }: DigitalWardrobe
               {garment.image_url ? (
                 <img
                   src={garment.image_url}
+                  srcSet={garment.srcset || undefined}
+                  sizes="50vw"
+                  loading="lazy"
                   alt={garment.name}
                   className="w-full h-full object-cover"
                 />
               ) : (
                 <div className="text-5xl text-charcoal/40">OK</div>
               )}
+              {garment.stage && garment.stage !== 'ready' && (
+                <span className="absolute top-3 left-3 px-2 py-1 rounded-full bg-white/80 caption text-charcoal/70">
+                  {garment.stage === 'failed' ? 'Processing failed' : 'Processing…'}
+                </span>
+              )}
               <div className="absolute inset-0 bg-sage/0 group-hover:bg-sage/10 transition-colors" />
             </div>
             <h3 className="mb-1 text-sm font-semibold">{garment.name}</h3>
@@ -28,6 +28,7 @@ type GarmentItem = {
   id: number;
   name: string;
   image_url?: string;
+  srcset?: string;
   fabric_type?: string | null;
   wear_count?: number;
 };
@@ -427,7 +428,14 @@ export function SustainabilityDashboard({ onNavigate, onSelectGarment }: Sustain
                     >
                       <div className="aspect-[3/4] bg-white flex items-center justify-center">
                         {item.image_url ? (
-                          <img src={item.image_url} alt={item.name} className="w-full h-full object-cover" />
+                          <img
+                            src={item.image_url}
+                            srcSet={item.srcset || undefined}
+                            sizes="50vw"
+                            loading="lazy"
+                            alt={item.name}
+                            className="w-full h-full object-cover"
+                          />
                         ) : (
                           <span className="text-3xl text-charcoal/40">*</span>
                         )}
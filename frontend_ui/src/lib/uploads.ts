@@ -0,0 +1,74 @@
+import { apiPost, getCsrfToken } from './api';
+
+interface UploadState {
+  status: string;
+  upload_id: number;
+  upload_status: 'uploading' | 'complete' | 'failed';
+  offset: number;
+  size: number;
+  chunk_size: number;
+  garment_id: number | null;
+  error: string | null;
+}
+
+const MAX_RETRIES = 5;
+
+function fingerprint(file: File): string {
+  return `${file.name}:${file.size}:${file.lastModified}`;
+}
+
+const sleep = (ms: number) => new Promise((resolve) => setTimeout(resolve, ms));
+
+async function readState(response: Response): Promise<UploadState> {
+  // 409 carries the server's offset, which is where we resume from.
+  if (!response.ok && response.status !== 409) {
+    throw new Error(`Upload failed (${response.status})`);
+  }
+  return response.json();
+}
+
+/**
+ * Sends one file through the chunked upload API. Re-running it for the same
+ * file resumes from the server's offset, and completed files are skipped.
+ */
+export async function uploadResumable(
+  file: File,
+  fields: Record<string, string>,
+  onProgress?: (sent: number) => void,
+): Promise<UploadState> {
+  const form = new FormData();
+  form.append('fingerprint', fingerprint(file));
+  form.append('filename', file.name);
+  form.append('size', String(file.size));
+  Object.entries(fields).forEach(([key, value]) => form.append(key, value));
+  let state = await readState(await apiPost('/api/uploads/', form));
+
+  let retries = 0;
+  while (state.upload_status === 'uploading') {
+    onProgress?.(state.offset);
+    const chunk = file.slice(state.offset, state.offset + state.chunk_size);
+    try {
+      const response = await fetch(`/api/uploads/${state.upload_id}/`, {
+        method: 'PUT',
+        credentials: 'same-origin',
+        headers: {
+          'Content-Type': 'application/offset+octet-stream',
+          'Upload-Offset': String(state.offset),
+          'X-CSRFToken': getCsrfToken(),
+        },
+        body: chunk,
+      });
+      state = await readState(response);
+      retries = 0;
+    } catch (error) {
+      if (++retries > MAX_RETRIES) throw error;
+      await sleep(1000 * 2 ** retries);
+      // Ask where the server got to before sending more.
+      state = await readState(
+        await fetch(`/api/uploads/${state.upload_id}/`, { credentials: 'same-origin' }),
+      );
+    }
+  }
+  onProgress?.(state.offset);
+  return state;
+}
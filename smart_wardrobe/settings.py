@@ -136,6 +136,35 @@ MEDIA_URL = '/media/'
 # Path where media is stored
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Shared by every process (gunicorn workers, management commands, the job
+# pool): wardrobe version bumps from one must invalidate snapshots cached by
+# the others. Database cache by default (`manage.py createcachetable`);
+# REDIS_URL switches to Redis.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "django_cache",
+            "OPTIONS": {"MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", "20000"))},
+        }
+    }
+
+# Content-addressed cache for background removal and garment analysis results
+ANALYSIS_CACHE_DIR = os.getenv("ANALYSIS_CACHE_DIR", os.path.join(BASE_DIR, "cache", "analysis"))
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_MB", "512")) * 1024 * 1024
+
+# Chunked, resumable garment uploads: part files live here until complete
+CHUNKED_UPLOAD_DIR = os.getenv("CHUNKED_UPLOAD_DIR", os.path.join(BASE_DIR, "cache", "uploads"))
+CHUNKED_UPLOAD_CHUNK_BYTES = int(os.getenv("CHUNKED_UPLOAD_CHUNK_MB", "2")) * 1024 * 1024
+CHUNKED_UPLOAD_MAX_BYTES = int(os.getenv("CHUNKED_UPLOAD_MAX_MB", "40")) * 1024 * 1024
+
 # External service tokens (use env vars)
 REPLICATE_API_TOKEN = os.getenv("REPLICATE_API_TOKEN", "")
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "")
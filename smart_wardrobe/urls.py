@@ -31,14 +31,18 @@ urlpatterns = [
     path('api/home/', views.api_home, name='api_home'),
     path('api/profile/', views.api_profile, name='api_profile'),
     path('api/add-item/', views.api_add_item, name='api_add_item'),
+    path('api/uploads/', views.api_upload_start, name='api_upload_start'),
+    path('api/uploads/<int:upload_id>/', views.api_upload_chunk, name='api_upload_chunk'),
     path('api/wardrobe/', views.api_wardrobe, name='api_wardrobe'),
     path('api/garments/<int:garment_id>/', views.api_garment_detail, name='api_garment_detail'),
+    path('api/garments/<int:garment_id>/similar/', views.api_garment_similar, name='api_garment_similar'),
     path('api/outfit/', views.api_outfit, name='api_outfit'),
     path('api/tryon/<int:job_id>/', views.api_tryon_status, name='api_tryon_status'),
     path('api/calendar/', views.api_calendar, name='api_calendar'),
     path('api/sustainability/', views.api_sustainability, name='api_sustainability'),
     path('api/discard/', views.api_discard, name='api_discard'),
     path('api/achievements/claim/', views.api_achievement_claim, name='api_achievement_claim'),
+    path('api/schedules/plan/', views.api_schedule_plan, name='api_schedule_plan'),
     path('api/schedules/<int:schedule_id>/delete/', views.api_schedule_delete, name='api_schedule_delete'),
     path('api/schedules/<int:schedule_id>/notify/', views.api_schedule_notify, name='api_schedule_notify'),
     